@@ -0,0 +1,300 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional
+from checkpoint import CancellationToken
+from file_transfer import spool_to_disk
+from metrics import REGISTRY
+from processor_pool import ProcessorPool
+from result_columns import json_default, load_results, save_results
+
+# 运行时指标
+JOBS_QUEUED = REGISTRY.gauge('analysis_jobs_queued', '排队中的后台分析任务数')
+JOBS_RUNNING = REGISTRY.gauge('analysis_jobs_running', '正在运行的后台分析任务数')
+JOBS_FINISHED = REGISTRY.counter('analysis_jobs_finished_total', '已结束（完成或失败）的后台分析任务总数')
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# 运行中任务的进度最多每隔多少秒写一次磁盘
+PROGRESS_SAVE_INTERVAL = 1.0
+
+def _write_json(path: str, data: Dict):
+    """原子地写入JSON文件，进程中途退出也不会留下半个文件"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
+    os.replace(tmp_path, path)
+
+class AnalysisJobQueue:
+    """本地后台视频分析任务队列
+
+    上传的视频提交为任务后立即返回，由固定数量的工作线程依次处理，每个任务从处理器池
+    借用一个视频处理器。每个任务的状态、
+    进度和结果都保存在 jobs_dir/<任务ID>/ 下，页面刷新或服务重启后仍可查询；
+    重启时未完成的任务会重新排队，并从任务目录中的检查点继续分析。
+    取消和失败的任务保留原始视频和检查点，可以稍后继续。
+    """
+
+    def __init__(self, jobs_dir: str = os.path.join('data', 'jobs'), max_workers: int = 2,
+                 processor_pool: Optional[ProcessorPool] = None):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max(1, max_workers)
+        self.processor_pool = processor_pool or ProcessorPool(max_workers)
+
+        self._jobs = {}
+        # {运行中的任务ID: 取消令牌}
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._threads = []
+        self._running = 0
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._load_jobs()
+
+    def start(self) -> 'AnalysisJobQueue':
+        """启动工作线程"""
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f'AnalysisJob-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """等待正在运行的任务结束后停止工作线程（排队的任务保留在磁盘上）"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, video_path: str, options: Optional[Dict] = None, name: Optional[str] = None) -> str:
+        """提交分析任务，视频文件移动到任务目录，返回任务ID
+
+        options 原样传给 process_video_file；save_output=True 时在任务目录生成结果视频。
+        """
+        job_id, job_dir = self._create_job_dir()
+        input_path = os.path.join(job_dir, 'input' + (os.path.splitext(video_path)[1] or '.mp4'))
+        try:
+            shutil.move(video_path, input_path)
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        return self._add_job(job_id, input_path, options, name or os.path.basename(video_path))
+
+    def submit_stream(self, fileobj: BinaryIO, name: str, options: Optional[Dict] = None) -> str:
+        """提交上传的文件对象：按块直接写入任务目录，不经过临时文件和整块内存拷贝"""
+        job_id, job_dir = self._create_job_dir()
+        input_path = os.path.join(job_dir, 'input' + (os.path.splitext(name)[1] or '.mp4'))
+        try:
+            spool_to_disk(fileobj, input_path)
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        return self._add_job(job_id, input_path, options, name)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """返回任务状态的副本"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self) -> List[Dict]:
+        """按提交时间倒序返回全部任务"""
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()]
+        return sorted(jobs, key=lambda job: job['submitted_at'], reverse=True)
+
+    def result(self, job_id: str) -> Optional[Dict]:
+        """读取已完成任务的分析结果（各组的逐帧数据为 SetColumns），无法读取时返回None"""
+        path = os.path.join(self.jobs_dir, job_id, 'result.npz')
+        if os.path.exists(path):
+            try:
+                return load_results(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"读取任务 {job_id} 的分析结果失败: {e}")
+                return None
+        # 旧版本保存的JSON结果
+        path = os.path.join(self.jobs_dir, job_id, 'result.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def cancel(self, job_id: str) -> bool:
+        """取消排队或运行中的任务；运行中的任务在当前帧结束后停止并保存部分结果"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] not in (QUEUED, RUNNING):
+                return False
+            if job['status'] == QUEUED:
+                job['status'] = CANCELLED
+                self._save_job(job)
+            else:
+                self._tokens[job_id].cancel()
+        return True
+
+    def resume(self, job_id: str) -> bool:
+        """把取消或失败的任务重新排队，从检查点继续分析"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] not in (CANCELLED, FAILED) or not os.path.exists(job['input_path']):
+                return False
+            job.update({'status': QUEUED, 'sets': [], 'finished_at': None, 'error': None})
+            self._save_job(job)
+        self._enqueue(job_id)
+        return True
+
+    def remove(self, job_id: str) -> bool:
+        """删除已结束的任务及其文件"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] in (QUEUED, RUNNING):
+                return False
+            del self._jobs[job_id]
+        shutil.rmtree(os.path.join(self.jobs_dir, job_id), ignore_errors=True)
+        return True
+
+    def _create_job_dir(self):
+        """生成任务ID并创建任务目录"""
+        job_id = datetime.now().strftime('%Y%m%d_%H%M%S_') + uuid.uuid4().hex[:6]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        return job_id, job_dir
+
+    def _add_job(self, job_id: str, input_path: str, options: Optional[Dict], name: str) -> str:
+        """登记任务并放入队列"""
+        options = dict(options or {})
+        save_output = options.pop('save_output', False)
+        job = {
+            'id': job_id,
+            'name': name,
+            'status': QUEUED,
+            'progress': 0.0,
+            'current_frame': 0,
+            'total_frames': 0,
+            'sets': [],
+            'submitted_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None,
+            'options': options,
+            'input_path': input_path,
+            'output_path': os.path.join(self.jobs_dir, job_id, 'output.mp4') if save_output else None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save_job(job)
+        self._enqueue(job_id)
+        return job_id
+
+    def _load_jobs(self):
+        """从磁盘恢复任务，中断的任务重新排队"""
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            path = os.path.join(self.jobs_dir, job_id, 'job.json')
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            if job['status'] in (QUEUED, RUNNING):
+                if os.path.exists(job['input_path']):
+                    job.update({'status': QUEUED, 'progress': 0.0, 'current_frame': 0, 'sets': [],
+                                'started_at': None})
+                    self._enqueue(job_id)
+                else:
+                    job.update({'status': FAILED, 'error': '输入视频已丢失'})
+                self._save_job(job)
+            self._jobs[job_id] = job
+
+    def _enqueue(self, job_id: str):
+        self._queue.put(job_id)
+        JOBS_QUEUED.set(self._queue.qsize())
+
+    def _save_job(self, job: Dict):
+        _write_json(os.path.join(self.jobs_dir, job['id'], 'job.json'), job)
+
+    def _update(self, job_id: str, persist: bool = True, **fields):
+        """更新任务状态，persist=False 时只更新内存"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            if persist:
+                self._save_job(job)
+
+    def _worker(self):
+        """工作线程：每个任务从处理器池借用处理器"""
+        while True:
+            job_id = self._queue.get()
+            JOBS_QUEUED.set(self._queue.qsize())
+            if job_id is None:
+                break
+            with self.processor_pool.session() as processor:
+                self._run_job(processor, job_id)
+
+    def _run_job(self, processor, job_id: str):
+        """执行单个任务并保存结果"""
+        token = CancellationToken()
+        with self._lock:
+            job = self._jobs[job_id]
+            # 排队期间已被取消
+            if job['status'] != QUEUED:
+                return
+            job.update({'status': RUNNING, 'started_at': datetime.now().isoformat()})
+            self._save_job(job)
+            job = dict(job)
+            self._tokens[job_id] = token
+            self._running += 1
+            JOBS_RUNNING.set(self._running)
+
+        last_save = [time.monotonic()]
+
+        def progress_callback(progress, current, total):
+            now = time.monotonic()
+            persist = now - last_save[0] >= PROGRESS_SAVE_INTERVAL
+            if persist:
+                last_save[0] = now
+            self._update(job_id, persist, progress=progress, current_frame=current, total_frames=total)
+
+        def set_callback(set_summary):
+            # 已完成的组（不含逐帧数据）立即可见
+            summary = {key: value for key, value in set_summary.items() if key != 'columns'}
+            with self._lock:
+                sets = self._jobs[job_id].get('sets', []) + [summary]
+            self._update(job_id, sets=sets)
+
+        status = FAILED
+        try:
+            results = processor.process_video_file(
+                job['input_path'], job['output_path'], progress_callback, set_callback=set_callback,
+                checkpoint_path=os.path.join(self.jobs_dir, job_id, 'checkpoint.json'),
+                cancel_token=token, **job['options'])
+            # 取消的任务也保存部分结果
+            save_results(os.path.join(self.jobs_dir, job_id, 'result.npz'), results)
+            status = CANCELLED if results['cancelled'] else COMPLETED
+            fields = {} if results['cancelled'] else {'progress': 1.0}
+            self._update(job_id, status=status, finished_at=datetime.now().isoformat(), **fields)
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), finished_at=datetime.now().isoformat())
+        finally:
+            # 任务完成后不再需要原始视频（检查点已被删除）；取消和失败的任务保留，以便继续
+            if status == COMPLETED and os.path.exists(job['input_path']):
+                os.remove(job['input_path'])
+            with self._lock:
+                del self._tokens[job_id]
+                self._running -= 1
+                JOBS_RUNNING.set(self._running)
+            JOBS_FINISHED.inc()
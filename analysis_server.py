@@ -0,0 +1,315 @@
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+import cv2
+import numpy as np
+from bench_press_analyzer import BenchPressAnalyzer
+from inference_pool import InferencePool
+from metrics import REGISTRY
+from pose_backends import MediaPipeBackend, PoseBackend
+from result_columns import json_default
+from stream_analysis import StreamSession
+
+# 运行时指标
+SERVER_CONNECTIONS = REGISTRY.gauge('analysis_server_connections', '分析服务当前的客户端连接数')
+SERVER_FRAMES = REGISTRY.counter('analysis_server_frames_total', '分析服务收到的帧总数')
+
+# 请求帧头：头部JSON长度和负载长度（大端无符号32位）
+_PREFIX = struct.Struct('>II')
+
+# 头部JSON的最大长度和默认允许的最大帧尺寸（宽, 高），负载不超过该尺寸的原始BGR帧
+MAX_HEADER_SIZE = 64 * 1024
+MAX_FRAME_SIZE = (3840, 2160)
+
+def send_message(sock: socket.socket, header: Dict, payload: bytes = b''):
+    """发送一条请求：长度前缀 + JSON头部 + 二进制负载"""
+    encoded = json.dumps(header).encode('utf-8')
+    sock.sendall(_PREFIX.pack(len(encoded), len(payload)) + encoded + payload)
+
+def recv_message(sock: socket.socket, max_header_size: int = MAX_HEADER_SIZE,
+                 max_payload_size: int = MAX_FRAME_SIZE[0] * MAX_FRAME_SIZE[1] * 3) -> Optional[Tuple[Dict, bytes]]:
+    """接收一条请求，连接关闭时返回None；头部或负载超过上限时在读取之前抛出 ValueError"""
+    prefix = _recv_exact(sock, _PREFIX.size)
+    if prefix is None:
+        return None
+    header_size, payload_size = _PREFIX.unpack(prefix)
+    if header_size > max_header_size:
+        raise ValueError(f"请求头部过大: {header_size} 字节（上限 {max_header_size}）")
+    if payload_size > max_payload_size:
+        raise ValueError(f"请求负载过大: {payload_size} 字节（上限 {max_payload_size}）")
+    header = _recv_exact(sock, header_size)
+    payload = _recv_exact(sock, payload_size) if payload_size else b''
+    if header is None or payload is None:
+        return None
+    return json.loads(header.decode('utf-8')), payload
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            return None
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+def encode_frame(frame: np.ndarray, frame_format: str = 'jpeg', quality: int = 90) -> Tuple[Dict, bytes]:
+    """把BGR帧编码为请求的头部字段和负载"""
+    height, width = frame.shape[:2]
+    if frame_format == 'jpeg':
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG编码失败")
+        return {'format': 'jpeg', 'width': width, 'height': height}, encoded.tobytes()
+    if frame_format == 'raw':
+        return {'format': 'raw', 'width': width, 'height': height}, np.ascontiguousarray(frame).tobytes()
+    raise ValueError(f"不支持的帧格式: {frame_format}")
+
+def decode_frame(header: Dict, payload: bytes) -> Optional[np.ndarray]:
+    """按头部描述解码为BGR帧，格式错误时返回None"""
+    if header.get('format') == 'jpeg':
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if header.get('format') == 'raw':
+        width, height = header.get('width', 0), header.get('height', 0)
+        if len(payload) != width * height * 3:
+            return None
+        return np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 3)
+    return None
+
+def _set_event(set_summary: Dict) -> Dict:
+    """组汇总去掉逐帧数据后作为事件发送"""
+    return {key: value for key, value in set_summary.items() if key != 'columns'}
+
+class AnalysisServer:
+    """本地帧流分析服务
+
+    客户端（无法自行运行姿态模型的摄像头盒子）通过TCP发送JPEG或原始BGR帧，
+    服务端在共享推理池中跨客户端调度和批量推理，并按帧顺序以JSON Lines返回
+    阶段、分数和重复事件。
+
+    请求: 每条为 8 字节前缀（头部长度、负载长度）+ JSON头部 + 负载
+        {"type": "hello", "stream": "bench-1"}                 可选，命名视频流
+        {"type": "frame", "seq": 1, "timestamp": ..., "format": "jpeg"|"raw",
+         "width": w, "height": h} + 帧数据
+        {"type": "end"}                                        结束并返回汇总
+    响应: 每行一个JSON事件，type 为 result / rep / set / error / summary
+
+    头部超过 MAX_HEADER_SIZE 或负载超过 max_frame_size（宽, 高）的原始BGR帧大小的请求
+    不会被读取，服务端返回 error 事件后关闭连接。
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, workers: int = 2,
+                 backend_factory: Optional[Callable[[], PoseBackend]] = None,
+                 max_batch: int = 4, batch_wait: float = 0.005, max_in_flight: int = 4,
+                 max_frame_size: Tuple[int, int] = MAX_FRAME_SIZE):
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.max_payload_size = max_frame_size[0] * max_frame_size[1] * 3
+        # 不同客户端的帧交错进入同一个模型，MediaPipe需要使用单帧检测模式
+        self.pool = InferencePool(backend_factory or (lambda: MediaPipeBackend(static_image_mode=True)),
+                                  workers, max_batch, batch_wait)
+        self.analyzer = BenchPressAnalyzer()
+
+        self._server = None
+        self._thread = None
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> 'AnalysisServer':
+        """启动推理池和TCP服务"""
+        server = self
+
+        class ConnectionHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server.handle_connection(self.request, self.client_address)
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.pool.start()
+        self._server = Server((self.host, self.port), ConnectionHandler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='AnalysisServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止接受连接并关闭推理池"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.pool.stop()
+
+    def serve_forever(self):
+        """阻塞运行直到 Ctrl+C"""
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def handle_connection(self, sock: socket.socket, address):
+        """处理一个客户端：读取帧并提交推理，结果由发送线程按顺序返回"""
+        session = StreamSession(f'{address[0]}:{address[1]}' if address else 'local', self.analyzer)
+        # 限制每个客户端在途的帧数，客户端发送过快时在读取端形成背压
+        pending = queue.Queue(maxsize=self.max_in_flight)
+        sender = threading.Thread(target=self._send_results, args=(sock, session, pending),
+                                  name='AnalysisSender', daemon=True)
+        sender.start()
+        self._update_connections(1)
+
+        try:
+            while True:
+                message = recv_message(sock, max_payload_size=self.max_payload_size)
+                if message is None:
+                    break
+                header, payload = message
+                if header.get('type') == 'hello':
+                    session.stream_id = str(header.get('stream') or session.stream_id)
+                elif header.get('type') == 'frame':
+                    SERVER_FRAMES.inc()
+                    frame = decode_frame(header, payload)
+                    future = self.pool.submit(frame, session.stream_id) if frame is not None else None
+                    pending.put((header, future))
+                elif header.get('type') == 'end':
+                    break
+        except ValueError as e:
+            # 请求过大或格式错误：返回错误事件后关闭连接
+            pending.put(({'error': str(e)}, None))
+        except OSError:
+            pass
+        finally:
+            pending.put(None)
+            sender.join()
+            self._update_connections(-1)
+
+    def _send_results(self, sock: socket.socket, session: StreamSession, pending: queue.Queue):
+        """按提交顺序等待推理结果，更新视频流状态并返回事件"""
+        connected = True
+
+        def send(event_type: str, **fields):
+            nonlocal connected
+            if not connected:
+                return
+            event = {'type': event_type}
+            event.update(fields)
+            try:
+                sock.sendall((json.dumps(event, ensure_ascii=False, default=json_default) + '\n').encode('utf-8'))
+            except OSError:
+                # 客户端断开后继续消费结果，避免读取端阻塞
+                connected = False
+
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            header, future = item
+            seq = header.get('seq')
+            if future is None:
+                send('error', seq=seq, message=header.get('error', '无法解码帧'))
+                continue
+            try:
+                pose_data = future.result()
+            except Exception as e:
+                send('error', seq=seq, message=str(e))
+                continue
+
+            result = session.update(pose_data, header.get('timestamp'))
+            completed_set = result.pop('set_completed')
+            send('result', seq=seq, **result)
+            if result['new_rep']:
+                send('rep', seq=seq, stream=session.stream_id, rep_count=result['rep_count'])
+            if completed_set:
+                send('set', seq=seq, stream=session.stream_id, **_set_event(completed_set))
+
+        completed_set = session.finish_set()
+        if completed_set:
+            send('set', stream=session.stream_id, **_set_event(completed_set))
+        send('summary', **session.summary())
+
+    def _update_connections(self, delta: int):
+        with self._lock:
+            self._connections += delta
+            SERVER_CONNECTIONS.set(self._connections)
+
+def replay_video(video_path: str, host: str = '127.0.0.1', port: int = 9200,
+                 frame_format: str = 'jpeg', fps: Optional[float] = None,
+                 stream: Optional[str] = None) -> Dict:
+    """回放本地视频到分析服务（环回测试客户端），返回逐帧结果、重复事件和汇总
+
+    fps 为空时尽快发送；指定时按该帧率发送，模拟摄像头。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {video_path}")
+
+    sock = socket.create_connection((host, port))
+    events = {'results': [], 'reps': [], 'sets': [], 'errors': [], 'summary': None}
+    latencies = []
+    sent_at = {}
+
+    def receive():
+        with sock.makefile('r', encoding='utf-8') as reader:
+            for line in reader:
+                event = json.loads(line)
+                if event['type'] == 'result':
+                    events['results'].append(event)
+                    if event['seq'] in sent_at:
+                        latencies.append(time.perf_counter() - sent_at.pop(event['seq']))
+                elif event['type'] == 'rep':
+                    events['reps'].append(event)
+                elif event['type'] == 'set':
+                    events['sets'].append(event)
+                elif event['type'] == 'error':
+                    events['errors'].append(event)
+                elif event['type'] == 'summary':
+                    events['summary'] = event
+                    break
+
+    receiver = threading.Thread(target=receive, name='ReplayReceiver', daemon=True)
+    receiver.start()
+    start = time.perf_counter()
+    sent = 0
+    try:
+        send_message(sock, {'type': 'hello', 'stream': stream or video_path})
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            sent += 1
+            if fps:
+                delay = start + sent / fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            header, payload = encode_frame(frame, frame_format)
+            header.update({'type': 'frame', 'seq': sent, 'timestamp': time.time()})
+            sent_at[sent] = time.perf_counter()
+            send_message(sock, header, payload)
+        send_message(sock, {'type': 'end'})
+        receiver.join()
+    finally:
+        cap.release()
+        sock.close()
+
+    elapsed = time.perf_counter() - start
+    latency_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    events['stats'] = {
+        'sent_frames': sent,
+        'received_results': len(events['results']),
+        'fps': sent / elapsed if elapsed > 0 else 0.0,
+        'latency_p50_ms': float(np.percentile(latency_ms, 50)),
+        'latency_p95_ms': float(np.percentile(latency_ms, 95))
+    }
+    return events
@@ -5,13 +5,20 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
-import tempfile
-from video_processor import VideoProcessor
+import time
+from processor_pool import ProcessorPool
 from workout_tracker import WorkoutTracker
+from metrics import start_exporter
+from analysis_jobs import AnalysisJobQueue
+from file_transfer import DownloadServer
 import cv2
 from PIL import Image
 import io
 
+# 任务列表显示的最大条数和进度刷新间隔（秒）
+JOB_LIST_LIMIT = 10
+JOB_POLL_INTERVAL = 1.0
+
 # 页面配置
 st.set_page_config(
     page_title="卧推姿势分析系统",
@@ -42,12 +49,100 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 初始化组件
+# 初始化组件：视频处理器按CPU核数组成处理器池，每个会话借用独立的处理器，共用一个锻炼跟踪器
 @st.cache_resource
 def init_components():
-    return VideoProcessor(), WorkoutTracker()
+    tracker = WorkoutTracker()
+    return ProcessorPool(tracker=tracker), tracker
+
+# 后台分析任务队列：工作线程数由 ANALYSIS_WORKERS 配置，任务和结果保存在 ANALYSIS_JOBS_DIR
+@st.cache_resource
+def init_job_queue(_processor_pool):
+    return AnalysisJobQueue(
+        os.environ.get("ANALYSIS_JOBS_DIR", os.path.join("data", "jobs")),
+        int(os.environ.get("ANALYSIS_WORKERS", "2")),
+        _processor_pool
+    ).start()
+
+# 运行时指标：本地 /metrics 接口和定期快照，整个服务只启动一次
+@st.cache_resource
+def init_metrics_exporter():
+    port = os.environ.get("METRICS_PORT", "9108")
+    return start_exporter(
+        int(port) if port else None,
+        os.environ.get("METRICS_SNAPSHOT", "metrics_snapshot.json")
+    )
+
+# 结果视频下载服务：有分析任务时启动，从磁盘分块发送各任务的结果视频，端口由 DOWNLOAD_PORT 配置；
+# 浏览器不能直接访问该端口时用 DOWNLOAD_BASE_URL 指定地址前缀（如反向代理地址）
+@st.cache_resource
+def init_download_server(jobs_dir):
+    try:
+        return DownloadServer(
+            jobs_dir,
+            int(os.environ.get("DOWNLOAD_PORT", "8502")),
+            os.environ.get("DOWNLOAD_HOST", "127.0.0.1"),
+            patterns=('*/output.mp4',)
+        ).start()
+    except OSError as e:
+        print(f"下载服务启动失败: {e}")
+        return None
 
-processor, tracker = init_components()
+def show_analysis_results(results, output_path, download_server=None) -> bool:
+    """显示视频分析结果，页面上生成了下载按钮时返回True"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("总重复次数", results['total_reps'])
+    with col2:
+        st.metric("平均分数", f"{results['average_score']:.1f}")
+    with col3:
+        st.metric("训练时长", f"{results['duration']:.1f}秒")
+    
+    # 详细结果
+    st.subheader("详细分析结果")
+    if results['sets']:
+        sets_data = []
+        for i, set_data in enumerate(results['sets']):
+            sets_data.append({
+                '组数': i + 1,
+                '重复次数': set_data['reps'],
+                '平均分数': f"{set_data['average_score']:.1f}",
+                '时长(秒)': f"{set_data['duration']:.1f}"
+            })
+        
+        df = pd.DataFrame(sets_data)
+        st.dataframe(df, use_container_width=True)
+        
+        # 分数分布图
+        scores = [set_data['average_score'] for set_data in results['sets']]
+        fig = px.histogram(
+            x=scores,
+            title="分数分布",
+            labels={'x': '分数', 'y': '频次'},
+            nbins=10
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # 下载结果视频：由下载服务从磁盘发送；服务不可用时 st.download_button 会把整个文件读入内存，
+    # 所以只在点击“准备下载”的这次运行中生成按钮
+    if output_path and os.path.exists(output_path):
+        if download_server is not None and download_server.serves(output_path):
+            url = download_server.url_for(output_path, os.environ.get("DOWNLOAD_BASE_URL"))
+            st.markdown(f"[⬇️ 下载分析结果视频]({url})")
+        elif st.button("准备下载结果视频"):
+            with open(output_path, 'rb') as f:
+                st.download_button(
+                    label="下载分析结果视频",
+                    data=f,
+                    file_name="bench_press_analysis.mp4",
+                    mime="video/mp4"
+                )
+            return True
+    return False
+
+processor_pool, tracker = init_components()
+init_metrics_exporter()
+job_queue = init_job_queue(processor_pool)
 
 # 主标题
 st.markdown('<h1 class="main-header">💪 卧推姿势分析系统</h1>', unsafe_allow_html=True)
@@ -109,95 +204,92 @@ elif page == "📹 视频分析":
     )
     
     if uploaded_file is not None:
-        # 保存上传的文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            video_path = tmp_file.name
-        
         # 分析选项
         col1, col2 = st.columns(2)
         with col1:
             save_output = st.checkbox("保存分析结果视频", value=True)
         with col2:
-            show_progress = st.checkbox("显示处理进度", value=True)
+            output_quality = st.selectbox(
+                "结果视频质量",
+                ["预览 (半分辨率, 15fps)", "原始分辨率"],
+                help="预览视频体积只有原始输出的一小部分"
+            )
+        bench_segments_only = st.checkbox("只保留卧推片段", value=False)
         
         if st.button("开始分析", type="primary"):
-            with st.spinner("正在分析视频..."):
-                # 进度条
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                def progress_callback(progress, current, total):
-                    progress_bar.progress(progress)
-                    status_text.text(f"处理进度: {current}/{total} 帧 ({progress*100:.1f}%)")
-                
-                try:
-                    # 处理视频
-                    output_path = None
-                    if save_output:
-                        output_path = "output_analysis.mp4"
-                    
-                    results = processor.process_video_file(
-                        video_path, 
-                        output_path,
-                        progress_callback if show_progress else None
-                    )
-                    
-                    # 显示结果
-                    st.success("分析完成！")
-                    
-                    # 结果统计
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("总重复次数", results['total_reps'])
-                    with col2:
-                        st.metric("平均分数", f"{results['average_score']:.1f}")
-                    with col3:
-                        st.metric("训练时长", f"{results['duration']:.1f}秒")
-                    
-                    # 详细结果
-                    st.subheader("详细分析结果")
-                    if results['sets']:
-                        sets_data = []
-                        for i, set_data in enumerate(results['sets']):
-                            sets_data.append({
-                                '组数': i + 1,
-                                '重复次数': set_data['reps'],
-                                '平均分数': f"{set_data['average_score']:.1f}",
-                                '时长(秒)': f"{set_data['duration']:.1f}"
-                            })
-                        
-                        df = pd.DataFrame(sets_data)
-                        st.dataframe(df, use_container_width=True)
-                        
-                        # 分数分布图
-                        scores = [set_data['average_score'] for set_data in results['sets']]
-                        fig = px.histogram(
-                            x=scores,
-                            title="分数分布",
-                            labels={'x': '分数', 'y': '频次'},
-                            nbins=10
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
-                    
-                    # 下载结果视频
-                    if save_output and os.path.exists(output_path):
-                        with open(output_path, 'rb') as f:
-                            st.download_button(
-                                label="下载分析结果视频",
-                                data=f.read(),
-                                file_name="bench_press_analysis.mp4",
-                                mime="video/mp4"
-                            )
-                
-                except Exception as e:
-                    st.error(f"分析过程中出现错误: {str(e)}")
-                finally:
-                    # 清理临时文件
-                    if os.path.exists(video_path):
-                        os.unlink(video_path)
-                    if save_output and os.path.exists(output_path):
-                        os.unlink(output_path)
+            # 上传内容按块写入任务目录，提交为后台任务后立即返回
+            preview = output_quality.startswith("预览")
+            job_id = job_queue.submit_stream(uploaded_file, uploaded_file.name, {
+                'save_output': save_output,
+                'output_scale': 0.5 if preview else 1.0,
+                'output_fps': 15 if preview else None,
+                'bench_segments_only': bench_segments_only
+            })
+            st.session_state.setdefault('analysis_jobs', []).append(job_id)
+            st.session_state.selected_job = job_id
+            st.success(f"已提交分析任务: {uploaded_file.name}")
+    
+    # 分析任务列表（任务在后台运行，刷新页面不会中断）
+    jobs = job_queue.list_jobs()
+    if jobs:
+        st.subheader("分析任务")
+        status_labels = {'queued': '⏳ 排队中', 'running': '🔄 分析中', 'completed': '✅ 已完成',
+                         'failed': '❌ 失败', 'cancelled': '⏹️ 已取消'}
+        my_jobs = set(st.session_state.get('analysis_jobs', []))
+        download_server = init_download_server(job_queue.jobs_dir)
+        download_ready = False
+        
+        for job in jobs[:JOB_LIST_LIMIT]:
+            col1, col2, col3, col4 = st.columns([3, 2, 4, 1])
+            with col1:
+                st.write(("⭐ " if job['id'] in my_jobs else "") + job['name'])
+            with col2:
+                st.write(status_labels[job['status']])
+            with col3:
+                if job['status'] == 'running':
+                    st.progress(job['progress'], text=f"{job['current_frame']}/{job['total_frames']} 帧")
+                    # 分析过程中已完成的组
+                    for set_number, set_summary in enumerate(job.get('sets', []), 1):
+                        st.caption(f"第{set_number}组: {set_summary['reps']}次, "
+                                   f"平均分数 {set_summary['average_score']:.1f}")
+                elif job['status'] == 'failed':
+                    st.caption(job['error'])
+                else:
+                    st.caption(job['submitted_at'][:19].replace('T', ' '))
+            with col4:
+                # 取消和失败的任务保留检查点，继续时从中断的位置开始
+                if job['status'] in ('queued', 'running'):
+                    if st.button("取消", key=f"cancel_{job['id']}"):
+                        job_queue.cancel(job['id'])
+                        st.rerun()
+                elif job['status'] in ('cancelled', 'failed'):
+                    if st.button("继续", key=f"resume_{job['id']}"):
+                        job_queue.resume(job['id'])
+                        st.rerun()
+        
+        completed = [job for job in jobs if job['status'] == 'completed']
+        if completed:
+            ids = [job['id'] for job in completed]
+            selected = st.session_state.get('selected_job')
+            job_id = st.selectbox(
+                "查看分析结果",
+                ids,
+                index=ids.index(selected) if selected in ids else 0,
+                format_func=lambda job_id: f"{job_queue.get(job_id)['name']} ({job_id})"
+            )
+            job = job_queue.get(job_id)
+            results = job_queue.result(job_id)
+            if results:
+                download_ready = show_analysis_results(results, job['output_path'], download_server)
+            if st.button("删除该任务"):
+                job_queue.remove(job_id)
+                st.rerun()
+        
+        # 有任务未结束时定期刷新进度（刚生成下载按钮时不刷新，避免按钮消失和重复读取文件）
+        active = any(job['status'] in ('queued', 'running') for job in jobs)
+        if active and st.checkbox("自动刷新进度", value=True) and not download_ready:
+            time.sleep(JOB_POLL_INTERVAL)
+            st.rerun()
 
 elif page == "📊 数据统计":
     st.header("锻炼数据统计")
@@ -298,7 +390,8 @@ elif page == "⚡ 实时分析":
     if st.button("开始实时分析", type="primary"):
         st.warning("正在启动摄像头...")
         try:
-            processor.start_realtime_analysis()
+            with processor_pool.session() as processor:
+                processor.start_realtime_analysis()
         except Exception as e:
             st.error(f"启动失败: {str(e)}")
 
@@ -362,6 +455,18 @@ elif page == "⚙️ 设置":
     
     if st.button("保存设置"):
         st.success("设置已保存")
+    
+    st.subheader("处理器池")
+    pool_stats = processor_pool.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("使用中 / 容量", f"{pool_stats['in_use']} / {pool_stats['size']}")
+    with col2:
+        st.metric("已加载模型", pool_stats['created'])
+    with col3:
+        st.metric("等待次数", f"{pool_stats['waits']} / {pool_stats['checkouts']}")
+    with col4:
+        st.metric("平均等待", f"{pool_stats['mean_wait_ms']:.0f} ms")
 
 # 页脚
 st.markdown("---")
@@ -3,11 +3,42 @@ from typing import Dict, List, Tuple, Optional
 from pose_detection import PoseDetector
 import cv2
 
+# 动作阶段，按阶段代码排列（逐帧结果中以代码保存）
+PHASES = ('IDLE', 'SETUP', 'DOWN', 'UP', 'COMPLETE')
+
+# 姿态角度，按角度矩阵的列排列
+ANGLE_NAMES = ('shoulder_hip_angle', 'left_elbow_angle', 'right_elbow_angle',
+               'left_knee_angle', 'right_knee_angle')
+
+# 反馈代码表：第i条反馈对应反馈掩码的第i位，逐帧结果中只保存掩码
+FEEDBACK_MESSAGES = (
+    "身体没有保持平躺，请调整背部位置",
+    "左臂弯曲角度不当",
+    "右臂弯曲角度不当",
+    "左腿弯曲角度不当",
+    "右腿弯曲角度不当",
+    "手腕位置不当，应保持在肩部正上方",
+    "身体姿势不对称，请调整"
+)
+FEEDBACK_BITS = {message: 1 << i for i, message in enumerate(FEEDBACK_MESSAGES)}
+
+def feedback_mask(feedback: List[str]) -> int:
+    """把反馈列表编码为掩码"""
+    mask = 0
+    for message in feedback:
+        mask |= FEEDBACK_BITS[message]
+    return mask
+
+def feedback_messages(mask: int) -> List[str]:
+    """把反馈掩码解码为反馈列表"""
+    return [message for i, message in enumerate(FEEDBACK_MESSAGES) if mask >> i & 1]
+
 class BenchPressAnalyzer:
     """卧推姿势分析器"""
     
-    def __init__(self):
-        self.pose_detector = PoseDetector()
+    def __init__(self, pose_detector: Optional[PoseDetector] = None):
+        # 只用到几何计算，可以与视频处理器共用同一个检测器
+        self.pose_detector = pose_detector or PoseDetector()
         
         # 卧推姿势的标准角度范围
         self.standard_angles = {
@@ -19,13 +50,7 @@ class BenchPressAnalyzer:
         }
         
         # 卧推动作状态
-        self.states = {
-            'IDLE': 0,
-            'SETUP': 1,
-            'DOWN': 2,
-            'UP': 3,
-            'COMPLETE': 4
-        }
+        self.states = {phase: code for code, phase in enumerate(PHASES)}
         
     def is_bench_press_pose(self, pose_data: Dict) -> bool:
         """判断是否为卧推姿势"""
@@ -110,6 +135,7 @@ class BenchPressAnalyzer:
         return {
             'score': score,
             'feedback': feedback,
+            'feedback_mask': feedback_mask(feedback),
             'angles': angles
         }
     
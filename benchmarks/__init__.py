@@ -0,0 +1 @@
+"""性能基准测试（在项目根目录下用 python -m benchmarks.<模块名> 运行）"""
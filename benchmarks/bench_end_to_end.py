@@ -0,0 +1,137 @@
+"""端到端吞吐量基准测试：在本地生成的合成视频上运行 process_video_file
+
+对每种分辨率、时长、是否输出视频、抽帧步长和并行进程数的组合，报告
+吞吐量（帧/秒）、峰值内存（RSS）和单帧延迟分位数。
+
+用法:
+    python -m benchmarks.bench_end_to_end
+    python -m benchmarks.bench_end_to_end --resolutions 640x360,1920x1080 --strides 1,2,4 --workers 1,2,4
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from benchmarks.synthetic import ensure_video
+
+def run_single(video_path: str, output_dir: Optional[str], stride: int) -> Dict:
+    """在当前进程中处理一次视频并返回统计（在子进程中执行）"""
+    from video_processor import VideoProcessor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor = VideoProcessor()
+        # 预先加载模型，不计入处理时间
+        processor.pose_detector.backend.load()
+
+        output_path = os.path.join(output_dir, f'output_{os.getpid()}.mp4') if output_dir else None
+        start = time.perf_counter()
+        results = processor.process_video_file(video_path, output_path, profile=True,
+                                               frame_stride=stride)
+        elapsed = time.perf_counter() - start
+
+    frame_stats = results['profile']['stages'].get('frame', {})
+    return {
+        'source_frames': results['total_frames'],
+        'analyzed_frames': results['profile']['frames'],
+        'elapsed_s': elapsed,
+        'frame_p50_ms': frame_stats.get('p50_ms', 0),
+        'frame_p95_ms': frame_stats.get('p95_ms', 0),
+        'frame_p99_ms': frame_stats.get('p99_ms', 0),
+        # Linux下 ru_maxrss 单位为KB
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+def run_config(video_path: str, output: bool, stride: int, workers: int, work_dir: str) -> Dict:
+    """以指定并行进程数同时处理同一视频，汇总吞吐量和延迟"""
+    context = multiprocessing.get_context('spawn')
+    output_dir = work_dir if output else None
+    with context.Pool(workers) as pool:
+        runs = pool.starmap(run_single, [(video_path, output_dir, stride)] * workers)
+
+    # 以最慢的进程作为整体耗时
+    wall_time = max(run['elapsed_s'] for run in runs)
+    source_frames = sum(run['source_frames'] for run in runs)
+    analyzed_frames = sum(run['analyzed_frames'] for run in runs)
+    return {
+        'output': output,
+        'stride': stride,
+        'workers': workers,
+        'wall_time_s': wall_time,
+        'source_fps': source_frames / wall_time if wall_time > 0 else 0,
+        'analyzed_fps': analyzed_frames / wall_time if wall_time > 0 else 0,
+        'frame_p50_ms': max(run['frame_p50_ms'] for run in runs),
+        'frame_p95_ms': max(run['frame_p95_ms'] for run in runs),
+        'frame_p99_ms': max(run['frame_p99_ms'] for run in runs),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs)
+    }
+
+def parse_list(value: str, cast=int) -> List:
+    """解析逗号分隔的参数"""
+    return [cast(item) for item in value.split(',') if item]
+
+def parse_resolution(value: str):
+    """解析 1280x720 形式的分辨率"""
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="端到端吞吐量基准测试")
+    parser.add_argument("--resolutions", default="640x360,1280x720,1920x1080")
+    parser.add_argument("--lengths", default="300", help="视频帧数，逗号分隔")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--output", choices=["off", "on", "both"], default="both",
+                        help="是否同时输出标注视频")
+    parser.add_argument("--strides", default="1,2")
+    parser.add_argument("--workers", default="1,2")
+    parser.add_argument("--video-dir", default=os.path.join(tempfile.gettempdir(), 'bench_videos'))
+    parser.add_argument("--json", default=None, help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    resolutions = parse_list(args.resolutions, parse_resolution)
+    lengths = parse_list(args.lengths)
+    outputs = {'off': [False], 'on': [True], 'both': [False, True]}[args.output]
+    strides = parse_list(args.strides)
+    workers_list = parse_list(args.workers)
+
+    results = []
+    print(f"{'分辨率':<12}{'帧数':>6}{'输出':>6}{'步长':>6}{'进程':>6}{'源FPS':>10}{'分析FPS':>10}"
+          f"{'P50ms':>9}{'P95ms':>9}{'P99ms':>9}{'峰值RSS':>10}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for (width, height), frames in itertools.product(resolutions, lengths):
+            video_path = ensure_video(args.video_dir, (width, height), frames, args.fps)
+            for output, stride, workers in itertools.product(outputs, strides, workers_list):
+                result = run_config(video_path, output, stride, workers, work_dir)
+                result.update({'resolution': f'{width}x{height}', 'frames': frames})
+                results.append(result)
+                print(f"{result['resolution']:<12}{frames:>6}{'是' if output else '否':>6}{stride:>6}"
+                      f"{workers:>6}{result['source_fps']:>10.1f}{result['analyzed_fps']:>10.1f}"
+                      f"{result['frame_p50_ms']:>9.1f}{result['frame_p95_ms']:>9.1f}"
+                      f"{result['frame_p99_ms']:>9.1f}{result['peak_rss_mb']:>8.0f}MB")
+
+    if args.json:
+        report = {
+            'created_at': datetime.now().isoformat(),
+            'machine': {
+                'platform': platform.platform(),
+                'processor': platform.processor(),
+                'cpu_count': os.cpu_count()
+            },
+            'results': results
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""帧缓冲池基准测试：比较逐帧分配与缓冲池复用的分配次数和吞吐量
+
+用法: python -m benchmarks.bench_frame_pool [--width 1920 --height 1080 --frames 300]
+"""
+
+import argparse
+import cv2
+import json
+import numpy as np
+import os
+import tempfile
+import time
+from typing import Dict
+from benchmarks.synthetic import ensure_video
+from frame_pool import FramePool
+
+def run_baseline(video_path: str) -> Dict:
+    """原有流程：cap.read()、cvtColor 和 frame.copy() 每帧各分配一个新数组"""
+    cap = cv2.VideoCapture(video_path)
+    frames = 0
+    allocations = 0
+    frame_bytes = 0
+
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+        frame_bytes = frame.nbytes
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        annotated_frame = frame.copy()
+        allocations += 3
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    return _summary('逐帧分配', frames, allocations, frame_bytes, elapsed)
+
+def run_pooled(video_path: str) -> Dict:
+    """缓冲池流程：解码和颜色转换写入复用的数组，绘制在原帧上进行"""
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    pool = FramePool((height, width, 3))
+    rgb_buffer = None
+    frames = 0
+    fallback_allocations = 0
+    rgb_allocations = 0
+    frame_bytes = 0
+
+    start = time.perf_counter()
+    while True:
+        buffer = pool.acquire()
+        ret, frame = cap.read(image=buffer)
+        if not ret:
+            pool.release(buffer)
+            break
+        frames += 1
+        frame_bytes = frame.nbytes
+        if frame is not buffer:
+            # 后端没有使用传入的缓冲区
+            fallback_allocations += 1
+
+        if rgb_buffer is None or rgb_buffer.shape != frame.shape:
+            rgb_buffer = np.empty_like(frame)
+            rgb_allocations += 1
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buffer)
+        if frame_rgb is not rgb_buffer:
+            fallback_allocations += 1
+
+        # 原地绘制后交还缓冲池
+        annotated_frame = frame
+        pool.release(annotated_frame)
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    allocations = pool.allocations + rgb_allocations + fallback_allocations
+    return _summary('缓冲池复用', frames, allocations, frame_bytes, elapsed)
+
+def _summary(name: str, frames: int, allocations: int, frame_bytes: int, elapsed: float) -> Dict:
+    """整理单个流程的统计结果"""
+    return {
+        'name': name,
+        'frames': frames,
+        'allocations': allocations,
+        'allocations_per_frame': allocations / frames if frames else 0,
+        'allocated_mb_per_s': allocations * frame_bytes / elapsed / 1e6 if elapsed > 0 else 0,
+        'fps': frames / elapsed if elapsed > 0 else 0
+    }
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="帧缓冲池基准测试")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--video-dir", default=os.path.join(tempfile.gettempdir(), 'bench_videos'))
+    parser.add_argument("--json", default=None, help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    video_path = ensure_video(args.video_dir, (args.width, args.height), args.frames, args.fps)
+    print(f"测试视频: {video_path}")
+
+    # 先各跑一遍预热解码器和文件缓存
+    run_baseline(video_path)
+    results = [run_baseline(video_path), run_pooled(video_path)]
+
+    print(f"{'流程':<10}{'帧数':>8}{'分配次数':>10}{'每帧分配':>10}{'分配MB/s':>12}{'FPS':>10}")
+    for result in results:
+        print(f"{result['name']:<10}{result['frames']:>8}{result['allocations']:>10}"
+              f"{result['allocations_per_frame']:>10.2f}{result['allocated_mb_per_s']:>12.1f}"
+              f"{result['fps']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""分析器、几何计算和数据跟踪器热点路径的微基准测试
+
+不需要摄像头或MediaPipe，全部使用合成的关键点序列。
+
+用法:
+    python -m benchmarks.bench_hot_paths                          # 运行并打印结果
+    python -m benchmarks.bench_hot_paths --save baseline.json     # 保存为基线
+    python -m benchmarks.bench_hot_paths --compare baseline.json  # 与基线比较，变慢超过阈值时返回非零
+
+比较使用各轮中的最小耗时；变慢不超过 --noise-floor（绝对值）的不算回退，超过阈值的用例
+会重新测量，复测后仍然超过才判定为性能回退。
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+from benchmarks.synthetic import synthetic_pose_sequence, synthetic_set_data
+from bench_press_analyzer import BenchPressAnalyzer
+from frame_query import FrameIndex
+from pose_detection import PoseDetector
+from rep_analysis import analyze_reps
+from result_columns import SetColumns, load_results, results_to_json, save_results
+from video_processor import VideoProcessor
+from workout_tracker import WorkoutTracker
+
+DEFAULT_HISTORY_SIZES = [10, 1000, 100000]
+
+# 超过阈值的用例复测时每轮的最短计时时间（秒）和重复轮数
+RECHECK_MIN_TIME = 0.5
+RECHECK_REPEATS = 7
+
+def time_operation(operation: Callable[[], None], min_time: float = 0.2, repeats: int = 5) -> Dict:
+    """自动确定迭代次数并多次重复计时，返回每次操作的耗时（纳秒）
+
+    与 timeit 一样，计时期间关闭垃圾回收。
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _time_operation(operation, min_time, repeats)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _time_operation(operation: Callable[[], None], min_time: float, repeats: int) -> Dict:
+    # 估算迭代次数，使每轮至少运行 min_time 秒
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or iterations >= 1 << 20:
+            break
+        iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9)))
+
+    # 单次就很慢的操作减少重复次数
+    if elapsed > min_time * 5:
+        repeats = min(repeats, 3)
+
+    per_op = [elapsed / iterations]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            operation()
+        per_op.append((time.perf_counter() - start) / iterations)
+
+    return {
+        'ns_per_op': statistics.median(per_op) * 1e9,
+        'min_ns_per_op': min(per_op) * 1e9,
+        'iterations': iterations,
+        'repeats': len(per_op)
+    }
+
+def build_history(size: int, seed_time: datetime) -> Dict:
+    """构造指定条数的历史锻炼数据，时间均匀分布在过去一年"""
+    workouts = []
+    for i in range(size):
+        start = seed_time - timedelta(minutes=int(i * 365 * 24 * 60 / max(size, 1)))
+        sets = [{
+            'set_number': n + 1,
+            'reps': 8,
+            'score': 80.0 + n,
+            'phase_data': [],
+            'timestamp': start.isoformat(),
+            'notes': ''
+        } for n in range(3)]
+        workouts.append({
+            'id': f'bench_{i:06d}',
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=45)).isoformat(),
+            'sets': sets,
+            'total_reps': 24,
+            'total_sets': 3,
+            'average_score': 81.0,
+            'best_score': 82.0,
+            'duration': 2700,
+            'notes': ''
+        })
+    workouts.reverse()
+    return {'workouts': workouts, 'statistics': {}}
+
+def analyzer_cases() -> Dict[str, Callable[[], None]]:
+    """几何计算与姿势分析的基准用例"""
+    detector = PoseDetector()
+    analyzer = BenchPressAnalyzer(detector)
+    processor = VideoProcessor()
+
+    sequence = synthetic_pose_sequence(300)
+    key_points = [detector.get_key_points(pose_data) for pose_data in sequence]
+    set_data = synthetic_set_data(900)
+    set_columns = SetColumns.from_frames(set_data)
+    state = {'i': 0}
+
+    def next_index():
+        state['i'] = (state['i'] + 1) % len(sequence)
+        return state['i']
+
+    return {
+        'calculate_angle': lambda: detector.calculate_angle((0.3, 0.5), (0.4, 0.45), (0.3, 0.4)),
+        'calculate_pose_angles': lambda: analyzer._calculate_pose_angles(key_points[next_index()]),
+        'analyze_pose_quality': lambda: analyzer.analyze_pose_quality(sequence[next_index()]),
+        'detect_bench_press_phase': lambda: analyzer.detect_bench_press_phase(sequence[next_index()]),
+        'analyze_set_900_frames': lambda: processor._analyze_set(set_data),
+        'analyze_reps_900_frames': lambda: analyze_reps(set_columns)
+    }
+
+def tracker_cases(size: int, directory: str) -> Dict[str, Callable[[], None]]:
+    """锻炼跟踪器在指定历史规模下的基准用例"""
+    data_file = os.path.join(directory, f'history_{size}.json')
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(build_history(size, datetime.now()), f)
+
+    tracker = WorkoutTracker(data_file)
+    workout_id = tracker.start_workout()
+    workout = tracker._find_workout(workout_id)
+    phase_data = synthetic_set_data(30)
+
+    def add_set():
+        tracker.add_set(workout_id, 8, 85.0, phase_data)
+        # 移除刚添加的组，保证每次测量的数据规模相同
+        workout['sets'].pop()
+
+    def uncached_statistics():
+        # 清空查询缓存，测量完整扫描历史的耗时
+        tracker._query_cache.clear()
+        tracker.get_statistics(30)
+
+    return {
+        f'tracker_add_set_{size}': add_set,
+        f'tracker_get_statistics_{size}': uncached_statistics,
+        f'tracker_get_statistics_cached_{size}': lambda: tracker.get_statistics(30)
+    }
+
+def result_cases(directory: str) -> Dict[str, Callable[[], None]]:
+    """分析结果序列化的基准用例（10组、每组900帧）"""
+    processor = VideoProcessor()
+    results = {'sets': [processor._analyze_set(synthetic_set_data(900, seed=seed)) for seed in range(10)]}
+    path = os.path.join(directory, 'results.npz')
+    save_results(path, results)
+
+    return {
+        'save_results_9000_frames': lambda: save_results(path, results),
+        'load_results_9000_frames': lambda: load_results(path),
+        'results_to_json_9000_frames': lambda: results_to_json(results, per_frame=True)
+    }
+
+def frame_query_cases(workouts: int = 1000) -> Dict[str, Callable[[], None]]:
+    """逐帧查询的基准用例：约三年的历史，每次锻炼3组、每组300帧"""
+    phase_data = synthetic_set_data(300)
+    history = build_history(workouts, datetime.now())
+    for workout in history['workouts']:
+        for set_data in workout['sets']:
+            set_data['phase_data'] = phase_data
+    index = FrameIndex.build(history['workouts'])
+    frames = len(index)
+
+    def reps_below():
+        rows = index.select(days=90, phases=['DOWN'])
+        index.group_by(rows, ('workout', 'set', 'rep'), 'elbow_angle', ['min'])
+
+    return {
+        f'frame_query_select_{frames}': lambda: index.select(days=90, phases=['DOWN'], angles={'elbow_angle': (None, 75)}),
+        f'frame_query_reps_{frames}': reps_below,
+        f'frame_query_weekly_{frames}': lambda: index.group_by(index.select(), ('week', 'phase'), 'score',
+                                                              ['count', 'mean', 'std'])
+    }
+
+def all_cases(history_sizes: List[int], directory: str) -> Dict[str, Callable[[], None]]:
+    """全部基准用例（临时文件写在 directory 中）"""
+    cases = {}
+    cases.update(analyzer_cases())
+    cases.update(frame_query_cases())
+    cases.update(result_cases(directory))
+    for size in history_sizes:
+        cases.update(tracker_cases(size, directory))
+    return cases
+
+def run_benchmarks(cases: Dict[str, Callable[[], None]], min_time: float) -> Dict:
+    """运行全部基准用例"""
+    results = {}
+
+    for name, operation in cases.items():
+        results[name] = time_operation(operation, min_time)
+        print(f"  {name:<36}{results[name]['min_ns_per_op'] / 1000:>12.2f} µs")
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+def is_regression(result: Dict, base: Dict, threshold: float, noise_floor_ns: float) -> bool:
+    """最小耗时变慢超过阈值比例，且增加的绝对耗时超过噪声下限"""
+    slowdown = result['min_ns_per_op'] - base['min_ns_per_op']
+    return slowdown > base['min_ns_per_op'] * threshold and slowdown > noise_floor_ns
+
+def compare(current: Dict, baseline: Dict, threshold: float, noise_floor_ns: float = 0.0) -> List[str]:
+    """与基线比较，返回变慢超过阈值的用例
+
+    使用各轮中的最小耗时比较，受机器负载波动的影响最小。
+    """
+    regressions = []
+    print(f"\n{'用例':<36}{'基线µs':>12}{'当前µs':>12}{'变化':>10}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base:
+            print(f"{name:<36}{'-':>12}{result['min_ns_per_op'] / 1000:>12.2f}{'新增':>10}")
+            continue
+        ratio = result['min_ns_per_op'] / base['min_ns_per_op']
+        regressed = is_regression(result, base, threshold, noise_floor_ns)
+        flag = ' ❌' if regressed else ''
+        print(f"{name:<36}{base['min_ns_per_op'] / 1000:>12.2f}{result['min_ns_per_op'] / 1000:>12.2f}"
+              f"{(ratio - 1) * 100:>+9.1f}%{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+def recheck(names: List[str], cases: Dict[str, Callable[[], None]], current: Dict, baseline: Dict,
+            threshold: float, noise_floor_ns: float, min_time: float, rounds: int) -> List[str]:
+    """重新测量超过阈值的用例，保留所有测量中的最小耗时，返回复测后仍然回退的用例"""
+    for _ in range(rounds):
+        if not names:
+            break
+        print(f"\n复测: {', '.join(names)}")
+        still_regressed = []
+        for name in names:
+            result = current['results'][name]
+            retry = time_operation(cases[name], max(min_time, RECHECK_MIN_TIME), RECHECK_REPEATS)
+            result['min_ns_per_op'] = min(result['min_ns_per_op'], retry['min_ns_per_op'])
+            print(f"  {name:<36}{result['min_ns_per_op'] / 1000:>12.2f} µs")
+            if is_regression(result, baseline['results'][name], threshold, noise_floor_ns):
+                still_regressed.append(name)
+        names = still_regressed
+    return names
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="热点路径微基准测试")
+    parser.add_argument("--sizes", default=','.join(str(size) for size in DEFAULT_HISTORY_SIZES),
+                        help="锻炼历史规模，逗号分隔")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮计时的最短时间（秒）")
+    parser.add_argument("--save", default=None, help="把结果保存为基线JSON")
+    parser.add_argument("--compare", default=None, help="与基线JSON比较")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="允许的变慢比例，超过则判定为性能回退（默认0.25即25%%）")
+    parser.add_argument("--noise-floor", type=float, default=1.0,
+                        help="变慢的绝对耗时不超过该值（微秒）时不算回退，避免亚微秒级用例误报")
+    parser.add_argument("--rechecks", type=int, default=3, help="超过阈值的用例最多复测的次数")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    print("运行热点路径基准测试...")
+    with tempfile.TemporaryDirectory() as directory:
+        cases = all_cases(sizes, directory)
+        current = run_benchmarks(cases, args.min_time)
+
+        if args.save:
+            with open(args.save, 'w', encoding='utf-8') as f:
+                json.dump(current, f, ensure_ascii=False, indent=2)
+            print(f"\n基线已保存: {args.save}")
+
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            noise_floor_ns = args.noise_floor * 1000
+            regressions = compare(current, baseline, args.threshold, noise_floor_ns)
+            regressions = recheck(regressions, cases, current, baseline, args.threshold,
+                                  noise_floor_ns, args.min_time, args.rechecks)
+            if regressions:
+                print(f"\n性能回退: {', '.join(regressions)}")
+                sys.exit(1)
+            print("\n没有超过阈值的性能回退")
+
+if __name__ == "__main__":
+    main()
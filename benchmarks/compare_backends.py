@@ -0,0 +1,251 @@
+"""姿态后端/模型对比：在同一组本地视频上比较速度与分析结果的一致性
+
+对每种检测配置（默认 MediaPipe 复杂度 0/1/2 以及其他已安装的后端）逐帧记录推理延迟，
+并以参考配置为基准比较关键点、角度、动作阶段和重复次数，输出速度与一致性的对照表，
+用于选择不改变 BenchPressAnalyzer 结论的最轻量模型。
+
+用法:
+    python -m benchmarks.compare_backends --videos a.mp4,b.mp4
+    python -m benchmarks.compare_backends --videos a.mp4 --configs mediapipe:0,mediapipe:1 --reference mediapipe:1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+import cv2
+import numpy as np
+from benchmarks.synthetic import ensure_video
+from pose_backends import available_backends, create_backend
+
+# 参与比较的角度
+COMPARED_ANGLES = ('left_elbow_angle', 'right_elbow_angle', 'left_knee_angle', 'right_knee_angle')
+
+# 关键点误差只统计分析器用到的关键点
+KEY_LANDMARKS = [0, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28]
+
+def default_configs() -> List[str]:
+    """默认参与比较的配置：MediaPipe三种复杂度和其他真实模型后端"""
+    configs = []
+    for name in available_backends():
+        if name == 'mediapipe':
+            configs.extend(f'mediapipe:{complexity}' for complexity in (0, 1, 2))
+        elif name != 'fake':
+            # 模拟后端不读取图像，比较它没有意义
+            configs.append(name)
+    return configs
+
+def build_backend(config: str):
+    """按 "后端名[:模型复杂度]" 创建后端"""
+    name, _, complexity = config.partition(':')
+    kwargs = {'model_complexity': int(complexity)} if complexity else {}
+    return create_backend(name, **kwargs)
+
+def run_config(config: str, video_path: str) -> Dict:
+    """用一种配置逐帧分析视频，返回每帧延迟、关键点和分析结果"""
+    from video_processor import VideoProcessor
+
+    backend = build_backend(config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # 模型加载不计入延迟
+        backend.load()
+        processor = VideoProcessor(backend)
+
+    detector = processor.pose_detector
+    analyzer = processor.analyzer
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+
+    latencies = []
+    frames = []
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            start = time.perf_counter()
+            pose_data = detector.detect_pose(frame)
+            latencies.append(time.perf_counter() - start)
+
+            outcome = {'landmarks': None, 'angles': None, 'is_bench_press': False, 'phase': None}
+            if pose_data:
+                key_points = detector.get_key_points(pose_data)
+                outcome['landmarks'] = pose_data['landmarks']
+                outcome['angles'] = analyzer._calculate_pose_angles(key_points)
+                outcome['is_bench_press'] = analyzer.is_bench_press_pose(pose_data)
+                if outcome['is_bench_press']:
+                    outcome['phase'] = analyzer.detect_bench_press_phase(pose_data)
+            frames.append(outcome)
+    finally:
+        cap.release()
+        backend.close()
+
+    return {
+        'latencies': latencies,
+        'frames': frames,
+        'reps': count_reps(processor, frames, fps)
+    }
+
+def count_reps(processor, frames: List[Dict], fps: float) -> int:
+    """按 process_video_file 的分组规则统计总重复次数"""
+    total = 0
+    current_set = []
+    for index, frame in enumerate(frames, 1):
+        if frame['is_bench_press']:
+            current_set.append({'frame': index, 'timestamp': index / fps,
+                                'phase': frame['phase'], 'score': 0.0})
+        elif frame['landmarks'] is not None and current_set:
+            total += processor._analyze_set(current_set)['reps']
+            current_set = []
+    if current_set:
+        total += processor._analyze_set(current_set)['reps']
+    return total
+
+def compare_runs(reference: Dict, candidate: Dict) -> Dict:
+    """比较候选配置与参考配置的逐帧结果"""
+    pairs = list(zip(reference['frames'], candidate['frames']))
+    both = [(ref, cand) for ref, cand in pairs
+            if ref['landmarks'] is not None and cand['landmarks'] is not None]
+
+    landmark_error = None
+    angle_error = None
+    if both:
+        ref_points = np.stack([ref['landmarks'][KEY_LANDMARKS, :2] for ref, _ in both])
+        cand_points = np.stack([cand['landmarks'][KEY_LANDMARKS, :2] for _, cand in both])
+        landmark_error = float(np.linalg.norm(ref_points - cand_points, axis=2).mean())
+        angle_error = float(np.mean([abs(ref['angles'][name] - cand['angles'][name])
+                                     for ref, cand in both for name in COMPARED_ANGLES]))
+
+    def agreement(key):
+        if not pairs:
+            return None
+        return sum(ref[key] == cand[key] for ref, cand in pairs) / len(pairs)
+
+    return {
+        'detection_agreement': (sum((ref['landmarks'] is None) == (cand['landmarks'] is None)
+                                    for ref, cand in pairs) / len(pairs)) if pairs else None,
+        'landmark_error': landmark_error,
+        'angle_error_deg': angle_error,
+        'bench_press_agreement': agreement('is_bench_press'),
+        'phase_agreement': agreement('phase'),
+        'reps': candidate['reps'],
+        'reference_reps': reference['reps']
+    }
+
+def latency_summary(latencies: List[float]) -> Dict:
+    """延迟统计（毫秒）"""
+    if not latencies:
+        return {'frames': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'fps': 0.0}
+    values = np.array(latencies) * 1000
+    return {
+        'frames': len(values),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'fps': float(1000 / values.mean()) if values.mean() > 0 else 0.0
+    }
+
+def compare_backends(configs: List[str], reference: str, videos: List[str]) -> List[Dict]:
+    """在所有视频上运行各配置，并按配置汇总速度和一致性"""
+    if reference not in configs:
+        configs = [reference] + configs
+
+    runs = {config: [] for config in configs}
+    for video_path in videos:
+        for config in configs:
+            if runs[config] is None:
+                continue
+            try:
+                runs[config].append(run_config(config, video_path))
+            except Exception as e:
+                # 模型无法加载（如未下载）时跳过该配置，参考配置失败则无法比较
+                if config == reference:
+                    raise
+                print(f"⚠️ 跳过 {config}: {e}")
+                runs[config] = None
+
+    reference_latency = latency_summary([latency for run in runs[reference] for latency in run['latencies']])
+    rows = []
+    for config in configs:
+        if runs[config] is None:
+            continue
+        speed = latency_summary([latency for run in runs[config] for latency in run['latencies']])
+        # 各视频的一致性按帧数加权合并
+        per_video = [compare_runs(ref_run, run) for ref_run, run in zip(runs[reference], runs[config])]
+        weights = [len(run['frames']) for run in runs[config]]
+        row = {'config': config, 'reference': config == reference, **speed,
+               'speedup': reference_latency['mean_ms'] / speed['mean_ms'] if speed['mean_ms'] else 0.0}
+        for key in ('detection_agreement', 'landmark_error', 'angle_error_deg',
+                    'bench_press_agreement', 'phase_agreement'):
+            values = [(result[key], weight) for result, weight in zip(per_video, weights)
+                      if result[key] is not None]
+            row[key] = (sum(value * weight for value, weight in values) /
+                        sum(weight for _, weight in values)) if values else None
+        row['reps'] = sum(result['reps'] for result in per_video)
+        row['reference_reps'] = sum(result['reference_reps'] for result in per_video)
+        rows.append(row)
+    return rows
+
+def print_table(rows: List[Dict]):
+    """打印速度与一致性对照表"""
+    def fmt(value, pattern, scale=1):
+        return '-' if value is None else format(value * scale, pattern)
+
+    print(f"\n{'配置':<16}{'P50ms':>9}{'P95ms':>9}{'FPS':>10}{'加速':>7}{'检出一致':>9}"
+          f"{'关键点误差':>10}{'角度误差°':>10}{'卧推一致':>9}{'阶段一致':>9}{'次数':>8}")
+    for row in rows:
+        name = row['config'] + (' *' if row['reference'] else '')
+        print(f"{name:<16}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['fps']:>10.1f}"
+              f"{row['speedup']:>6.2f}x{fmt(row['detection_agreement'], '>8.1f', 100)}%"
+              f"{fmt(row['landmark_error'], '>10.4f')}{fmt(row['angle_error_deg'], '>10.1f')}"
+              f"{fmt(row['bench_press_agreement'], '>8.1f', 100)}%{fmt(row['phase_agreement'], '>8.1f', 100)}%"
+              f"{row['reps']:>4}/{row['reference_reps']:<3}")
+    print("* 参考配置；关键点误差为归一化坐标下的平均距离；次数为 候选/参考")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="姿态后端速度与一致性对比")
+    parser.add_argument("--videos", default=None,
+                        help="本地视频路径，逗号分隔（默认使用合成视频，只能比较速度）")
+    parser.add_argument("--configs", default=None,
+                        help="参与比较的配置，如 mediapipe:0,mediapipe:1（默认全部已安装的后端）")
+    parser.add_argument("--reference", default="mediapipe:2", help="作为基准的配置")
+    parser.add_argument("--json", default=None, help="结果写入的JSON文件")
+    args = parser.parse_args()
+
+    configs = [config for config in args.configs.split(',') if config] if args.configs else default_configs()
+    if args.videos:
+        videos = [path for path in args.videos.split(',') if path]
+    else:
+        videos = [ensure_video(os.path.join(tempfile.gettempdir(), 'bench_videos'), (640, 360), 150)]
+
+    print(f"对比配置: {', '.join(configs)}，参考: {args.reference}，视频数: {len(videos)}")
+    rows = compare_backends(configs, args.reference, videos)
+    print_table(rows)
+
+    if args.json:
+        report = {
+            'created_at': datetime.now().isoformat(),
+            'machine': {
+                'platform': platform.platform(),
+                'processor': platform.processor(),
+                'cpu_count': os.cpu_count()
+            },
+            'reference': args.reference,
+            'videos': videos,
+            'results': rows
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""合成测试数据：本地生成的视频，不依赖摄像头或真实录像"""
+
+import cv2
+import numpy as np
+import os
+from typing import Tuple
+from pose_backends import bench_press_sequence
+
+def generate_video(path: str, size: Tuple[int, int] = (1280, 720), frames: int = 120,
+                   fps: int = 30, fourcc: str = 'mp4v') -> str:
+    """生成带有移动图形和噪声的测试视频，返回文件路径"""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f"无法创建测试视频: {path}")
+
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+    frame = np.empty_like(background)
+
+    for i in range(frames):
+        np.copyto(frame, background)
+        _draw_lifter(frame, i, fps)
+        writer.write(frame)
+
+    writer.release()
+    return path
+
+def generate_session_video(path: str, size: Tuple[int, int] = (640, 360), sets: int = 2,
+                           set_frames: int = 60, rest_frames: int = 180, fps: int = 30,
+                           fourcc: str = 'mp4v') -> str:
+    """生成以休息为主的训练录像：静止的休息画面和运动的组交替出现，返回文件路径"""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f"无法创建测试视频: {path}")
+
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+    frame = np.empty_like(background)
+
+    for _ in range(sets):
+        # 休息：画面保持在上一组结束时的位置
+        np.copyto(frame, background)
+        _draw_lifter(frame, 0, fps)
+        for _ in range(rest_frames):
+            writer.write(frame)
+        for i in range(set_frames):
+            np.copyto(frame, background)
+            _draw_lifter(frame, i, fps)
+            writer.write(frame)
+
+    writer.release()
+    return path
+
+def _draw_lifter(frame: np.ndarray, i: int, fps: int):
+    """绘制第 i 帧的杠铃和手臂（模拟上下运动）"""
+    height, width = frame.shape[:2]
+    offset = int((np.sin(i / fps * 2 * np.pi * 0.5) + 1) * height * 0.15)
+    center_y = height // 3 + offset
+    cv2.line(frame, (width // 4, center_y), (width * 3 // 4, center_y), (200, 200, 200), 8)
+    cv2.circle(frame, (width // 2, height * 2 // 3), height // 10, (90, 140, 200), -1)
+    cv2.line(frame, (width // 2, height * 2 // 3), (width // 3, center_y), (90, 140, 200), 12)
+    cv2.line(frame, (width // 2, height * 2 // 3), (width * 2 // 3, center_y), (90, 140, 200), 12)
+
+def ensure_video(directory: str, size: Tuple[int, int], frames: int, fps: int = 30) -> str:
+    """按尺寸和帧数缓存生成的视频，已存在则直接复用"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'synthetic_{size[0]}x{size[1]}_{frames}f_{fps}fps.mp4')
+    if not os.path.exists(path):
+        generate_video(path, size, frames, fps)
+    return path
+
+def synthetic_pose_sequence(frames: int, fps: int = 30, rep_seconds: float = 2.0,
+                            jitter: float = 0.002, seed: int = 0) -> list:
+    """生成连续卧推动作的姿态数据序列（与 PoseDetector.detect_pose 的输出格式一致）"""
+    return [{'landmarks': landmarks}
+            for landmarks in bench_press_sequence(frames, fps, rep_seconds, jitter, seed)]
+
+def synthetic_set_data(frames: int, fps: int = 30, rep_seconds: float = 2.0, seed: int = 0) -> list:
+    """生成一组的逐帧分析数据（与 process_video_file 记录的格式一致）"""
+    rng = np.random.default_rng(seed)
+    data = []
+    for i in range(frames):
+        cycle = (1 - np.cos(2 * np.pi * i / (fps * rep_seconds))) / 2
+        elbow = 170 - 100 * cycle
+        phase = 'DOWN' if elbow < 90 else 'UP' if elbow > 160 else 'SETUP'
+        data.append({
+            'frame': i + 1,
+            'timestamp': (i + 1) / fps,
+            'phase': phase,
+            'score': float(rng.uniform(60, 100)),
+            'angles': {
+                'shoulder_hip_angle': 175.0,
+                'left_elbow_angle': elbow,
+                'right_elbow_angle': elbow + float(rng.normal(0, 2)),
+                'left_knee_angle': 90.0,
+                'right_knee_angle': 90.0
+            },
+            'feedback_mask': 0
+        })
+    return data
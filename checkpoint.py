@@ -0,0 +1,102 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+from result_columns import SetColumns, json_default
+
+class CancellationToken:
+    """取消令牌：其他线程调用 cancel() 后，分析在当前帧结束时停止并返回部分结果"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """请求取消"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+def checkpoint_key(video_path: str, config: Dict) -> str:
+    """由视频文件（路径、大小、修改时间）和分析配置生成检查点标识，任何一项变化都不会恢复旧进度"""
+    stat = os.stat(video_path)
+    identity = {
+        'video': os.path.realpath(video_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'config': config
+    }
+    encoded = json.dumps(identity, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+class AnalysisCheckpoint:
+    """长视频分析的检查点
+
+    文件名中带有 key（checkpoint.json 保存为 checkpoint.<key>.json），同一视频用不同配置
+    运行时各自使用自己的检查点，不会覆盖原来的进度。该文件保存帧位置、进行中的组和计数等
+    状态（每次整体原子替换）；已完成的组追加写入同名的 '.sets.jsonl' 文件，每次保存的状态
+    记录其中有效的行数，写到一半的行在恢复时被忽略。
+    """
+
+    def __init__(self, path: str, key: str):
+        root, ext = os.path.splitext(path)
+        self.path = f'{root}.{key}{ext}'
+        self.sets_path = f'{self.path}.sets.jsonl'
+        self.key = key
+
+    def load(self) -> Optional[Dict]:
+        """读取与当前视频和配置匹配的检查点，返回状态（含已完成的组 'completed_sets'），没有时返回None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('key') != self.key:
+            return None
+
+        # 只读取状态引用的行，之后写入但未被状态引用的行截掉
+        completed_sets = []
+        if not state['set_count'] and not os.path.exists(self.sets_path):
+            state['completed_sets'] = completed_sets
+            return state
+        try:
+            with open(self.sets_path, 'r+b') as f:
+                while len(completed_sets) < state['set_count']:
+                    line = f.readline()
+                    if not line.endswith(b'\n'):
+                        return None
+                    set_summary = json.loads(line.decode('utf-8'))
+                    set_summary['columns'] = SetColumns.from_dict(set_summary['columns'])
+                    completed_sets.append(set_summary)
+                f.truncate(f.tell())
+        except (OSError, ValueError):
+            return None
+
+        state['completed_sets'] = completed_sets
+        return state
+
+    def append_set(self, set_summary: Dict):
+        """追加一组（在保存引用它的状态之前调用）"""
+        with open(self.sets_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(set_summary, ensure_ascii=False, default=json_default) + '\n')
+
+    def save(self, state: Dict):
+        """原子地保存状态"""
+        state = dict(state, key=self.key)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, default=json_default)
+        os.replace(tmp_path, self.path)
+
+    def segment_path(self, index: int, ext: str = '.mp4') -> str:
+        """输出视频第 index 段的文件路径（见 SegmentedVideoWriter）"""
+        return f'{self.path}.segment{index}{ext}'
+
+    def clear(self):
+        """删除检查点和输出视频的段文件（分析完成或检查点无法使用时调用，只删除本 key 的文件）"""
+        for path in [self.path, self.sets_path] + glob.glob(f'{glob.escape(self.path)}.segment*'):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+import time
+from typing import Dict, List, Tuple
+from bench_press_analyzer import BenchPressAnalyzer
+from pose_backends import PoseBackend
+from pose_detection import PoseDetector
+
+# 粗扫描中每个采样帧的分类
+SAMPLE_NONE = 0     # 未检测到人
+SAMPLE_OTHER = 1    # 检测到人但不是卧推姿势
+SAMPLE_BENCH = 2    # 卧推姿势
+
+def scan_bench_segments(video_path: str, backend: PoseBackend, analyzer: BenchPressAnalyzer,
+                        stride: int = 15, width: int = 320) -> Dict:
+    """两遍分析的第一遍：按步长抽帧、缩小到 width 像素宽后检测，定位卧推片段
+
+    采样帧之间的帧只抓取不转换。每段连续的卧推采样向两侧各扩展一个步长
+    （片段边界在两个采样帧之间），相邻片段合并。
+
+    返回的 segments 为 [(起始帧位置, 结束帧位置（不含）, 是否在片段前结束当前组)]，
+    帧位置从0开始。两个片段之间的采样中有非卧推姿势时，单遍分析会在那里结束当前组，
+    第二遍据此在跳过的间隔处结束当前组。
+    """
+    stride = max(1, int(stride))
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {video_path}")
+
+    detector = PoseDetector(backend)
+    positions = []
+    labels = []
+    start = time.perf_counter()
+    position = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # 缩小后检测（关键点是归一化坐标，与分辨率无关）
+            height, frame_width = frame.shape[:2]
+            if frame_width > width:
+                size = (width, max(1, int(round(height * width / frame_width))))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            pose_data = detector.detect_pose(frame)
+            if not pose_data:
+                labels.append(SAMPLE_NONE)
+            elif analyzer.is_bench_press_pose(pose_data):
+                labels.append(SAMPLE_BENCH)
+            else:
+                labels.append(SAMPLE_OTHER)
+            positions.append(position)
+
+            # 跳过到下一个采样帧
+            skipped = 0
+            while skipped < stride - 1 and cap.grab():
+                skipped += 1
+            position += 1 + skipped
+            if skipped < stride - 1:
+                break
+    finally:
+        cap.release()
+
+    total_frames = position
+    segments = _build_segments(np.array(positions, dtype=np.int64), np.array(labels, dtype=np.int8),
+                               stride, total_frames)
+    return {
+        'total_frames': total_frames,
+        'stride': stride,
+        'samples': len(positions),
+        'bench_samples': int(sum(label == SAMPLE_BENCH for label in labels)),
+        'segments': segments,
+        'segment_frames': sum(end - begin for begin, end, _ in segments),
+        'seconds': time.perf_counter() - start
+    }
+
+def _build_segments(positions: np.ndarray, labels: np.ndarray, stride: int,
+                    total_frames: int) -> List[Tuple[int, int, bool]]:
+    """把卧推采样合并为需要精细分析的帧区间"""
+    ranges = []
+    for position in positions[labels == SAMPLE_BENCH]:
+        begin = max(0, int(position) - stride)
+        end = min(total_frames, int(position) + stride + 1)
+        if ranges and begin <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([begin, end])
+
+    segments = []
+    previous_end = 0
+    for begin, end in ranges:
+        # 间隔中的采样有非卧推姿势时，单遍分析会在那里结束当前组
+        in_gap = (positions >= previous_end) & (positions < begin)
+        split_before = bool(segments) and bool(np.any(labels[in_gap] == SAMPLE_OTHER))
+        segments.append((begin, end, split_before))
+        previous_end = end
+    return segments
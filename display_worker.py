@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+import queue
+import threading
+import time
+from typing import List, Optional
+from frame_grabber import LatencyStats
+
+class DisplayWorker:
+    """显示线程：展示最新的标注帧并处理键盘输入，避免界面卡顿拖慢分析
+
+    注意：部分平台（如macOS）要求HighGUI在主线程运行，此时请使用无界面模式。
+    """
+
+    def __init__(self, window_name: str, latency_stats: Optional[LatencyStats] = None):
+        self.window_name = window_name
+        self.latency_stats = latency_stats
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._capture_time = 0.0
+        self._has_new_frame = False
+        self._keys = queue.Queue()
+        self._running = False
+        self._thread = None
+
+        self.displayed_frames = 0
+
+    def start(self) -> 'DisplayWorker':
+        """启动显示线程"""
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='DisplayWorker', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止显示线程并关闭窗口"""
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def submit(self, frame: np.ndarray, capture_time: float):
+        """提交最新的标注帧，未显示的旧帧直接被覆盖"""
+        with self._cond:
+            self._frame = frame
+            self._capture_time = capture_time
+            self._has_new_frame = True
+            self._cond.notify()
+
+    def get_keys(self) -> List[int]:
+        """取出显示线程收到的所有按键"""
+        keys = []
+        while True:
+            try:
+                keys.append(self._keys.get_nowait())
+            except queue.Empty:
+                return keys
+
+    def _run(self):
+        """显示循环：有新帧就显示，并持续轮询按键"""
+        while self._running:
+            with self._cond:
+                if not self._has_new_frame:
+                    self._cond.wait(0.01)
+                frame = self._frame if self._has_new_frame else None
+                capture_time = self._capture_time
+                self._has_new_frame = False
+
+            if frame is not None:
+                cv2.imshow(self.window_name, frame)
+                self.displayed_frames += 1
+                if self.latency_stats is not None:
+                    self.latency_stats.add(time.monotonic() - capture_time)
+
+            key = cv2.waitKey(1) & 0xFF
+            if key != 0xFF:
+                self._keys.put(key)
+
+        cv2.destroyAllWindows()
@@ -0,0 +1,53 @@
+import json
+import socket
+import sys
+import time
+from typing import Optional
+from result_columns import json_default
+
+class EventEmitter:
+    """以JSON Lines格式输出实时事件（重复、组、分数）
+
+    target 为空或 '-' 时写入标准输出；'host:port' 连接本地TCP端口；
+    其他字符串视为Unix套接字路径。
+    """
+
+    def __init__(self, target: Optional[str] = None):
+        self.target = target or '-'
+        self._sock = None
+        self._stream = None
+        self.emitted_events = 0
+        self.failed_events = 0
+
+        if self.target == '-':
+            self._stream = sys.stdout
+        elif ':' in self.target:
+            host, port = self.target.rsplit(':', 1)
+            self._sock = socket.create_connection((host or '127.0.0.1', int(port)))
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(self.target)
+
+    def emit(self, event_type: str, **fields):
+        """输出一条事件，发送失败只计数，不影响分析循环"""
+        event = {'type': event_type, 'time': time.time()}
+        event.update(fields)
+        line = json.dumps(event, ensure_ascii=False, default=json_default) + '\n'
+
+        try:
+            if self._sock is not None:
+                self._sock.sendall(line.encode('utf-8'))
+            else:
+                self._stream.write(line)
+                self._stream.flush()
+            self.emitted_events += 1
+        except (OSError, ValueError):
+            self.failed_events += 1
+
+    def close(self):
+        """关闭套接字连接"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
@@ -0,0 +1,106 @@
+import fnmatch
+import os
+import shutil
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import BinaryIO, Optional, Sequence
+
+# 读写文件时每次拷贝的块大小
+CHUNK_SIZE = 1024 * 1024
+
+def spool_to_disk(fileobj: BinaryIO, path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """把文件对象按固定大小的块写入磁盘，返回写入的字节数；失败时删除半成品文件"""
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+    written = 0
+    try:
+        with open(path, 'wb') as f:
+            while True:
+                chunk = fileobj.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                written += len(chunk)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+class DownloadServer:
+    """在后台线程中提供本地文件下载，按块从磁盘读取，不把整个文件读入内存
+
+    只提供 root 目录下相对路径匹配 patterns 中某个通配符的文件（如 '*/output.mp4'），
+    路径为相对 root 的URL路径。服务不做身份验证，只应开放给可以访问这些文件的用户。
+    """
+
+    def __init__(self, root: str, port: int = 0, host: str = '127.0.0.1',
+                 chunk_size: int = CHUNK_SIZE, patterns: Sequence[str] = ('*',)):
+        self.root = os.path.realpath(root)
+        self.patterns = tuple(patterns)
+        self.port = port
+        self.host = host
+        self.chunk_size = chunk_size
+
+        self._server = None
+        self._thread = None
+
+    def start(self) -> 'DownloadServer':
+        """启动HTTP服务"""
+        server = self
+
+        class DownloadHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = server.resolve(self.path)
+                if path is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(os.path.getsize(path)))
+                self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(path)}"')
+                self.end_headers()
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, self.wfile, server.chunk_size)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), DownloadHandler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='DownloadServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止HTTP服务"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def resolve(self, url_path: str) -> Optional[str]:
+        """把URL路径映射为 root 下已存在的文件，越界、不在白名单中或不存在时返回None"""
+        relative = urllib.parse.unquote(url_path.split('?')[0]).lstrip('/')
+        path = os.path.realpath(os.path.join(self.root, relative))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+        if not any(fnmatch.fnmatchcase(relative, pattern) for pattern in self.patterns):
+            return None
+        return path
+
+    def serves(self, path: str) -> bool:
+        """path 是否为本服务提供下载的文件"""
+        relative = os.path.relpath(os.path.realpath(path), self.root).replace(os.sep, '/')
+        return self.resolve(urllib.parse.quote(relative)) is not None
+
+    def url_for(self, path: str, base_url: Optional[str] = None) -> str:
+        """返回 root 下文件的下载地址"""
+        relative = os.path.relpath(os.path.realpath(path), self.root).replace(os.sep, '/')
+        base_url = base_url or f'http://{self.host}:{self.port}'
+        return f'{base_url.rstrip("/")}/{urllib.parse.quote(relative)}'
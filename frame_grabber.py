@@ -0,0 +1,139 @@
+import cv2
+import numpy as np
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+class FrameGrabber:
+    """摄像头采集线程，只保留最新一帧，分析循环永远不会处理过期画面
+
+    pace_fps 用于以视频文件代替摄像头：按该帧率读取，而不是尽快读完整个文件。
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, pace_fps: Optional[float] = None):
+        self.cap = cap
+        self.pace_fps = pace_fps
+        # 尽量让驱动只缓存一帧（部分后端不支持，忽略返回值）
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # 最新帧及其单调时钟采集时间
+        self._frame = None
+        self._capture_time = 0.0
+        self._frame_id = 0
+        self._consumed_id = 0
+        self._ended = False
+
+        # 统计信息
+        self.captured_frames = 0
+        self.dropped_frames = 0
+
+    def start(self) -> 'FrameGrabber':
+        """启动采集线程"""
+        if self._thread is not None:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='FrameGrabber', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止采集线程"""
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    @property
+    def finished(self) -> bool:
+        """采集已结束且最后一帧已被取走"""
+        with self._cond:
+            return self._ended and self._frame_id == self._consumed_id
+
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray], float]:
+        """取出最新一帧，返回 (是否成功, 帧, 采集时间)
+
+        同一帧只会被取出一次；没有新帧时阻塞等待，直到超时或采集结束。
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._frame_id == self._consumed_id and not self._ended:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False, None, 0.0
+                self._cond.wait(remaining)
+
+            if self._frame_id == self._consumed_id:
+                # 采集已结束且没有未读取的帧
+                return False, None, 0.0
+
+            self._consumed_id = self._frame_id
+            return True, self._frame, self._capture_time
+
+    def _run(self):
+        """采集循环：不断读取摄像头，用新帧覆盖未被取走的旧帧"""
+        start = time.monotonic()
+        while self._running:
+            if self.pace_fps:
+                delay = start + self._frame_id / self.pace_fps - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            ret, frame = self.cap.read()
+            capture_time = time.monotonic()
+
+            with self._cond:
+                if not ret:
+                    self._ended = True
+                    self._cond.notify_all()
+                    break
+
+                # 上一帧还没被分析循环取走就被覆盖，记为丢帧
+                if self._frame_id != self._consumed_id:
+                    self.dropped_frames += 1
+
+                self._frame = frame
+                self._capture_time = capture_time
+                self._frame_id += 1
+                self.captured_frames += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+
+class LatencyStats:
+    """采集到显示的延迟统计"""
+
+    def __init__(self, max_samples: int = 10000):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency: float):
+        """记录一次延迟（秒）"""
+        self.samples.append(latency)
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def summary(self) -> Dict:
+        """返回延迟统计摘要（毫秒）"""
+        if not self.count:
+            return {'count': 0, 'mean_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'max_ms': 0}
+
+        recent = np.array(self.samples) * 1000
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1000,
+            'p50_ms': float(np.percentile(recent, 50)),
+            'p95_ms': float(np.percentile(recent, 95)),
+            'max_ms': self.max * 1000
+        }
@@ -0,0 +1,48 @@
+import numpy as np
+import threading
+from typing import Dict, Tuple
+
+class FramePool:
+    """固定尺寸的帧缓冲池，在解码、颜色转换和绘制之间循环复用数组
+
+    所有权约定：acquire() 取得的缓冲区归调用方所有，流水线中每个阶段处理完后
+    把所有权交给下一阶段，最后一个使用者负责 release() 归还；归还后不能再读写。
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype=np.uint8, max_free: int = 8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.max_free = max_free
+
+        self._free = []
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self) -> np.ndarray:
+        """取出一个缓冲区，池为空时新分配"""
+        with self._lock:
+            if self._free:
+                self.reuses += 1
+                return self._free.pop()
+            self.allocations += 1
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, buffer: np.ndarray):
+        """归还缓冲区，尺寸不符或池已满时直接丢弃"""
+        if buffer is None or buffer.shape != self.shape or buffer.dtype != self.dtype:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buffer)
+
+    def stats(self) -> Dict:
+        """返回分配与复用次数"""
+        total = self.allocations + self.reuses
+        return {
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'hit_rate': self.reuses / total if total else 0
+        }
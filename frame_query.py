@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from bench_press_analyzer import ANGLE_NAMES, PHASES
+from result_columns import SetColumns
+
+# 一天的秒数
+DAY_SECONDS = 86400
+
+# group_by 支持的统计量
+AGGREGATIONS = ('count', 'sum', 'mean', 'min', 'max', 'std')
+
+def _to_seconds(value: datetime) -> float:
+    """把（本地时间的）datetime 转换为索引使用的秒数"""
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+class FrameIndex:
+    """锻炼历史的逐帧列式索引
+
+    把所有组的逐帧数据拼接为按时间排序的列：time（秒，本地时间）、workout（锻炼序号，
+    见 workout_ids）、set（组号）、rep（组内第几次下放，第一次下放之前为0）、phase（阶段代码）、
+    score、angles（帧数 x len(ANGLE_NAMES)）。时间范围用二分查找定位，每个阶段预先保存
+    其所在的行，过滤和分组都是向量化计算。
+
+    构建完成后索引不再修改，追加新的组时生成新的索引（见 with_set），
+    其他线程可以在不加锁的情况下继续查询已经拿到的索引。
+
+    组记录的是保存时间（组结束时），各帧的时间按其时间戳相对最后一帧的偏移向前推算，
+    实时分析的绝对时间戳和视频分析的相对时间戳都适用。
+    """
+
+    def __init__(self):
+        self.workout_ids = []
+        self._workout_positions = {}
+        self.time = np.empty(0, dtype=np.float64)
+        self.workout = np.empty(0, dtype=np.int32)
+        self.set = np.empty(0, dtype=np.int16)
+        self.rep = np.empty(0, dtype=np.int16)
+        self.phase = np.empty(0, dtype=np.uint8)
+        self.score = np.empty(0, dtype=np.float32)
+        self.angles = np.empty((0, len(ANGLE_NAMES)), dtype=np.float32)
+        self._phase_rows = [np.empty(0, dtype=np.int64) for _ in PHASES]
+
+    @classmethod
+    def build(cls, workouts: List[Dict]) -> 'FrameIndex':
+        """由 WorkoutTracker 的锻炼列表构建索引"""
+        index = cls()
+        blocks = [index._set_block(workout['id'], set_data)
+                  for workout in workouts for set_data in workout['sets'] if set_data.get('phase_data')]
+        index._append_blocks(blocks)
+        return index
+
+    def with_set(self, workout_id: str, set_data: Dict) -> 'FrameIndex':
+        """返回追加一组后的新索引（WorkoutTracker.add_set 之后调用），不重建已有的数据，原索引不变"""
+        if not set_data.get('phase_data'):
+            return self
+        index = FrameIndex()
+        index.workout_ids = list(self.workout_ids)
+        index._workout_positions = dict(self._workout_positions)
+        for field in ('time', 'workout', 'set', 'rep', 'phase', 'score', 'angles'):
+            setattr(index, field, getattr(self, field))
+        index._append_blocks([index._set_block(workout_id, set_data)])
+        return index
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def _set_block(self, workout_id: str, set_data: Dict) -> Dict:
+        """把一组的逐帧数据转换为列"""
+        position = self._workout_positions.get(workout_id)
+        if position is None:
+            position = self._workout_positions[workout_id] = len(self.workout_ids)
+            self.workout_ids.append(workout_id)
+
+        columns = SetColumns.from_frames(set_data['phase_data'])
+        count = len(columns)
+        offsets = np.nan_to_num(columns.timestamp - columns.timestamp[-1])
+        set_time = _to_seconds(datetime.fromisoformat(set_data['timestamp']))
+
+        # 每次进入DOWN阶段开始新的一次重复
+        down = columns.phase == PHASES.index('DOWN')
+        starts = down & ~np.concatenate(([False], down[:-1]))
+        return {
+            'time': set_time + offsets,
+            'workout': np.full(count, position, dtype=np.int32),
+            'set': np.full(count, set_data['set_number'], dtype=np.int16),
+            'rep': np.cumsum(starts, dtype=np.int16),
+            'phase': columns.phase,
+            'score': columns.score,
+            'angles': columns.angles
+        }
+
+    def _append_blocks(self, blocks: List[Dict]):
+        """拼接新的列并更新时间和阶段索引（只在索引交给调用方之前使用，已有的数组不会被原地修改）"""
+        if not blocks:
+            return
+        fields = ('time', 'workout', 'set', 'rep', 'phase', 'score', 'angles')
+        for field in fields:
+            setattr(self, field, np.concatenate([getattr(self, field)] + [block[field] for block in blocks]))
+
+        # 数据基本按时间追加，只有乱序时才重新排序
+        if np.any(np.diff(self.time) < 0):
+            order = np.argsort(self.time, kind='stable')
+            for field in fields:
+                setattr(self, field, getattr(self, field)[order])
+        self._phase_rows = [np.flatnonzero(self.phase == code) for code in range(len(PHASES))]
+
+    def select(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               days: Optional[float] = None, phases: Optional[Iterable[str]] = None,
+               score: Optional[Tuple[Optional[float], Optional[float]]] = None,
+               angles: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+               workouts: Optional[Iterable[str]] = None) -> np.ndarray:
+        """按条件筛选帧，返回行号数组（按时间排序）
+
+        start/end 为时间范围 [start, end)，days 表示最近几天；phases 为阶段名称列表；
+        score 和 angles 中的范围为闭区间 (下限, 上限)，None 表示不限，
+        angles 的键为角度名称或 'elbow_angle'（左右肘部的平均值）。
+        """
+        if days is not None:
+            start = datetime.now() - timedelta(days=days)
+        begin = 0 if start is None else int(np.searchsorted(self.time, _to_seconds(start), 'left'))
+        stop = len(self.time) if end is None else int(np.searchsorted(self.time, _to_seconds(end), 'left'))
+
+        if phases is None:
+            rows = np.arange(begin, stop, dtype=np.int64)
+        else:
+            # 阶段索引中的行号有序，时间范围内的部分同样二分查找
+            parts = []
+            for phase in phases:
+                phase_rows = self._phase_rows[PHASES.index(phase)]
+                parts.append(phase_rows[np.searchsorted(phase_rows, begin):np.searchsorted(phase_rows, stop)])
+            rows = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+        conditions = dict(angles or {})
+        if score is not None:
+            conditions['score'] = score
+        for field, (low, high) in conditions.items():
+            values = self.values(field, rows)
+            mask = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+            rows = rows[mask]
+
+        if workouts is not None:
+            positions = [self._workout_positions[workout_id] for workout_id in workouts
+                         if workout_id in self._workout_positions]
+            rows = rows[np.isin(self.workout[rows], positions)]
+        return rows
+
+    def values(self, field: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """返回一列在指定行的值
+
+        field 为 time、workout、set、rep、phase、score、角度名称或 'elbow_angle'。
+        """
+        if rows is None:
+            rows = slice(None)
+        if field == 'elbow_angle':
+            elbows = self.angles[rows][:, [ANGLE_NAMES.index('left_elbow_angle'),
+                                           ANGLE_NAMES.index('right_elbow_angle')]]
+            return elbows.mean(axis=1)
+        if field in ANGLE_NAMES:
+            return self.angles[rows, ANGLE_NAMES.index(field)]
+        return getattr(self, field)[rows]
+
+    def group_by(self, rows: np.ndarray, keys: Sequence[str], field: str = 'score',
+                 aggregations: Sequence[str] = ('count', 'mean')) -> Dict[str, np.ndarray]:
+        """按键分组统计一列
+
+        keys 可以是 workout、set、rep、phase、day、week（周一开始）；('workout', 'set', 'rep')
+        即按每次重复分组。返回 {键: 各组的键值, 统计量: 各组的结果}，各组按键值排序。
+        值为NaN的帧（未检测到的角度）不参与统计，count 为有效值的个数，没有有效值的组其余统计量为NaN。
+        """
+        key_columns = [self._group_key(key, rows) for key in keys]
+        values = self.values(field, rows).astype(np.float64)
+        if not len(rows):
+            result = {key: np.empty(0) for key in keys}
+            result.update({aggregation: np.empty(0) for aggregation in aggregations})
+            return result
+
+        # 多个键按各自的取值范围合成一个整数编码
+        lows = [column.min() for column in key_columns]
+        sizes = [int(column.max() - low) + 1 for column, low in zip(key_columns, lows)]
+        key_values = [None] * len(keys)
+        if np.prod(sizes, dtype=np.float64) >= 2 ** 62:
+            # 范围过大无法合成时，先把每个键压缩为其出现过的值的序号
+            compressed = [np.unique(column, return_inverse=True) for column in key_columns]
+            key_values = [unique for unique, _ in compressed]
+            key_columns = [inverse.reshape(-1) for _, inverse in compressed]
+            lows, sizes = [0] * len(keys), [len(unique) for unique in key_values]
+        total = int(np.prod(sizes, dtype=np.float64))
+        codes = np.zeros(len(rows), dtype=np.int64)
+        for column, low, size in zip(key_columns, lows, sizes):
+            codes = codes * size + (column - low)
+
+        # NaN按0参与求和，不计入个数；最小/最大值用忽略NaN的 fmin/fmax
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+
+        if total <= 4 * len(rows) + 1024:
+            # 编码范围不大时直接按编码计数和累加，不需要排序
+            groups = np.flatnonzero(np.bincount(codes, minlength=total))
+            counts = np.bincount(codes, weights=valid, minlength=total)[groups].astype(np.int64)
+            sums = np.bincount(codes, weights=filled, minlength=total)[groups]
+            reduce = lambda ufunc, initial: self._reduce_at_codes(ufunc, initial, codes, values, total)[groups]
+            squares = lambda: np.bincount(codes, weights=filled * filled, minlength=total)[groups]
+        else:
+            order = np.argsort(codes, kind='stable')
+            codes, values, valid, filled = codes[order], values[order], valid[order], filled[order]
+            starts = np.flatnonzero(np.concatenate(([True], np.diff(codes) != 0)))
+            groups = codes[starts]
+            counts = np.add.reduceat(valid.astype(np.int64), starts)
+            sums = np.add.reduceat(filled, starts)
+            reduce = lambda ufunc, initial: ufunc.reduceat(values, starts)
+            squares = lambda: np.add.reduceat(filled * filled, starts)
+
+        # 还原各键的值
+        result = {}
+        remainder = groups
+        for key, low, size, unique in reversed(list(zip(keys, lows, sizes, key_values))):
+            key_codes = remainder % size + low
+            result[key] = self._key_labels(key, key_codes if unique is None else unique[key_codes])
+            remainder = remainder // size
+        result = {key: result[key] for key in keys}
+
+        empty = counts == 0
+        safe_counts = np.maximum(counts, 1)
+        for aggregation in aggregations:
+            if aggregation == 'count':
+                result['count'] = counts
+            elif aggregation == 'sum':
+                result['sum'] = np.where(empty, np.nan, sums)
+            elif aggregation == 'mean':
+                result['mean'] = np.where(empty, np.nan, sums / safe_counts)
+            elif aggregation == 'min':
+                result['min'] = np.where(empty, np.nan, reduce(np.fmin, np.inf))
+            elif aggregation == 'max':
+                result['max'] = np.where(empty, np.nan, reduce(np.fmax, -np.inf))
+            elif aggregation == 'std':
+                variance = squares() / safe_counts - (sums / safe_counts) ** 2
+                result['std'] = np.where(empty, np.nan, np.sqrt(np.maximum(variance, 0)))
+            else:
+                raise ValueError(f"不支持的统计量: {aggregation}（可选: {', '.join(AGGREGATIONS)}）")
+        return result
+
+    @staticmethod
+    def _reduce_at_codes(ufunc, initial: float, codes: np.ndarray, values: np.ndarray,
+                         total: int) -> np.ndarray:
+        """按编码做最小/最大值归约（ufunc 为 np.fmin/np.fmax，忽略NaN）"""
+        output = np.full(total, initial)
+        ufunc.at(output, codes, values)
+        return output
+
+    def _group_key(self, key: str, rows: np.ndarray) -> np.ndarray:
+        """分组键的整数编码"""
+        if key == 'day':
+            return np.floor(self.time[rows] / DAY_SECONDS).astype(np.int64)
+        if key == 'week':
+            # 1970-01-01 是周四，加3天后整除得到以周一开始的周
+            return np.floor((self.time[rows] / DAY_SECONDS + 3) / 7).astype(np.int64)
+        if key in ('workout', 'set', 'rep', 'phase'):
+            return getattr(self, key)[rows].astype(np.int64)
+        raise ValueError(f"不支持的分组键: {key}")
+
+    def _key_labels(self, key: str, codes: np.ndarray) -> np.ndarray:
+        """把分组键的整数编码还原为可读的值"""
+        if key == 'day':
+            return codes.astype('datetime64[D]')
+        if key == 'week':
+            return (codes * 7 - 3).astype('datetime64[D]')
+        if key == 'workout':
+            return np.array([self.workout_ids[code] for code in codes], dtype=object)
+        if key == 'phase':
+            return np.array([PHASES[code] for code in codes], dtype=object)
+        return codes
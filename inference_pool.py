@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from metrics import REGISTRY
+from pose_backends import PoseBackend
+from pose_detection import PoseDetector
+
+# 运行时指标
+BATCH_SIZE = REGISTRY.histogram('inference_batch_size', '共享推理池每批处理的帧数',
+                                buckets=(1, 2, 4, 8, 16, 32))
+QUEUE_SECONDS = REGISTRY.histogram('inference_queue_seconds', '帧在共享推理池中排队的时间（秒）')
+
+class InferenceRequest:
+    """一帧待推理的图像"""
+
+    __slots__ = ('frame', 'stream_id', 'future', 'submitted_at')
+
+    def __init__(self, frame: np.ndarray, stream_id: Optional[str]):
+        self.frame = frame
+        self.stream_id = stream_id
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+class InferencePool:
+    """多路视频流共享的姿态推理工作线程池
+
+    每个工作线程持有独立的后端实例（模型不在线程间共享）。请求按视频流分别排队，
+    工作线程轮流从各视频流取帧，发送快的视频流不会挤占其他视频流。后端提供 process_batch 时，
+    工作线程在 batch_wait 秒内把不同视频流的请求合并为最多 max_batch 帧的小批量一起推理。
+    """
+
+    def __init__(self, backend_factory: Callable[[], PoseBackend], workers: int = 2,
+                 max_batch: int = 4, batch_wait: float = 0.005):
+        self.backend_factory = backend_factory
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait
+
+        # {视频流: 请求队列}，按轮转顺序排列
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+
+    def start(self) -> 'InferencePool':
+        """启动工作线程"""
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'InferenceWorker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """处理完已提交的请求后停止工作线程"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, frame: np.ndarray, stream_id: Optional[str] = None) -> Future:
+        """提交一帧，返回结果为 pose_data（未检测到时为None）的 Future"""
+        request = InferenceRequest(frame, stream_id)
+        with self._cond:
+            self._pending.setdefault(stream_id, deque()).append(request)
+            self._cond.notify()
+        return request.future
+
+    def stats(self) -> Dict:
+        """返回请求数、批次数和平均批大小"""
+        with self._cond:
+            queued = sum(len(requests) for requests in self._pending.values())
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'queued': queued
+            }
+
+    def _worker(self):
+        """工作线程：取出一批请求并推理"""
+        detector = PoseDetector(self.backend_factory())
+        batching = self.max_batch > 1 and hasattr(detector.backend, 'process_batch')
+        try:
+            while True:
+                request = self._next_request()
+                if request is None:
+                    break
+                batch = self._collect_batch(request) if batching else [request]
+                self._run_batch(detector, batch)
+        finally:
+            detector.backend.close()
+
+    def _next_request(self, timeout: Optional[float] = None) -> Optional[InferenceRequest]:
+        """按视频流轮转取出下一个请求；超时或停止且队列已空时返回None"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while not self._pending:
+                if self._stopping:
+                    return None
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+            # 取出队首视频流的一个请求，该视频流还有请求时排到末尾
+            stream_id, requests = next(iter(self._pending.items()))
+            request = requests.popleft()
+            del self._pending[stream_id]
+            if requests:
+                self._pending[stream_id] = requests
+            return request
+
+    def _collect_batch(self, first: InferenceRequest) -> List[InferenceRequest]:
+        """在等待窗口内继续收集请求"""
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.max_batch:
+            request = self._next_request(max(0.0, deadline - time.perf_counter()))
+            if request is None:
+                break
+            batch.append(request)
+        return batch
+
+    def _run_batch(self, detector: PoseDetector, batch: List[InferenceRequest]):
+        now = time.perf_counter()
+        for request in batch:
+            QUEUE_SECONDS.observe(now - request.submitted_at)
+        BATCH_SIZE.observe(len(batch))
+        with self._lock:
+            self.requests += len(batch)
+            self.batches += 1
+
+        try:
+            results = detector.detect_pose_batch([request.frame for request in batch])
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, pose_data in zip(batch, results):
+            request.future.set_result(pose_data)
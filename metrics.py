@@ -0,0 +1,261 @@
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+# 延迟类直方图的默认分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    """只增不减的计数器"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        """增加计数"""
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> List:
+        """返回 (样本名, 值) 列表"""
+        return [(self.name, self.value)]
+
+    def snapshot(self):
+        """返回快照中记录的值"""
+        return self.value
+
+class Gauge:
+    """可任意设置的瞬时值"""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.value = 0.0
+
+    def set(self, value: float):
+        """设置当前值"""
+        self.value = value
+
+    def samples(self) -> List:
+        """返回 (样本名, 值) 列表"""
+        return [(self.name, self.value)]
+
+    def snapshot(self):
+        """返回快照中记录的值"""
+        return self.value
+
+class Histogram:
+    """固定分桶的直方图，兼容Prometheus的累计分桶格式"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """记录一次观测值"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """按分桶线性插值估算分位数"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+
+        target = total * q
+        cumulative = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if bucket_count and cumulative + bucket_count >= target:
+                return lower + (upper - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+    def samples(self) -> List:
+        """返回累计分桶、总和与计数样本"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            value_sum = self.sum
+
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append((f'{self.name}_bucket{{le="{bound}"}}', cumulative))
+        samples.append((f'{self.name}_bucket{{le="+Inf"}}', total))
+        samples.append((f'{self.name}_sum', value_sum))
+        samples.append((f'{self.name}_count', total))
+        return samples
+
+    def snapshot(self) -> Dict:
+        """返回计数、总和与估算的分位数"""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99)
+        }
+
+class MetricsRegistry:
+    """运行时指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str) -> Counter:
+        """获取或创建计数器"""
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        """获取或创建瞬时值"""
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """获取或创建直方图"""
+        return self._get_or_create(Histogram, name, description, buckets)
+
+    def _get_or_create(self, metric_class, name: str, description: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, description, *args)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type_name}")
+            return metric
+
+    def render_prometheus(self) -> str:
+        """生成Prometheus文本格式"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for sample_name, value in metric.samples():
+                lines.append(f'{sample_name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict:
+        """生成JSON快照"""
+        return {
+            'timestamp': time.time(),
+            'metrics': {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+        }
+
+REGISTRY = MetricsRegistry()
+
+class MetricsExporter:
+    """在后台线程中提供本地HTTP指标接口，并定期写入快照文件"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, port: Optional[int] = None,
+                 host: str = '127.0.0.1', snapshot_path: Optional[str] = None,
+                 snapshot_interval: float = 60.0):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+
+        self._server = None
+        self._threads = []
+        self._stop_event = threading.Event()
+
+    def start(self) -> 'MetricsExporter':
+        """启动HTTP接口和快照线程"""
+        if self.port is not None:
+            registry = self.registry
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = registry.render_prometheus().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+            self.port = self._server.server_address[1]
+            self._start_thread(self._server.serve_forever, 'MetricsHTTP')
+
+        if self.snapshot_path:
+            self._start_thread(self._snapshot_loop, 'MetricsSnapshot')
+        return self
+
+    def stop(self):
+        """停止导出并写入最后一次快照"""
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+        if self.snapshot_path:
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        """原子地写入快照文件"""
+        tmp_path = f'{self.snapshot_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _snapshot_loop(self):
+        while not self._stop_event.wait(self.snapshot_interval):
+            try:
+                self.write_snapshot()
+            except OSError:
+                pass
+
+    def _start_thread(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+def start_exporter(port: Optional[int] = None, snapshot_path: Optional[str] = None,
+                   snapshot_interval: float = 60.0) -> Optional[MetricsExporter]:
+    """启动全局指标导出；端口被占用时只提示不报错"""
+    if port is None and not snapshot_path:
+        return None
+    try:
+        return MetricsExporter(REGISTRY, port=port, snapshot_path=snapshot_path,
+                               snapshot_interval=snapshot_interval).start()
+    except OSError as e:
+        print(f"指标导出启动失败: {e}", file=sys.stderr)
+        return None
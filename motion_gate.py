@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+from typing import Dict, Optional
+
+class MotionGate:
+    """基于画面变化的推理门控
+
+    把帧缩小为低分辨率灰度图，与上一次推理时的参考帧比较，变化像素的比例低于
+    threshold 时判定为静止，调用方可以复用上一次的检测结果而不重新推理。
+    与参考帧（而不是上一帧）比较，缓慢的累积变化最终也会触发推理；
+    max_skip 限制连续跳过的帧数，保证结果不会过期太久。
+    """
+
+    def __init__(self, threshold: float = 0.01, max_skip: int = 30,
+                 width: int = 64, pixel_threshold: int = 15):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+
+        self._reference = None
+        self._small = None
+        self._gray = None
+        self._diff = None
+        self._skipped_in_row = 0
+
+        # 统计信息
+        self.frames = 0
+        self.skipped_frames = 0
+        self.last_motion = 0.0
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """判断这一帧是否需要推理；需要时把它作为新的参考帧"""
+        self.frames += 1
+        gray = self._downscale(frame)
+
+        if self._reference is None:
+            self.last_motion = 1.0
+        else:
+            cv2.absdiff(gray, self._reference, dst=self._diff)
+            self.last_motion = np.count_nonzero(self._diff > self.pixel_threshold) / self._diff.size
+            if self.last_motion < self.threshold and self._skipped_in_row < self.max_skip:
+                self._skipped_in_row += 1
+                self.skipped_frames += 1
+                return False
+
+        # 交换缓冲区：当前帧成为参考帧
+        self._reference, self._gray = gray, self._reference
+        self._skipped_in_row = 0
+        return True
+
+    def reset(self):
+        """清空参考帧（如跳转到视频的其他位置后）"""
+        self._reference = None
+        self._skipped_in_row = 0
+
+    def stats(self) -> Dict:
+        """返回已判断帧数、跳过帧数和跳过比例"""
+        return {
+            'frames': self.frames,
+            'skipped_frames': self.skipped_frames,
+            'skip_ratio': self.skipped_frames / self.frames if self.frames else 0.0
+        }
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        """缩小并转为灰度，结果写入复用的缓冲区"""
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, int(round(height * self.width / width))))
+        if self._small is None or self._small.shape[:2] != (size[1], size[0]):
+            self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+            self._diff = np.empty_like(self._gray)
+            self._reference = None
+        elif self._gray is None:
+            self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+
+        cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
@@ -0,0 +1,185 @@
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import cv2
+import numpy as np
+from bench_press_analyzer import BenchPressAnalyzer
+from inference_pool import InferencePool
+from pose_backends import MediaPipeBackend, PoseBackend
+from pose_detection import PoseDetector
+from stream_analysis import StreamSession
+from video_writer import AsyncVideoWriter
+from workout_tracker import WorkoutTracker
+
+# 各训练站标注框的颜色（BGR），按训练站顺序循环使用
+STATION_COLORS = [(0, 200, 255), (255, 160, 0), (120, 220, 0), (200, 0, 200), (0, 120, 255)]
+
+class Station:
+    """一个训练站在画面中的区域，roi 为相对画面宽高的 (x, y, w, h)，取值 0-1"""
+
+    def __init__(self, name: str, roi: Tuple[float, float, float, float]):
+        x, y, w, h = roi
+        if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > 1.0 + 1e-6 or y + h > 1.0 + 1e-6:
+            raise ValueError(f"训练站 {name} 的区域超出画面: {roi}")
+        self.name = name
+        self.roi = (float(x), float(y), float(w), float(h))
+
+    def pixel_box(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """换算为像素坐标 (x0, y0, x1, y1)"""
+        x, y, w, h = self.roi
+        x0, y0 = int(round(x * width)), int(round(y * height))
+        x1, y1 = min(width, int(round((x + w) * width))), min(height, int(round((y + h) * height)))
+        return x0, y0, x1, y1
+
+def split_stations(count: int) -> List[Station]:
+    """把画面等分为 count 个并排的训练站"""
+    width = 1.0 / count
+    return [Station(f'station{i + 1}', (i * width, 0.0, width, 1.0)) for i in range(count)]
+
+def parse_stations(spec: str) -> List[Station]:
+    """解析训练站配置
+
+    "3" 表示等分为三列；否则为分号分隔的 "名称:x,y,w,h"（相对画面宽高），
+    如 "bench1:0,0,0.33,1;bench2:0.33,0,0.34,1"。
+    """
+    spec = spec.strip()
+    if spec.isdigit():
+        return split_stations(int(spec))
+
+    stations = []
+    for item in spec.split(';'):
+        if not item.strip():
+            continue
+        name, _, roi = item.partition(':')
+        values = [float(value) for value in roi.split(',')]
+        if len(values) != 4:
+            raise ValueError(f"训练站配置格式错误: {item}")
+        stations.append(Station(name.strip(), tuple(values)))
+    return stations
+
+class MultiStationAnalyzer:
+    """单个广角摄像头覆盖多个训练站的分析
+
+    每帧按训练站区域裁剪，各区域作为独立的视频流提交到共享推理池并行推理，
+    每个训练站有独立的重复计数、分组和锻炼会话。输出视频在原画面上同时标注所有训练站。
+    """
+
+    def __init__(self, stations: List[Station], workers: Optional[int] = None,
+                 backend_factory: Optional[Callable[[], PoseBackend]] = None,
+                 tracker: Optional[WorkoutTracker] = None, max_batch: int = 4,
+                 max_in_flight: int = 4):
+        names = [station.name for station in stations]
+        if not stations or len(set(names)) != len(names):
+            raise ValueError("训练站不能为空且名称不能重复")
+        self.stations = list(stations)
+        workers = workers or min(len(self.stations), os.cpu_count() or 1)
+        # 不同训练站的裁剪画面交错进入同一个模型，MediaPipe需要使用单帧检测模式
+        self.pool = InferencePool(backend_factory or (lambda: MediaPipeBackend(static_image_mode=True)),
+                                  workers, max_batch)
+        self.tracker = tracker or WorkoutTracker()
+        self.analyzer = BenchPressAnalyzer()
+        # 只用于绘制骨架，不加载模型
+        self.drawer = PoseDetector(backend=MediaPipeBackend())
+        self.max_in_flight = max(1, max_in_flight)
+
+    def process_video(self, source: Union[int, str], output_path: Optional[str] = None,
+                      progress_callback: Optional[Callable] = None) -> Dict:
+        """分析视频文件（或摄像头编号），返回每个训练站的计数、分组和锻炼会话"""
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise ValueError(f"无法打开视频源: {source}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        boxes = [station.pixel_box(width, height) for station in self.stations]
+        sessions = {station.name: StreamSession(station.name, self.analyzer) for station in self.stations}
+        workout_ids = {station.name: self.tracker.start_workout() for station in self.stations}
+        out = AsyncVideoWriter(output_path, fps, (width, height)) if output_path else None
+
+        print(f"开始多训练站分析: {source}，{len(self.stations)} 个训练站")
+        start = time.perf_counter()
+        frame_count = 0
+        # 按帧顺序处理推理结果；后续几帧的推理已提交，工作线程不会空闲
+        in_flight = deque()
+        self.pool.start()
+        try:
+            while True:
+                ret, frame = cap.read()
+                if ret:
+                    frame_count += 1
+                    futures = [self.pool.submit(np.ascontiguousarray(frame[y0:y1, x0:x1]), station.name)
+                               for station, (x0, y0, x1, y1) in zip(self.stations, boxes)]
+                    in_flight.append((frame_count, frame, futures))
+                if not in_flight:
+                    break
+                if ret and len(in_flight) < self.max_in_flight:
+                    continue
+
+                index, frame, futures = in_flight.popleft()
+                poses, results = [], []
+                for station, future in zip(self.stations, futures):
+                    pose_data = future.result()
+                    result = sessions[station.name].update(pose_data, index / fps)
+                    if result['set_completed']:
+                        self._save_set(workout_ids[station.name], result['set_completed'])
+                    poses.append(pose_data)
+                    results.append(result)
+
+                if out:
+                    out.write(self._draw_stations(frame, boxes, sessions, poses, results), index)
+                if progress_callback and total_frames > 0:
+                    progress_callback(index / total_frames)
+        finally:
+            cap.release()
+            self.pool.stop()
+            if out:
+                out.close()
+
+        elapsed = time.perf_counter() - start
+        stations = {}
+        for station in self.stations:
+            session = sessions[station.name]
+            completed_set = session.finish_set()
+            if completed_set:
+                self._save_set(workout_ids[station.name], completed_set)
+            self.tracker.end_workout(workout_ids[station.name])
+            stations[station.name] = dict(session.summary(), roi=station.roi,
+                                          workout_id=workout_ids[station.name],
+                                          set_results=[{key: value for key, value in set_summary.items()
+                                                        if key != 'columns'}
+                                                       for set_summary in session.sets])
+
+        print(f"多训练站分析完成: {frame_count} 帧，{frame_count / elapsed if elapsed > 0 else 0:.1f}fps")
+        return {
+            'frames': frame_count,
+            'duration': frame_count / fps,
+            'processing_fps': frame_count / elapsed if elapsed > 0 else 0.0,
+            'stations': stations,
+            'inference': self.pool.stats()
+        }
+
+    def _save_set(self, workout_id: str, set_summary: Dict):
+        self.tracker.add_set(workout_id, set_summary['reps'], set_summary['average_score'],
+                             set_summary['columns'].to_frames(), rep_metrics=set_summary['rep_metrics'])
+
+    def _draw_stations(self, frame: np.ndarray, boxes: List[Tuple[int, int, int, int]],
+                       sessions: Dict[str, StreamSession], poses: List[Optional[Dict]],
+                       results: List[Dict]) -> np.ndarray:
+        """在原画面上标注所有训练站的区域、骨架和计数"""
+        for i, (station, (x0, y0, x1, y1), pose_data, result) in enumerate(
+                zip(self.stations, boxes, poses, results)):
+            color = STATION_COLORS[i % len(STATION_COLORS)]
+            if pose_data:
+                # 关键点是相对裁剪区域的坐标，直接在该区域的视图上绘制
+                self.drawer.draw_pose(frame[y0:y1, x0:x1], pose_data, in_place=True)
+            cv2.rectangle(frame, (x0, y0), (x1 - 1, y1 - 1), color, 2)
+
+            session = sessions[station.name]
+            label = f"{station.name} 次数:{session.rep_count} 组:{len(session.sets)}"
+            if result['score'] is not None:
+                label += f" 分数:{result['score']:.0f}"
+            cv2.putText(frame, label, (x0 + 6, y0 + 22), cv2.FONT_HERSHEY_SIMPLEX, 0.55, color, 2)
+        return frame
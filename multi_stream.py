@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union
+import cv2
+from bench_press_analyzer import BenchPressAnalyzer
+from event_emitter import EventEmitter
+from frame_grabber import FrameGrabber, LatencyStats
+from inference_pool import InferencePool
+from metrics import REGISTRY
+from pose_backends import MediaPipeBackend, PoseBackend
+from stream_analysis import StreamSession
+from workout_tracker import WorkoutTracker
+
+# 运行时指标（与单路实时分析共用）
+FRAMES_PROCESSED = REGISTRY.counter('frames_processed_total', '已分析的视频帧总数')
+DROPPED_FRAMES = REGISTRY.counter('realtime_dropped_frames_total', '实时分析中丢弃的过期帧总数')
+
+class StreamState:
+    """一路视频源的采集器、分析状态和统计"""
+
+    def __init__(self, name: str, source: Union[int, str], grabber: FrameGrabber,
+                 cap: cv2.VideoCapture, session: StreamSession):
+        self.name = name
+        self.source = source
+        self.grabber = grabber
+        self.cap = cap
+        self.session = session
+        self.workout_id = None
+        self.latency = LatencyStats()
+        self.processed_frames = 0
+        self.started_at = 0.0
+        self.finished_at = 0.0
+
+class MultiStreamAnalyzer:
+    """多路摄像头并发实时分析
+
+    每路视频源（摄像头编号或代替摄像头的视频文件）有独立的采集线程、重复计数状态和
+    锻炼会话，姿态推理在共享的推理池中按视频流轮转调度。每路视频流同一时间只有一帧在推理，
+    采集线程只保留最新一帧，处理不过来时丢弃过期帧而不是积压。
+    """
+
+    def __init__(self, sources: List[Union[int, str]], workers: Optional[int] = None,
+                 backend_factory: Optional[Callable[[], PoseBackend]] = None,
+                 tracker: Optional[WorkoutTracker] = None, event_target: Optional[str] = None,
+                 max_batch: int = 4):
+        self.sources = list(sources)
+        workers = workers or min(len(self.sources), os.cpu_count() or 1)
+        # 不同视频流的帧交错进入同一个模型，MediaPipe需要使用单帧检测模式
+        self.pool = InferencePool(backend_factory or (lambda: MediaPipeBackend(static_image_mode=True)),
+                                  workers, max_batch)
+        self.tracker = tracker or WorkoutTracker()
+        self.analyzer = BenchPressAnalyzer()
+        self.event_emitter = EventEmitter(event_target) if event_target else None
+
+        self.streams = []
+        self._tracker_lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self, duration: Optional[float] = None) -> Dict:
+        """运行直到所有视频源结束、到达 duration 秒或收到 Ctrl+C，返回每路统计"""
+        self._stop_event.clear()
+        self.streams = [self._open_source(index, source) for index, source in enumerate(self.sources)]
+        self.pool.start()
+
+        threads = []
+        for stream in self.streams:
+            with self._tracker_lock:
+                stream.workout_id = self.tracker.start_workout()
+            stream.started_at = time.monotonic()
+            stream.grabber.start()
+            thread = threading.Thread(target=self._run_stream, args=(stream,),
+                                      name=f'Stream-{stream.name}', daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        print(f"开始多路实时分析: {len(self.streams)} 路视频源，{self.pool.workers} 个推理线程")
+        deadline = time.monotonic() + duration if duration else None
+        try:
+            while any(thread.is_alive() for thread in threads):
+                if deadline and time.monotonic() >= deadline:
+                    break
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            print("收到中断信号，结束多路实时分析")
+        finally:
+            self._stop_event.set()
+            for thread in threads:
+                thread.join()
+            for stream in self.streams:
+                stream.grabber.stop()
+                stream.cap.release()
+                DROPPED_FRAMES.inc(stream.grabber.dropped_frames)
+            self.pool.stop()
+
+        # 保存每路最后一组并结束锻炼会话
+        for stream in self.streams:
+            completed_set = stream.session.finish_set()
+            if completed_set:
+                self._save_set(stream, completed_set)
+            with self._tracker_lock:
+                self.tracker.end_workout(stream.workout_id)
+
+        stats = self.report()
+        self._emit('session_end', stats=stats)
+        if self.event_emitter:
+            self.event_emitter.close()
+        return stats
+
+    def stop(self):
+        """请求停止（可从其他线程调用）"""
+        self._stop_event.set()
+
+    def report(self) -> Dict:
+        """输出并返回每路视频流的帧率、延迟和计数"""
+        streams = {}
+        print(f"\n{'视频流':<24}{'处理帧':>8}{'丢帧':>8}{'FPS':>8}{'P50ms':>9}{'P95ms':>9}{'次数':>6}{'组数':>6}")
+        for stream in self.streams:
+            elapsed = (stream.finished_at or time.monotonic()) - stream.started_at
+            latency = stream.latency.summary()
+            summary = stream.session.summary()
+            streams[stream.name] = {
+                'source': stream.source,
+                'workout_id': stream.workout_id,
+                'captured_frames': stream.grabber.captured_frames,
+                'processed_frames': stream.processed_frames,
+                'dropped_frames': stream.grabber.dropped_frames,
+                'processing_fps': stream.processed_frames / elapsed if elapsed > 0 else 0.0,
+                'latency': latency,
+                'reps': summary['reps'],
+                'sets': summary['sets'],
+                'average_score': summary['average_score']
+            }
+            row = streams[stream.name]
+            print(f"{stream.name:<24}{row['processed_frames']:>8}{row['dropped_frames']:>8}"
+                  f"{row['processing_fps']:>8.1f}{latency['p50_ms']:>9.1f}{latency['p95_ms']:>9.1f}"
+                  f"{row['reps']:>6}{row['sets']:>6}")
+        return {'streams': streams, 'inference': self.pool.stats()}
+
+    def _open_source(self, index: int, source: Union[int, str]) -> StreamState:
+        """打开摄像头或视频文件；视频文件按原帧率读取以模拟摄像头"""
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise ValueError(f"无法打开视频源: {source}")
+
+        pace_fps = None if isinstance(source, int) else (cap.get(cv2.CAP_PROP_FPS) or 30)
+        name = f'camera{source}' if isinstance(source, int) else f'{index}:{os.path.basename(source)}'
+        return StreamState(name, source, FrameGrabber(cap, pace_fps), cap,
+                           StreamSession(name, self.analyzer))
+
+    def _run_stream(self, stream: StreamState):
+        """单路视频流的分析循环"""
+        try:
+            while not self._stop_event.is_set():
+                ret, frame, capture_time = stream.grabber.read(timeout=0.5)
+                if not ret:
+                    if stream.grabber.finished:
+                        break
+                    continue
+
+                try:
+                    pose_data = self.pool.submit(frame, stream.name).result()
+                except Exception as e:
+                    print(f"{stream.name} 推理失败: {e}")
+                    continue
+
+                result = stream.session.update(pose_data, time.time())
+                stream.latency.add(time.monotonic() - capture_time)
+                stream.processed_frames += 1
+                FRAMES_PROCESSED.inc()
+
+                if result['new_rep']:
+                    self._emit('rep', stream=stream.name, rep_count=result['rep_count'])
+                if result['is_bench_press']:
+                    self._emit('score', stream=stream.name, phase=result['phase'],
+                               score=result['score'], feedback=result['feedback'])
+                if result['set_completed']:
+                    self._save_set(stream, result['set_completed'])
+        finally:
+            stream.finished_at = time.monotonic()
+
+    def _save_set(self, stream: StreamState, set_summary: Dict):
+        """把一组数据写入该视频流的锻炼会话"""
+        with self._tracker_lock:
+            self.tracker.add_set(stream.workout_id, set_summary['reps'], set_summary['average_score'],
+                                 set_summary['columns'].to_frames(), rep_metrics=set_summary['rep_metrics'])
+        self._emit('set', stream=stream.name, set_number=set_summary['set_number'],
+                   reps=set_summary['reps'], average_score=set_summary['average_score'])
+
+    def _emit(self, event_type: str, **fields):
+        """输出事件（仅在配置了事件输出时）"""
+        if self.event_emitter:
+            with self._emit_lock:
+                self.event_emitter.emit(event_type, **fields)
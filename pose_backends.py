@@ -0,0 +1,222 @@
+import numpy as np
+from typing import Callable, Dict, List, Optional, Protocol, Sequence, Union
+
+try:
+    import mediapipe as mp
+except ImportError:  # 使用模拟后端时不需要MediaPipe
+    mp = None
+
+# 关键点数量和每个关键点的字段（与MediaPipe Pose一致）
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = ('x', 'y', 'z', 'visibility')
+
+# 骨架连线（与 mp.solutions.pose.POSE_CONNECTIONS 相同）
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20), (11, 23),
+    (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29),
+    (28, 30), (29, 31), (30, 32), (27, 31), (28, 32)
+)
+
+class PoseBackend(Protocol):
+    """姿态推理后端协议
+
+    process() 接收一帧图像，返回 (33, 4) 的 float32 数组（x, y, z, visibility，
+    x/y 为相对图像宽高的归一化坐标），未检测到人时返回 None。
+    input_format 为 'rgb' 时调用方负责把BGR帧转换为RGB，为 None 时直接传入原始帧。
+    支持批量推理的后端可以额外提供 process_batch(frames) -> List[Optional[np.ndarray]]。
+    """
+
+    name: str
+    input_format: Optional[str]
+
+    def load(self):
+        """加载模型（可重复调用）"""
+        ...
+
+    def process(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """推理单帧"""
+        ...
+
+    def close(self):
+        """释放模型资源"""
+        ...
+
+class MediaPipeBackend:
+    """MediaPipe Pose 后端（原有的检测实现）"""
+
+    input_format = 'rgb'
+
+    def __init__(self, model_complexity: int = 2, min_detection_confidence: float = 0.5,
+                 min_tracking_confidence: float = 0.5, static_image_mode: bool = False):
+        self.model_complexity = model_complexity
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.static_image_mode = static_image_mode
+        self.name = f'mediapipe-{model_complexity}'
+        self._pose = None
+
+    def load(self):
+        """加载MediaPipe模型（首次推理时也会自动加载）"""
+        if self._pose is not None:
+            return
+        if mp is None:
+            raise ImportError("未安装MediaPipe，请运行: pip install -r requirements.txt")
+        self._pose = mp.solutions.pose.Pose(
+            static_image_mode=self.static_image_mode,
+            model_complexity=self.model_complexity,
+            enable_segmentation=False,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence
+        )
+
+    def process(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """推理单帧RGB图像"""
+        if self._pose is None:
+            self.load()
+        results = self._pose.process(frame)
+        if not results.pose_landmarks:
+            return None
+        return np.array([(landmark.x, landmark.y, landmark.z, landmark.visibility)
+                         for landmark in results.pose_landmarks.landmark], dtype=np.float32)
+
+    def close(self):
+        """释放MediaPipe计算图"""
+        if self._pose is not None:
+            self._pose.close()
+            self._pose = None
+
+class FakePoseBackend:
+    """确定性的模拟后端：按调用次序返回脚本化或回放的关键点，不读取图像内容
+
+    用于在不加载MediaPipe的情况下测试和压测推理之后的整个流程。
+    """
+
+    input_format = None
+
+    def __init__(self, script: Union[Sequence[Optional[np.ndarray]], Callable[[int], Optional[np.ndarray]]],
+                 loop: bool = True, name: str = 'fake'):
+        self.script = script
+        self.loop = loop
+        self.name = name
+        self.frame_index = 0
+
+    @classmethod
+    def bench_press(cls, fps: int = 30, rep_seconds: float = 2.0, frames: int = 300,
+                    jitter: float = 0.002, seed: int = 0) -> 'FakePoseBackend':
+        """循环播放合成的卧推动作"""
+        return cls(bench_press_sequence(frames, fps, rep_seconds, jitter, seed), name='fake-bench-press')
+
+    @classmethod
+    def from_file(cls, path: str, loop: bool = False) -> 'FakePoseBackend':
+        """回放用 save_landmarks 录制的关键点文件"""
+        return cls(load_landmarks(path), loop=loop, name='fake-replay')
+
+    def load(self):
+        """模拟后端无需加载"""
+
+    def process(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """返回下一帧的关键点"""
+        index = self.frame_index
+        self.frame_index += 1
+
+        if callable(self.script):
+            return self.script(index)
+        if not len(self.script):
+            return None
+        if self.loop:
+            index %= len(self.script)
+        elif index >= len(self.script):
+            return None
+        return self.script[index]
+
+    def process_batch(self, frames: Sequence[np.ndarray]) -> List[Optional[np.ndarray]]:
+        """按顺序返回多帧的关键点"""
+        return [self.process(frame) for frame in frames]
+
+    def reset(self):
+        """从头开始回放"""
+        self.frame_index = 0
+
+    def close(self):
+        """模拟后端无需释放"""
+
+def save_landmarks(path: str, sequence: Sequence[Optional[np.ndarray]]):
+    """把关键点序列保存为 .npz（未检测到的帧记为NaN），供模拟后端回放"""
+    frames = np.full((len(sequence), NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32)
+    for i, landmarks in enumerate(sequence):
+        if landmarks is not None:
+            frames[i] = landmarks
+    np.savez_compressed(path, landmarks=frames)
+
+def load_landmarks(path: str) -> List[Optional[np.ndarray]]:
+    """读取 save_landmarks 保存的关键点序列"""
+    frames = np.load(path)['landmarks']
+    return [None if np.isnan(frame).all() else frame for frame in frames]
+
+def bench_press_landmarks(left_elbow: float, right_elbow: float, knee: float = 90.0,
+                          jitter: float = 0.0, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """构造一帧卧推姿势的关键点，肘部和膝盖角度可控
+
+    手腕与肩部保持在同一竖直线上，身体水平平躺。
+    """
+    landmarks = np.full((NUM_LANDMARKS, 4), 0.5, dtype=np.float32)
+    landmarks[:, 2] = 0.0
+    landmarks[:, 3] = 0.99
+
+    def place_arm(shoulder_index, elbow_index, wrist_index, shoulder, angle, side):
+        # 上臂和前臂等长，手腕在肩部正上方，肘部角度恰好为 angle
+        length = 0.12
+        half = np.radians(angle) / 2
+        distance = 2 * length * np.sin(half)
+        landmarks[shoulder_index, :2] = shoulder
+        landmarks[wrist_index, :2] = (shoulder[0], shoulder[1] - distance)
+        landmarks[elbow_index, :2] = (shoulder[0] + side * length * np.cos(half),
+                                      shoulder[1] - distance / 2)
+
+    def place_leg(hip_index, knee_index, ankle_index, hip, angle):
+        length = 0.15
+        landmarks[hip_index, :2] = hip
+        landmarks[knee_index, :2] = (hip[0] + length, hip[1])
+        direction = np.radians(180 - angle)
+        landmarks[ankle_index, :2] = (hip[0] + length + length * np.cos(direction),
+                                      hip[1] + length * np.sin(direction))
+
+    place_arm(11, 13, 15, (0.30, 0.50), left_elbow, -1)
+    place_arm(12, 14, 16, (0.32, 0.52), right_elbow, 1)
+    place_leg(23, 25, 27, (0.55, 0.50), knee)
+    place_leg(24, 26, 28, (0.60, 0.50), knee)
+    landmarks[0, :2] = (0.22, 0.50)
+
+    if jitter and rng is not None:
+        landmarks[:, :2] += rng.normal(0, jitter, size=(NUM_LANDMARKS, 2))
+
+    return landmarks
+
+def bench_press_sequence(frames: int, fps: int = 30, rep_seconds: float = 2.0,
+                         jitter: float = 0.002, seed: int = 0) -> List[np.ndarray]:
+    """生成连续卧推动作的关键点序列，肘部角度在75°到115°之间往复"""
+    rng = np.random.default_rng(seed)
+    sequence = []
+    for i in range(frames):
+        cycle = (1 - np.cos(2 * np.pi * i / (fps * rep_seconds))) / 2
+        elbow = 115 - 40 * cycle
+        sequence.append(bench_press_landmarks(elbow, elbow + rng.normal(0, 2), 90, jitter, rng))
+    return sequence
+
+# 可用后端的构造函数
+BACKENDS: Dict[str, Callable[..., PoseBackend]] = {
+    'mediapipe': MediaPipeBackend,
+    'fake': FakePoseBackend.bench_press
+}
+
+def available_backends() -> List[str]:
+    """返回当前环境中可用的后端名称"""
+    return [name for name in BACKENDS if name != 'mediapipe' or mp is not None]
+
+def create_backend(name: str, **kwargs) -> PoseBackend:
+    """按名称创建后端"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的姿态后端: {name}，可用: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
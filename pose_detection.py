@@ -1,53 +1,84 @@
 import cv2
-import mediapipe as mp
 import numpy as np
 from typing import List, Tuple, Dict, Optional
+from pose_backends import MediaPipeBackend, PoseBackend, POSE_CONNECTIONS
+from profiler import NULL_PROFILER
+from metrics import REGISTRY
+import time
+
+# 运行时指标
+INFERENCE_SECONDS = REGISTRY.histogram('pose_inference_seconds', '单帧姿态推理耗时（秒）')
+
+# 骨架绘制颜色（BGR）
+LANDMARK_COLOR = (0, 0, 255)
+CONNECTION_COLOR = (224, 224, 224)
 
 class PoseDetector:
-    """姿态检测器，使用MediaPipe进行人体关键点检测"""
+    """姿态检测器，推理由可替换的后端完成（默认MediaPipe）"""
+    
+    def __init__(self, backend: Optional[PoseBackend] = None, model_complexity: int = 2):
+        # 后端模型在第一次检测时才加载，只用几何计算时不需要它
+        self.backend = backend or MediaPipeBackend(model_complexity=model_complexity)
+        # 颜色转换的目标缓冲区，尺寸不变时每帧复用
+        self._rgb_buffer = None
+        # 分阶段性能分析（默认关闭）
+        self.profiler = NULL_PROFILER
     
-    def __init__(self):
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=2,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
-        
     def detect_pose(self, frame: np.ndarray) -> Optional[Dict]:
-        """检测单帧的姿态关键点"""
-        # 转换为RGB格式
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(frame_rgb)
+        """检测单帧的姿态关键点
+        
+        返回的 landmarks 为 (33, 4) 数组，每行是 x, y, z, visibility。
+        """
+        if self.backend.input_format == 'rgb':
+            # 转换为RGB格式（写入复用的缓冲区，后端会自行拷贝输入）
+            with self.profiler.stage('color'):
+                if self._rgb_buffer is None or self._rgb_buffer.shape != frame.shape:
+                    self._rgb_buffer = np.empty_like(frame)
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
+        with self.profiler.stage('inference'):
+            inference_start = time.perf_counter()
+            landmarks = self.backend.process(frame)
+            INFERENCE_SECONDS.observe(time.perf_counter() - inference_start)
         
-        if results.pose_landmarks:
-            landmarks = []
-            for landmark in results.pose_landmarks.landmark:
-                landmarks.append({
-                    'x': landmark.x,
-                    'y': landmark.y,
-                    'z': landmark.z,
-                    'visibility': landmark.visibility
-                })
-            return {
-                'landmarks': landmarks,
-                'pose_landmarks': results.pose_landmarks
-            }
-        return None
+        if landmarks is None:
+            return None
+        return {'landmarks': landmarks}
     
-    def draw_pose(self, frame: np.ndarray, pose_data: Dict) -> np.ndarray:
-        """在帧上绘制姿态关键点"""
-        annotated_frame = frame.copy()
-        self.mp_drawing.draw_landmarks(
-            annotated_frame,
-            pose_data['pose_landmarks'],
-            self.mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-        )
+    def detect_pose_batch(self, frames: List[np.ndarray]) -> List[Optional[Dict]]:
+        """批量检测多帧：后端提供 process_batch 时一次推理，否则逐帧检测"""
+        process_batch = getattr(self.backend, 'process_batch', None)
+        if process_batch is None or len(frames) == 1:
+            return [self.detect_pose(frame) for frame in frames]
+        
+        if self.backend.input_format == 'rgb':
+            with self.profiler.stage('color'):
+                frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+        with self.profiler.stage('inference'):
+            inference_start = time.perf_counter()
+            batch_landmarks = process_batch(frames)
+            per_frame = (time.perf_counter() - inference_start) / len(frames)
+        for _ in frames:
+            INFERENCE_SECONDS.observe(per_frame)
+        
+        return [None if landmarks is None else {'landmarks': landmarks} for landmarks in batch_landmarks]
+    
+    def draw_pose(self, frame: np.ndarray, pose_data: Dict, in_place: bool = False) -> np.ndarray:
+        """在帧上绘制姿态关键点和骨架连线
+        
+        in_place=True 时直接在原帧上绘制，省去每帧一次的整帧拷贝。
+        """
+        annotated_frame = frame if in_place else frame.copy()
+        height, width = annotated_frame.shape[:2]
+        landmarks = pose_data['landmarks']
+        points = np.rint(landmarks[:, :2] * (width, height)).astype(np.int32)
+        visible = landmarks[:, 3] >= 0.5
+        
+        for start, end in POSE_CONNECTIONS:
+            if visible[start] and visible[end]:
+                cv2.line(annotated_frame, tuple(points[start]), tuple(points[end]),
+                         CONNECTION_COLOR, 2)
+        for point in points[visible]:
+            cv2.circle(annotated_frame, tuple(point), 3, LANDMARK_COLOR, -1)
         return annotated_frame
     
     def get_key_points(self, pose_data: Dict) -> Dict[str, Tuple[float, float]]:
@@ -55,19 +86,19 @@ class PoseDetector:
         landmarks = pose_data['landmarks']
         
         key_points = {
-            'nose': (landmarks[0]['x'], landmarks[0]['y']),
-            'left_shoulder': (landmarks[11]['x'], landmarks[11]['y']),
-            'right_shoulder': (landmarks[12]['x'], landmarks[12]['y']),
-            'left_elbow': (landmarks[13]['x'], landmarks[13]['y']),
-            'right_elbow': (landmarks[14]['x'], landmarks[14]['y']),
-            'left_wrist': (landmarks[15]['x'], landmarks[15]['y']),
-            'right_wrist': (landmarks[16]['x'], landmarks[16]['y']),
-            'left_hip': (landmarks[23]['x'], landmarks[23]['y']),
-            'right_hip': (landmarks[24]['x'], landmarks[24]['y']),
-            'left_knee': (landmarks[25]['x'], landmarks[25]['y']),
-            'right_knee': (landmarks[26]['x'], landmarks[26]['y']),
-            'left_ankle': (landmarks[27]['x'], landmarks[27]['y']),
-            'right_ankle': (landmarks[28]['x'], landmarks[28]['y'])
+            'nose': (float(landmarks[0, 0]), float(landmarks[0, 1])),
+            'left_shoulder': (float(landmarks[11, 0]), float(landmarks[11, 1])),
+            'right_shoulder': (float(landmarks[12, 0]), float(landmarks[12, 1])),
+            'left_elbow': (float(landmarks[13, 0]), float(landmarks[13, 1])),
+            'right_elbow': (float(landmarks[14, 0]), float(landmarks[14, 1])),
+            'left_wrist': (float(landmarks[15, 0]), float(landmarks[15, 1])),
+            'right_wrist': (float(landmarks[16, 0]), float(landmarks[16, 1])),
+            'left_hip': (float(landmarks[23, 0]), float(landmarks[23, 1])),
+            'right_hip': (float(landmarks[24, 0]), float(landmarks[24, 1])),
+            'left_knee': (float(landmarks[25, 0]), float(landmarks[25, 1])),
+            'right_knee': (float(landmarks[26, 0]), float(landmarks[26, 1])),
+            'left_ankle': (float(landmarks[27, 0]), float(landmarks[27, 1])),
+            'right_ankle': (float(landmarks[28, 0]), float(landmarks[28, 1]))
         }
         
         return key_points
@@ -0,0 +1,115 @@
+import contextlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+from metrics import REGISTRY
+from video_processor import VideoProcessor
+from workout_tracker import WorkoutTracker
+
+# 运行时指标
+POOL_WAIT_SECONDS = REGISTRY.histogram('processor_pool_wait_seconds', '借出视频处理器的等待时间（秒）')
+POOL_IN_USE = REGISTRY.gauge('processor_pool_in_use', '已借出的视频处理器数')
+
+class ProcessorPool:
+    """线程安全的视频处理器池
+
+    每个处理器持有独立的姿态模型（MediaPipe计算图不能被多个线程同时使用），
+    同一时间只借给一个调用方。处理器按需创建，最多 size 个；全部借出时调用方阻塞等待，
+    等待时间计入统计。归还时清空会话状态，模型保留给下一个调用方复用。
+    所有处理器共用同一个锻炼跟踪器（tracker 为空时新建），不会各自读写同一个数据文件。
+    """
+
+    def __init__(self, size: Optional[int] = None, factory: Optional[Callable[[], VideoProcessor]] = None,
+                 tracker: Optional[WorkoutTracker] = None):
+        self.size = max(1, size or os.cpu_count() or 1)
+        self.tracker = tracker or WorkoutTracker()
+        self.factory = factory or (lambda: VideoProcessor(tracker=self.tracker))
+
+        self._idle = []
+        self._created = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+        # 等待统计
+        self.checkouts = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def checkout(self, timeout: Optional[float] = None) -> VideoProcessor:
+        """借出一个处理器，池已耗尽时最多等待 timeout 秒（None 表示一直等待）"""
+        start = time.perf_counter()
+        create = False
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                remaining = None if timeout is None else timeout - (time.perf_counter() - start)
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"等待视频处理器超时（{timeout}秒）")
+                self._condition.wait(remaining)
+
+            if self._idle:
+                processor = self._idle.pop()
+            else:
+                # 先占用名额，在锁外加载模型
+                self._created += 1
+                create = True
+            self._in_use += 1
+            POOL_IN_USE.set(self._in_use)
+        self._record_wait(time.perf_counter() - start)
+
+        if create:
+            try:
+                processor = self.factory()
+                processor.tracker = self.tracker
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._in_use -= 1
+                    POOL_IN_USE.set(self._in_use)
+                    self._condition.notify()
+                raise
+        return processor
+
+    def release(self, processor: VideoProcessor):
+        """归还处理器并清空其会话状态"""
+        processor.reset_session()
+        with self._condition:
+            self._idle.append(processor)
+            self._in_use -= 1
+            POOL_IN_USE.set(self._in_use)
+            self._condition.notify()
+
+    @contextlib.contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """在 with 块内借用一个处理器"""
+        processor = self.checkout(timeout)
+        try:
+            yield processor
+        finally:
+            self.release(processor)
+
+    def stats(self) -> Dict:
+        """返回池的使用和等待统计"""
+        with self._condition:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'mean_wait_ms': self.total_wait / self.waits * 1000 if self.waits else 0.0,
+                'max_wait_ms': self.max_wait * 1000
+            }
+
+    def _record_wait(self, wait: float):
+        # 拿到空闲处理器的等待时间只有加锁开销，不计为等待
+        waited = wait > 0.001
+        with self._condition:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+        POOL_WAIT_SECONDS.observe(wait)
@@ -0,0 +1,189 @@
+import bisect
+import json
+import math
+import platform
+import os
+import time
+from typing import Dict, Optional
+
+class StageHistogram:
+    """单个阶段的耗时直方图，对数分桶，记录开销为常数"""
+
+    # 1微秒到100秒，每个数量级20个桶
+    BUCKETS_PER_DECADE = 20
+    MIN_SECONDS = 1e-6
+    MAX_SECONDS = 100.0
+
+    _bounds = None
+
+    def __init__(self):
+        if StageHistogram._bounds is None:
+            decades = int(math.log10(self.MAX_SECONDS / self.MIN_SECONDS))
+            steps = decades * self.BUCKETS_PER_DECADE
+            StageHistogram._bounds = [self.MIN_SECONDS * 10 ** (i / self.BUCKETS_PER_DECADE)
+                                      for i in range(steps + 1)]
+        self.counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """记录一次耗时（秒）"""
+        self.counts[bisect.bisect_left(self._bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """估算分位数（秒），取所在桶的上界"""
+        if not self.count:
+            return 0.0
+        target = self.count * q / 100
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                if i >= len(self._bounds):
+                    return self.max
+                return min(self._bounds[i], self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        """返回统计摘要（毫秒）"""
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000
+        }
+
+class _StageTimer:
+    """阶段计时上下文"""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: StageHistogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+class _NullTimer:
+    """关闭分析时使用的空计时上下文"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class StageProfiler:
+    """分阶段性能分析器：解码、颜色转换、推理、特征提取、评分、绘制、编码
+
+    每个阶段只应由一个线程记录（编码阶段在编码线程中记录）。
+    """
+
+    STAGES = ['decode', 'color', 'inference', 'features', 'scoring', 'drawing', 'encode', 'frame']
+
+    STAGE_NAMES = {
+        'decode': '解码',
+        'color': '颜色转换',
+        'inference': '姿态推理',
+        'features': '特征提取',
+        'scoring': '评分',
+        'drawing': '绘制',
+        'encode': '编码',
+        'frame': '单帧总计'
+    }
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms = {}
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def stage(self, name: str):
+        """返回阶段计时上下文：with profiler.stage('decode'): ..."""
+        if not self.enabled:
+            return _NULL_TIMER
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = StageHistogram()
+        return _StageTimer(histogram)
+
+    def record(self, name: str, seconds: float):
+        """直接记录一次阶段耗时"""
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = StageHistogram()
+        histogram.record(seconds)
+
+    def finish(self):
+        """标记分析结束，用于计算总耗时"""
+        self.finished_at = time.perf_counter()
+
+    def report(self) -> Dict:
+        """生成分析报告"""
+        end = self.finished_at or time.perf_counter()
+        frames = self.histograms['frame'].count if 'frame' in self.histograms else 0
+        wall_time = end - self.started_at
+        ordered = [name for name in self.STAGES if name in self.histograms]
+        ordered += [name for name in self.histograms if name not in self.STAGES]
+
+        return {
+            'hardware': {
+                'machine': platform.machine(),
+                'processor': platform.processor(),
+                'cpu_count': os.cpu_count(),
+                'python': platform.python_version()
+            },
+            'frames': frames,
+            'wall_time_s': wall_time,
+            'fps': frames / wall_time if wall_time > 0 else 0,
+            'stages': {name: self.histograms[name].summary() for name in ordered}
+        }
+
+    def print_table(self, report: Optional[Dict] = None):
+        """以表格形式打印各阶段耗时（默认为本分析器的报告）"""
+        print_report(report or self.report())
+
+    def save_json(self, path: str, report: Optional[Dict] = None) -> str:
+        """把报告写入JSON文件（默认为本分析器的报告）"""
+        return save_report(path, report or self.report())
+
+NULL_PROFILER = StageProfiler(enabled=False)
+
+def print_report(report: Dict):
+    """以表格形式打印报告（如分析结果中的 'profile'）中各阶段的耗时"""
+    frame_total = report['stages'].get('frame', {}).get('total_ms', 0)
+
+    print(f"共 {report['frames']} 帧, 耗时 {report['wall_time_s']:.2f}秒, {report['fps']:.1f}fps")
+    print(f"{'阶段':<10}{'次数':>8}{'平均ms':>10}{'P50ms':>10}{'P95ms':>10}{'P99ms':>10}{'占比':>8}")
+    for name, stats in report['stages'].items():
+        share = stats['total_ms'] / frame_total * 100 if frame_total and name != 'frame' else 100
+        print(f"{StageProfiler.STAGE_NAMES.get(name, name):<10}{stats['count']:>8}{stats['mean_ms']:>10.2f}"
+              f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{share:>7.1f}%")
+    if 'encode' in report['stages']:
+        print("注: 编码在后台线程执行，与分析并行，占比可能超过100%")
+
+def save_report(path: str, report: Dict) -> str:
+    """把报告写入JSON文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
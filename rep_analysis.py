@@ -0,0 +1,146 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from bench_press_analyzer import ANGLE_NAMES, PHASES
+from result_columns import SetColumns
+
+# 极值点类型
+PEAK = 1     # 肘部角度的局部最大值（推起到顶）
+VALLEY = -1  # 肘部角度的局部最小值（下放到底）
+
+def analyze_reps(columns: SetColumns, min_range: float = 20.0, smoothing: int = 5) -> List[Dict]:
+    """把一组分割为单次重复并计算运动学指标
+
+    以左右肘部角度的平均值为序列，平滑后找出全部拐点，再去掉幅度小于 min_range 度的
+    抖动，得到交替的顶点和底点，并在平滑窗口内移到原始序列的极值处。
+    每个“顶点→底点→顶点”为一次重复：
+
+        bottom_angle / top_angle   底部和顶部的肘部角度（顶部取两端较大者）
+        range_of_motion            动作幅度（度）
+        eccentric_duration         离心（下放）时长（秒）
+        concentric_duration        向心（推起）时长（秒）
+        tempo                      离心与向心时长之比，推起过快时大于1
+        asymmetry                  这次重复中左右肘部角度差的平均绝对值（度）
+
+    逐帧的计算都是向量化的，只有筛选拐点时遍历拐点本身。
+    个别帧缺少肘部角度（关键点未检测到）时用前后帧线性插值，有效帧不足3帧的组返回空列表。
+    """
+    left = _fill_gaps(columns.angles[:, ANGLE_NAMES.index('left_elbow_angle')].astype(np.float64))
+    right = _fill_gaps(columns.angles[:, ANGLE_NAMES.index('right_elbow_angle')].astype(np.float64))
+    elbow = (left + right) / 2
+    if len(elbow) < 3 or not np.all(np.isfinite(elbow)):
+        return []
+
+    turns = _turning_points(_smooth(elbow, smoothing))
+    points = _zigzag(turns, elbow, min_range)
+    if not points:
+        return []
+    kinds = np.array([kind for _, kind in points], dtype=np.int8)
+    positions = _refine(np.array([position for position, _ in points], dtype=np.int64),
+                        kinds, elbow, smoothing // 2)
+
+    # 前后都有顶点的底点构成一次重复
+    bottoms = np.flatnonzero(kinds == VALLEY)
+    bottoms = bottoms[(bottoms > 0) & (bottoms < len(kinds) - 1)]
+    if not len(bottoms):
+        return []
+    start, bottom, end = positions[bottoms - 1], positions[bottoms], positions[bottoms + 1]
+
+    timestamps = columns.timestamp
+    bottom_angle = elbow[bottom]
+    top_angle = np.maximum(elbow[start], elbow[end])
+    eccentric = timestamps[bottom] - timestamps[start]
+    concentric = timestamps[end] - timestamps[bottom]
+
+    # 各次重复区间 [start, end] 内左右差的平均值（前缀和）
+    cumulative = np.concatenate(([0.0], np.cumsum(np.abs(left - right))))
+    asymmetry = (cumulative[end + 1] - cumulative[start]) / (end - start + 1)
+
+    frames = columns.frame
+    return [{
+        'rep': i + 1,
+        'start_frame': int(frames[start[i]]),
+        'bottom_frame': int(frames[bottom[i]]),
+        'end_frame': int(frames[end[i]]),
+        'bottom_angle': float(bottom_angle[i]),
+        'top_angle': float(top_angle[i]),
+        'range_of_motion': float(top_angle[i] - bottom_angle[i]),
+        'eccentric_duration': float(eccentric[i]),
+        'concentric_duration': float(concentric[i]),
+        'tempo': float(eccentric[i] / concentric[i]) if concentric[i] > 0 else None,
+        'asymmetry': float(asymmetry[i])
+    } for i in range(len(bottom))]
+
+def summarize_set(frames: List[Dict]) -> Dict:
+    """由一组的逐帧数据生成组汇总（视频文件分析和视频流分析共用）
+
+    返回 reps（DOWN→UP 的阶段转换次数）、average_score、frames、duration（秒，缺少时间戳时为0）、
+    rep_metrics（见 analyze_reps）和按列保存的逐帧数据 columns（见 SetColumns）。
+    """
+    columns = SetColumns.from_frames(frames)
+    down, up = PHASES.index('DOWN'), PHASES.index('UP')
+    duration = float(columns.timestamp[-1] - columns.timestamp[0])
+    return {
+        'reps': int(np.count_nonzero((columns.phase[:-1] == down) & (columns.phase[1:] == up))),
+        'average_score': float(columns.score.mean()),
+        'frames': len(columns),
+        'duration': duration if np.isfinite(duration) else 0.0,
+        'rep_metrics': analyze_reps(columns),
+        'columns': columns
+    }
+
+def _fill_gaps(values: np.ndarray) -> np.ndarray:
+    """用前后有效值线性插值补上NaN，两端按最近的有效值延伸；有效值少于3个时原样返回"""
+    valid = np.isfinite(values)
+    if valid.all() or valid.sum() < 3:
+        return values
+    positions = np.arange(len(values))
+    return np.interp(positions, positions[valid], values[valid])
+
+def _smooth(values: np.ndarray, window: int) -> np.ndarray:
+    """滑动平均（两端按边缘值延伸，长度不变）"""
+    if window <= 1 or len(values) < window:
+        return values
+    half = window // 2
+    padded = np.pad(values, (half, window - 1 - half), mode='edge')
+    return np.convolve(padded, np.ones(window) / window, mode='valid')
+
+def _turning_points(values: np.ndarray) -> List[Tuple[int, int]]:
+    """找出序列的全部拐点，返回 [(位置, PEAK/VALLEY)]，两个端点也作为拐点"""
+    direction = np.sign(np.diff(values))
+    # 平台（差分为0）沿用前一个非零方向
+    filled = np.where(direction != 0, np.arange(len(direction)), 0)
+    np.maximum.accumulate(filled, out=filled)
+    direction = direction[filled]
+    moving = np.flatnonzero(direction)
+    if not len(moving):
+        return []
+
+    changes = np.flatnonzero((direction[1:] != direction[:-1]) & (direction[:-1] != 0)) + 1
+    first, last = direction[moving[0]], direction[-1]
+    points = [(0, PEAK if first < 0 else VALLEY)]
+    points += [(int(position), PEAK if direction[position - 1] > 0 else VALLEY) for position in changes]
+    points.append((len(values) - 1, PEAK if last > 0 else VALLEY))
+    return points
+
+def _refine(positions: np.ndarray, kinds: np.ndarray, values: np.ndarray, radius: int) -> np.ndarray:
+    """把拐点移到原始序列中附近 radius 帧内的最大值（顶点）或最小值（底点）处"""
+    if radius <= 0:
+        return positions
+    window = np.clip(positions[:, None] + np.arange(-radius, radius + 1), 0, len(values) - 1)
+    best = np.argmax(values[window] * kinds[:, None], axis=1)
+    return window[np.arange(len(positions)), best]
+
+def _zigzag(points: List[Tuple[int, int]], values: np.ndarray, min_range: float) -> List[Tuple[int, int]]:
+    """去掉幅度小于 min_range 的拐点，保留交替的顶点和底点
+
+    同类拐点相邻时保留更极端的一个。values 为未平滑的序列，幅度按拐点处的原始角度计算。
+    """
+    kept = []
+    for position, kind in points:
+        if kept and kept[-1][1] == kind:
+            # 同类拐点：保留更高的顶点或更低的底点
+            if kind * (values[position] - values[kept[-1][0]]) > 0:
+                kept[-1] = (position, kind)
+        elif not kept or abs(values[position] - values[kept[-1][0]]) >= min_range:
+            kept.append((position, kind))
+    return kept
@@ -0,0 +1,231 @@
+import json
+import os
+from typing import Dict, List, Optional
+import numpy as np
+from bench_press_analyzer import ANGLE_NAMES, FEEDBACK_MESSAGES, PHASES, feedback_messages
+
+# 二进制结果文件的格式版本
+RESULT_FORMAT_VERSION = 1
+
+# 逐帧列（SetColumns 的属性）
+COLUMN_FIELDS = ('frame', 'timestamp', 'phase', 'score', 'angles', 'feedback')
+
+class SetColumns:
+    """一组的逐帧分析数据，按列保存为NumPy数组
+
+    frame: 帧位置 (int32)，timestamp: 时间戳（秒, float64），phase: 阶段代码 (uint8, 见 PHASES)，
+    score: 分数 (float32)，angles: 角度矩阵 (帧数 x len(ANGLE_NAMES), float32)，
+    feedback: 反馈掩码 (uint16, 见 FEEDBACK_MESSAGES)。
+    反馈文字只在代码表中保存一份，需要时用 to_frames() 还原为逐帧字典。
+    """
+
+    def __init__(self, frame: np.ndarray, timestamp: np.ndarray, phase: np.ndarray,
+                 score: np.ndarray, angles: np.ndarray, feedback: np.ndarray):
+        self.frame = frame
+        self.timestamp = timestamp
+        self.phase = phase
+        self.score = score
+        self.angles = angles
+        self.feedback = feedback
+
+    @classmethod
+    def from_frames(cls, frames: List[Dict]) -> 'SetColumns':
+        """由逐帧字典构造（缺少帧位置、时间戳、角度（整体或部分）或反馈掩码的帧分别记为序号、NaN、NaN和0）"""
+        count = len(frames)
+        phase_codes = {phase: code for code, phase in enumerate(PHASES)}
+        angles = np.full((count, len(ANGLE_NAMES)), np.nan, dtype=np.float32)
+        for i, frame in enumerate(frames):
+            if frame.get('angles'):
+                angles[i] = [frame['angles'].get(name, np.nan) for name in ANGLE_NAMES]
+        return cls(
+            frame=np.fromiter((frame.get('frame', i + 1) for i, frame in enumerate(frames)),
+                              dtype=np.int32, count=count),
+            timestamp=np.fromiter((np.nan if frame.get('timestamp') is None else frame['timestamp']
+                                   for frame in frames), dtype=np.float64, count=count),
+            phase=np.fromiter((phase_codes[frame['phase']] for frame in frames), dtype=np.uint8, count=count),
+            score=np.fromiter((frame['score'] for frame in frames), dtype=np.float32, count=count),
+            angles=angles,
+            feedback=np.fromiter((frame.get('feedback_mask', 0) for frame in frames),
+                                 dtype=np.uint16, count=count)
+        )
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SetColumns):
+            return NotImplemented
+        return all(np.array_equal(getattr(self, field), getattr(other, field), equal_nan=True)
+                   for field in COLUMN_FIELDS)
+
+    def angle(self, name: str) -> np.ndarray:
+        """返回一个角度的列"""
+        return self.angles[:, ANGLE_NAMES.index(name)]
+
+    def phase_names(self) -> List[str]:
+        """把阶段代码还原为阶段名称"""
+        return [PHASES[code] for code in self.phase.tolist()]
+
+    def to_frames(self) -> List[Dict]:
+        """还原为逐帧字典（旧的 phase_data 格式，反馈为文字列表，缺少的时间戳为None）"""
+        angles = self.angles.tolist()
+        return [{
+            'frame': frame,
+            'timestamp': None if np.isnan(timestamp) else timestamp,
+            'phase': PHASES[phase],
+            'score': score,
+            'angles': dict(zip(ANGLE_NAMES, angles[i])),
+            'feedback': feedback_messages(feedback)
+        } for i, (frame, timestamp, phase, score, feedback) in enumerate(zip(
+            self.frame.tolist(), self.timestamp.tolist(), self.phase.tolist(),
+            self.score.tolist(), self.feedback.tolist()))]
+
+    def to_dict(self) -> Dict:
+        """转换为可JSON序列化的列字典"""
+        return {field: getattr(self, field).tolist() for field in COLUMN_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SetColumns':
+        """由 to_dict() 的结果还原"""
+        return cls(
+            frame=np.asarray(data['frame'], dtype=np.int32),
+            timestamp=np.asarray(data['timestamp'], dtype=np.float64),
+            phase=np.asarray(data['phase'], dtype=np.uint8),
+            score=np.asarray(data['score'], dtype=np.float32),
+            angles=np.asarray(data['angles'], dtype=np.float32).reshape(-1, len(ANGLE_NAMES)),
+            feedback=np.asarray(data['feedback'], dtype=np.uint16)
+        )
+
+def _column_sets(results: Dict) -> List[Dict]:
+    """分析结果中带逐帧列的组汇总"""
+    sets = list(results.get('sets', []))
+    if results.get('partial_set'):
+        sets.append(results['partial_set'])
+    return [set_summary for set_summary in sets if 'columns' in set_summary]
+
+def json_default(value):
+    """json.dumps 的 default：把NumPy标量和逐帧列（SetColumns）转换为可序列化的Python类型
+
+    各模块写JSON（结果、检查点、任务状态、事件）时共用。
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, SetColumns):
+        return value.to_dict()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+def save_results(path: str, results: Dict):
+    """把分析结果保存为二进制 .npz 文件
+
+    各组的逐帧列首尾相接存为几个数组，按偏移量切分；其余字段存为一段JSON。
+    先写临时文件再替换，进程中途退出也不会留下半个文件。
+    """
+    sets = _column_sets(results)
+    columns = [set_summary['columns'] for set_summary in sets]
+    offsets = np.cumsum([0] + [len(set_columns) for set_columns in columns], dtype=np.int64)
+
+    # 逐帧列替换为其在数组中的序号
+    blocks = {id(set_summary): i for i, set_summary in enumerate(sets)}
+
+    def strip(set_summary):
+        if id(set_summary) not in blocks:
+            return set_summary
+        return dict(set_summary, columns=blocks[id(set_summary)])
+
+    meta = dict(results, sets=[strip(set_summary) for set_summary in results.get('sets', [])])
+    if results.get('partial_set'):
+        meta['partial_set'] = strip(results['partial_set'])
+    meta['format_version'] = RESULT_FORMAT_VERSION
+    meta['phases'] = list(PHASES)
+    meta['angle_names'] = list(ANGLE_NAMES)
+    meta['feedback_codes'] = list(FEEDBACK_MESSAGES)
+
+    arrays = {'offsets': offsets}
+    empty = SetColumns.from_frames([])
+    for field in COLUMN_FIELDS:
+        arrays[field] = np.concatenate([getattr(set_columns, field) for set_columns in columns] +
+                                       [getattr(empty, field)])
+    meta_bytes = json.dumps(meta, ensure_ascii=False, default=json_default).encode('utf-8')
+    arrays['meta'] = np.frombuffer(meta_bytes, dtype=np.uint8)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def load_results(path: str) -> Dict:
+    """读取 save_results 保存的分析结果，各组的逐帧列为同一组数组的切片
+
+    保存时的代码表与当前不同（如新增了反馈或调整了顺序）时，阶段代码、反馈掩码和角度列
+    按名称换算为当前的代码表：当前版本已不存在的阶段记为 IDLE，已不存在的反馈被丢弃，
+    保存时没有的角度记为NaN。
+    """
+    with np.load(path) as data:
+        arrays = {field: data[field] for field in COLUMN_FIELDS}
+        offsets = data['offsets']
+        results = json.loads(data['meta'].tobytes().decode('utf-8'))
+
+    if results.pop('format_version') != RESULT_FORMAT_VERSION:
+        raise ValueError(f"不支持的结果文件版本: {path}")
+    _remap_codes(arrays, results.pop('phases'), results.pop('angle_names'), results['feedback_codes'])
+    results['feedback_codes'] = list(FEEDBACK_MESSAGES)
+
+    def restore(set_summary):
+        if 'columns' in set_summary:
+            begin, end = offsets[set_summary['columns']], offsets[set_summary['columns'] + 1]
+            set_summary['columns'] = SetColumns(**{field: arrays[field][begin:end]
+                                                   for field in COLUMN_FIELDS})
+        return set_summary
+
+    results['sets'] = [restore(set_summary) for set_summary in results.get('sets', [])]
+    if results.get('partial_set'):
+        restore(results['partial_set'])
+    return results
+
+def _remap_codes(arrays: Dict[str, np.ndarray], phases: List[str], angle_names: List[str],
+                 feedback_codes: List[str]):
+    """把按保存时代码表编码的列换算为当前的代码表（相同时不做任何处理）"""
+    if list(phases) != list(PHASES):
+        lookup = np.array([PHASES.index(phase) if phase in PHASES else 0 for phase in phases], dtype=np.uint8)
+        arrays['phase'] = lookup[arrays['phase']]
+
+    if list(angle_names) != list(ANGLE_NAMES):
+        angles = np.full((len(arrays['angles']), len(ANGLE_NAMES)), np.nan, dtype=np.float32)
+        for column, name in enumerate(angle_names):
+            if name in ANGLE_NAMES:
+                angles[:, ANGLE_NAMES.index(name)] = arrays['angles'][:, column]
+        arrays['angles'] = angles
+
+    if list(feedback_codes) != list(FEEDBACK_MESSAGES):
+        stored = arrays['feedback']
+        feedback = np.zeros_like(stored)
+        for bit, message in enumerate(feedback_codes):
+            if message in FEEDBACK_MESSAGES:
+                feedback |= ((stored >> bit) & 1) << FEEDBACK_MESSAGES.index(message)
+        arrays['feedback'] = feedback
+
+def results_to_json(results: Dict, per_frame: bool = False, path: Optional[str] = None) -> str:
+    """把分析结果转换为JSON（只在需要时调用）
+
+    per_frame=False 时逐帧列输出为列字典，per_frame=True 时还原为旧的逐帧字典列表 'phase_data'。
+    path 不为空时同时写入文件。
+    """
+    def convert(set_summary):
+        if 'columns' not in set_summary:
+            return set_summary
+        set_columns = set_summary['columns']
+        converted = {key: value for key, value in set_summary.items() if key != 'columns'}
+        if per_frame:
+            converted['phase_data'] = set_columns.to_frames()
+        else:
+            converted['columns'] = set_columns.to_dict()
+        return converted
+
+    output = dict(results, sets=[convert(set_summary) for set_summary in results.get('sets', [])])
+    if results.get('partial_set'):
+        output['partial_set'] = convert(results['partial_set'])
+    text = json.dumps(output, ensure_ascii=False, indent=2, default=json_default)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return text
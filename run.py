@@ -10,34 +10,44 @@ import argparse
 import subprocess
 from pathlib import Path
 
-def check_dependencies():
-    """检查依赖是否安装"""
-    required_packages = [
-        'opencv-python',
-        'mediapipe',
-        'streamlit',
-        'plotly',
-        'pandas',
-        'numpy'
-    ]
+# 依赖包及其导入名
+REQUIRED_PACKAGES = {
+    'opencv-python': 'cv2',
+    'mediapipe': 'mediapipe',
+    'pandas': 'pandas',
+    'numpy': 'numpy'
+}
+
+# 只有Web界面需要的依赖包
+WEB_PACKAGES = {
+    'streamlit': 'streamlit',
+    'plotly': 'plotly'
+}
+
+def check_dependencies(command="web", stream=None):
+    """检查命令需要的依赖是否安装（streamlit 和 plotly 只在 web 命令时检查），提示信息写到 stream"""
+    stream = stream or sys.stdout
+    required_packages = dict(REQUIRED_PACKAGES)
+    if command == "web":
+        required_packages.update(WEB_PACKAGES)
     
     missing_packages = []
     
-    for package in required_packages:
+    for package, module in required_packages.items():
         try:
-            __import__(package.replace('-', '_'))
+            __import__(module)
         except ImportError:
             missing_packages.append(package)
     
     if missing_packages:
-        print("❌ 缺少以下依赖包:")
+        print("❌ 缺少以下依赖包:", file=stream)
         for package in missing_packages:
-            print(f"  - {package}")
-        print("\n请运行以下命令安装依赖:")
-        print("pip install -r requirements.txt")
+            print(f"  - {package}", file=stream)
+        print("\n请运行以下命令安装依赖:", file=stream)
+        print("pip install -r requirements.txt", file=stream)
         return False
     
-    print("✅ 所有依赖包已安装")
+    print("✅ 所有依赖包已安装", file=stream)
     return True
 
 def start_web_app():
@@ -65,19 +75,21 @@ def start_demo():
     except Exception as e:
         print(f"❌ 启动失败: {str(e)}")
 
-def start_realtime():
-    """启动实时分析"""
-    print("⚡ 启动实时分析...")
+def start_realtime(camera_id=0, headless=False, event_target=None):
+    """启动实时分析（camera_id 为摄像头编号或视频文件路径）"""
+    # 无界面模式下标准输出用于事件流，提示信息写到标准错误
+    log_stream = sys.stderr if headless else sys.stdout
+    print("⚡ 启动实时分析...", file=log_stream)
     try:
         from video_processor import VideoProcessor
         processor = VideoProcessor()
-        processor.start_realtime_analysis()
+        processor.start_realtime_analysis(camera_id, headless=headless, event_target=event_target)
     except KeyboardInterrupt:
-        print("\n👋 实时分析已停止")
+        print("\n👋 实时分析已停止", file=log_stream)
     except Exception as e:
-        print(f"❌ 启动失败: {str(e)}")
+        print(f"❌ 启动失败: {str(e)}", file=log_stream)
 
-def analyze_video(video_path):
+def analyze_video(video_path, motion_threshold=None, two_pass=False, results_path=None):
     """分析指定视频文件"""
     print(f"📹 分析视频文件: {video_path}")
     
@@ -88,16 +100,132 @@ def analyze_video(video_path):
     try:
         from video_processor import VideoProcessor
         processor = VideoProcessor()
-        results = processor.process_video_file(video_path)
+        results = processor.process_video_file(video_path, motion_threshold=motion_threshold,
+                                               two_pass=two_pass)
         
         print("\n✅ 分析完成!")
         print(f"📊 总重复次数: {results['total_reps']}")
         print(f"📈 平均分数: {results['average_score']:.1f}")
         print(f"⏱️  训练时长: {results['duration']:.1f}秒")
+        if 'motion_gating' in results:
+            gating = results['motion_gating']
+            print(f"💤 静止跳过: {gating['skipped_frames']}/{gating['analyzed_frames']}帧 "
+                  f"({gating['skip_ratio']*100:.0f}%), 节省约 {gating['time_saved_seconds']:.1f}秒")
+        if 'two_pass' in results:
+            print(f"🔎 两遍分析: 精细分析 {results['two_pass']['fine_frames']}/{results['total_frames']}帧 "
+                  f"({results['two_pass']['fine_ratio']*100:.0f}%)")
+        if results_path:
+            # .json 导出为逐帧JSON，其他扩展名保存为二进制结果
+            from result_columns import results_to_json, save_results
+            if results_path.endswith('.json'):
+                results_to_json(results, per_frame=True, path=results_path)
+            else:
+                save_results(results_path, results)
+            print(f"💾 分析结果: {results_path}")
         
     except Exception as e:
         print(f"❌ 分析失败: {str(e)}")
 
+def profile_video(video_path, report_path=None, output_path=None):
+    """分阶段分析视频处理耗时"""
+    print(f"⏱️  性能分析: {video_path}")
+    
+    if not os.path.exists(video_path):
+        print(f"❌ 视频文件不存在: {video_path}")
+        return
+    
+    try:
+        from video_processor import VideoProcessor
+        from profiler import print_report, save_report
+        processor = VideoProcessor()
+        results = processor.process_video_file(video_path, output_path, profile=True)
+        report = results['profile']
+        
+        print("\n📊 各阶段耗时:")
+        print_report(report)
+        
+        if not report_path:
+            report_path = f"profile_{Path(video_path).stem}.json"
+        save_report(report_path, report)
+        print(f"\n✅ 报告已保存: {report_path}")
+        
+    except Exception as e:
+        print(f"❌ 性能分析失败: {str(e)}")
+
+def start_server(host, port, workers):
+    """启动帧流分析服务"""
+    try:
+        from analysis_server import AnalysisServer
+        server = AnalysisServer(host, port, workers).start()
+        print(f"📡 分析服务已启动: {host}:{server.port}（{workers} 个推理线程），按 Ctrl+C 停止")
+        server.serve_forever()
+        print("\n👋 分析服务已停止")
+    except Exception as e:
+        print(f"❌ 启动失败: {str(e)}")
+
+def replay_to_server(video_path, host, port):
+    """把视频文件回放到分析服务"""
+    print(f"🔁 回放视频到分析服务: {video_path} -> {host}:{port}")
+    
+    if not os.path.exists(video_path):
+        print(f"❌ 视频文件不存在: {video_path}")
+        return
+    
+    try:
+        from analysis_server import replay_video
+        events = replay_video(video_path, host, port)
+        stats = events['stats']
+        summary = events['summary'] or {}
+        
+        print("\n✅ 回放完成!")
+        print(f"📊 发送帧数: {stats['sent_frames']}, 收到结果: {stats['received_results']}")
+        print(f"📈 重复次数: {summary.get('reps', 0)}, 平均分数: {summary.get('average_score', 0):.1f}")
+        print(f"⏱️  吞吐量: {stats['fps']:.1f}fps, 延迟 P50 {stats['latency_p50_ms']:.1f}ms, "
+              f"P95 {stats['latency_p95_ms']:.1f}ms")
+        
+    except Exception as e:
+        print(f"❌ 回放失败: {str(e)}")
+
+def start_multi_stream(sources, workers, events_target):
+    """多路摄像头并发实时分析"""
+    sources = [source.strip() for source in sources.split(',') if source.strip()]
+    if not sources:
+        print("❌ 请指定视频源")
+        return
+    print(f"🎥 启动多路实时分析: {', '.join(sources)}")
+    
+    try:
+        from multi_stream import MultiStreamAnalyzer
+        analyzer = MultiStreamAnalyzer(sources, workers, event_target=events_target)
+        stats = analyzer.run()
+        total_reps = sum(stream['reps'] for stream in stats['streams'].values())
+        print(f"\n✅ 多路分析结束，共 {len(stats['streams'])} 路，{total_reps} 次重复")
+    except Exception as e:
+        print(f"❌ 多路分析失败: {str(e)}")
+
+def analyze_stations(video_path, stations_spec, workers, output_path=None):
+    """单个广角摄像头覆盖多个训练站的分析"""
+    source = int(video_path) if video_path.isdigit() else video_path
+    if isinstance(source, str) and not os.path.exists(source):
+        print(f"❌ 视频文件不存在: {source}")
+        return
+    
+    try:
+        from multi_station import MultiStationAnalyzer, parse_stations
+        stations = parse_stations(stations_spec)
+        print(f"🏋️ 多训练站分析: {video_path}（{', '.join(station.name for station in stations)}）")
+        analyzer = MultiStationAnalyzer(stations, workers)
+        results = analyzer.process_video(source, output_path)
+        
+        print("\n✅ 分析完成!")
+        for name, station in results['stations'].items():
+            print(f"📊 {name}: {station['reps']}次重复, {station['sets']}组, "
+                  f"平均分数 {station['average_score']:.1f}")
+        if output_path:
+            print(f"🎬 标注视频: {output_path}")
+    except Exception as e:
+        print(f"❌ 多训练站分析失败: {str(e)}")
+
 def show_help():
     """显示帮助信息"""
     print("💪 卧推姿势分析系统")
@@ -106,7 +234,25 @@ def show_help():
     print("  python run.py web          # 启动Web界面")
     print("  python run.py demo         # 启动演示脚本")
     print("  python run.py realtime     # 启动实时分析")
+    print("  python run.py realtime --headless [--events host:port]")
+    print("                             # 无界面实时分析，输出JSON事件流")
     print("  python run.py video <file> # 分析指定视频文件")
+    print("  python run.py video <file> --motion-threshold 0.01")
+    print("                             # 画面静止时跳过推理，适合休息较多的录像")
+    print("  python run.py video <file> --two-pass")
+    print("                             # 先粗扫描定位卧推片段，只精细分析这些片段")
+    print("  python run.py video <file> --save-results r.npz")
+    print("                             # 保存分析结果（.npz 二进制列格式，.json 逐帧JSON）")
+    print("  python run.py profile <file> [--report r.json]")
+    print("                             # 分阶段性能分析，输出耗时表和JSON报告")
+    print("  python run.py serve [--port 9200] [--workers 2]")
+    print("                             # 启动帧流分析服务，供摄像头客户端发送帧")
+    print("  python run.py replay <file> [--port 9200]")
+    print("                             # 把视频文件回放到分析服务（环回测试）")
+    print("  python run.py multi --sources 0,1,a.mp4 [--workers 2] [--events -]")
+    print("                             # 多路摄像头并发实时分析，视频文件可代替摄像头")
+    print("  python run.py stations <file> [--stations 3] [--output out.mp4]")
+    print("                             # 一个广角摄像头覆盖多个训练站，按区域分别分析")
     print("  python run.py install      # 安装依赖")
     print("  python run.py help         # 显示帮助")
     print("\n示例:")
@@ -126,33 +272,92 @@ def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="卧推姿势分析系统")
     parser.add_argument("command", nargs="?", default="help", 
-                       choices=["web", "demo", "realtime", "video", "install", "help"],
+                       choices=["web", "demo", "realtime", "video", "profile", "serve", "replay",
+                                "multi", "stations", "install", "help"],
                        help="要执行的命令")
     parser.add_argument("video_file", nargs="?", help="要分析的视频文件路径")
+    parser.add_argument("--report", default=None, help="性能分析报告的JSON输出路径")
+    parser.add_argument("--output", default=None, help="性能分析和多训练站分析输出的标注视频路径")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                       help="在本地该端口提供Prometheus文本格式的 /metrics 接口")
+    parser.add_argument("--metrics-snapshot", default=None, help="定期写入的指标快照JSON文件")
+    parser.add_argument("--motion-threshold", type=float, default=None,
+                       help="视频分析的运动门控阈值（变化像素比例，如 0.01），画面静止的帧跳过推理")
+    parser.add_argument("--two-pass", action="store_true",
+                       help="视频分析先低分辨率抽帧扫描卧推片段，再只对这些片段完整分析")
+    parser.add_argument("--save-results", default=None,
+                       help="保存视频分析结果: .npz 为二进制列格式，.json 为逐帧JSON")
+    parser.add_argument("--camera", default="0", help="实时分析使用的摄像头编号或视频文件路径")
+    parser.add_argument("--headless", action="store_true",
+                       help="实时分析不显示画面，以JSON Lines输出重复、组和分数事件")
+    parser.add_argument("--events", default=None,
+                       help="事件输出目标: '-' 为标准输出, 'host:port' 或Unix套接字路径")
+    parser.add_argument("--host", default="127.0.0.1", help="分析服务的监听/连接地址")
+    parser.add_argument("--port", type=int, default=9200, help="分析服务的端口")
+    parser.add_argument("--workers", type=int, default=2, help="分析服务和多路分析的推理线程数")
+    parser.add_argument("--sources", default="0",
+                       help="多路分析的视频源，逗号分隔的摄像头编号或视频文件路径")
+    parser.add_argument("--stations", default="3",
+                       help="训练站区域: 数字表示等分为几列，或 '名称:x,y,w,h;...'（相对画面宽高）")
     
     args = parser.parse_args()
     
+    # 无界面实时分析的标准输出只用于JSON Lines事件，其余提示信息写到标准错误
+    log_stream = sys.stderr if args.command == "realtime" and args.headless else sys.stdout
+    
     # 检查依赖
-    if args.command != "install" and not check_dependencies():
+    if args.command not in ("install", "help") and not check_dependencies(args.command, log_stream):
         return
     
+    # 运行时指标导出
+    exporter = None
+    if args.command in ("realtime", "video", "profile", "serve", "multi", "stations"):
+        from metrics import start_exporter
+        exporter = start_exporter(args.metrics_port, args.metrics_snapshot)
+    
     # 执行命令
     if args.command == "web":
         start_web_app()
     elif args.command == "demo":
         start_demo()
     elif args.command == "realtime":
-        start_realtime()
+        camera = int(args.camera) if args.camera.isdigit() else args.camera
+        start_realtime(camera, args.headless, args.events)
     elif args.command == "video":
         if not args.video_file:
             print("❌ 请指定视频文件路径")
             print("示例: python run.py video my_workout.mp4")
             return
-        analyze_video(args.video_file)
+        analyze_video(args.video_file, args.motion_threshold, args.two_pass, args.save_results)
+    elif args.command == "profile":
+        if not args.video_file:
+            print("❌ 请指定视频文件路径")
+            print("示例: python run.py profile my_workout.mp4")
+            return
+        profile_video(args.video_file, args.report, args.output)
+    elif args.command == "serve":
+        start_server(args.host, args.port, args.workers)
+    elif args.command == "replay":
+        if not args.video_file:
+            print("❌ 请指定视频文件路径")
+            print("示例: python run.py replay my_workout.mp4 --port 9200")
+            return
+        replay_to_server(args.video_file, args.host, args.port)
+    elif args.command == "multi":
+        start_multi_stream(args.sources, args.workers, args.events)
+    elif args.command == "stations":
+        if not args.video_file:
+            print("❌ 请指定视频文件路径或摄像头编号")
+            print("示例: python run.py stations gym.mp4 --stations 3 --output gym_annotated.mp4")
+            return
+        analyze_stations(args.video_file, args.stations, args.workers, args.output)
     elif args.command == "install":
         install_dependencies()
     elif args.command == "help":
         show_help()
+    
+    if exporter:
+        exporter.stop()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
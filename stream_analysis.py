@@ -0,0 +1,101 @@
+from typing import Dict, Optional
+from bench_press_analyzer import BenchPressAnalyzer
+from rep_analysis import summarize_set
+
+class StreamSession:
+    """单路视频流的分析状态：动作阶段、重复计数和分组
+
+    分析器只做几何计算，可以被多路视频流共享；每路视频流的状态各自独立。
+    与视频文件分析相同，检测到人但不是卧推姿势时结束当前组。
+    """
+
+    def __init__(self, stream_id: str, analyzer: Optional[BenchPressAnalyzer] = None):
+        self.stream_id = stream_id
+        self.analyzer = analyzer or BenchPressAnalyzer()
+
+        self.frames = 0
+        self.bench_press_frames = 0
+        self.rep_count = 0
+        self.last_phase = 'IDLE'
+        self.score_total = 0.0
+        self.current_set = []
+        self.sets = []
+
+    def update(self, pose_data: Optional[Dict], timestamp: Optional[float] = None) -> Dict:
+        """分析一帧的姿态数据，返回该帧的阶段、分数和计数
+
+        结果中的 set_completed 为刚结束的一组的汇总（没有结束的组时为None）。
+        """
+        self.frames += 1
+        result = {
+            'stream': self.stream_id,
+            'frame': self.frames,
+            'timestamp': timestamp,
+            'detected': pose_data is not None,
+            'is_bench_press': False,
+            'phase': None,
+            'score': None,
+            'feedback': [],
+            'rep_count': self.rep_count,
+            'new_rep': False,
+            'set_completed': None
+        }
+
+        if not pose_data:
+            return result
+        if not self.analyzer.is_bench_press_pose(pose_data):
+            # 如果不是卧推姿势，结束当前组
+            if self.current_set:
+                result['set_completed'] = self.finish_set()
+            return result
+
+        self.bench_press_frames += 1
+        quality_analysis = self.analyzer.analyze_pose_quality(pose_data)
+        current_phase = self.analyzer.detect_bench_press_phase(pose_data)
+
+        # 检测重复次数
+        if self.last_phase == 'DOWN' and current_phase == 'UP':
+            self.rep_count += 1
+            result['new_rep'] = True
+        self.last_phase = current_phase
+
+        self.score_total += quality_analysis['score']
+        self.current_set.append({
+            'frame': self.frames,
+            'timestamp': timestamp,
+            'phase': current_phase,
+            'score': quality_analysis['score'],
+            'angles': quality_analysis['angles'],
+            'feedback_mask': quality_analysis['feedback_mask']
+        })
+
+        result.update({
+            'is_bench_press': True,
+            'phase': current_phase,
+            'score': quality_analysis['score'],
+            'feedback': quality_analysis['feedback'],
+            'rep_count': self.rep_count
+        })
+        return result
+
+    def finish_set(self) -> Optional[Dict]:
+        """结束当前组并返回其汇总（与视频文件分析的组汇总相同，见 summarize_set，另加组号），
+        没有进行中的组时返回None"""
+        if not self.current_set:
+            return None
+
+        set_summary = dict(summarize_set(self.current_set), set_number=len(self.sets) + 1)
+        self.sets.append(set_summary)
+        self.current_set = []
+        return set_summary
+
+    def summary(self) -> Dict:
+        """返回该视频流的汇总"""
+        return {
+            'stream': self.stream_id,
+            'frames': self.frames,
+            'bench_press_frames': self.bench_press_frames,
+            'reps': self.rep_count,
+            'sets': len(self.sets),
+            'average_score': self.score_total / self.bench_press_frames if self.bench_press_frames else 0.0
+        }
@@ -129,6 +129,61 @@ def test_workout_tracker():
         print(f"❌ 锻炼跟踪器测试失败: {e}")
         return False
 
+def test_tracker_query_cache():
+    """测试统计查询缓存"""
+    print("\n🔍 测试统计查询缓存...")
+    
+    try:
+        import tempfile
+        from workout_tracker import WorkoutTracker
+        
+        with tempfile.TemporaryDirectory() as directory:
+            data_file = os.path.join(directory, 'workouts.json')
+            tracker = WorkoutTracker(data_file)
+            workout_id = tracker.start_workout()
+            tracker.add_set(workout_id, 8, 85.0, [])
+            tracker.end_workout(workout_id)
+            
+            # 没有新数据时直接返回缓存结果
+            stats = tracker.get_statistics(30)
+            assert stats['total_reps'] == 8
+            assert tracker.get_statistics(30) is stats
+            
+            # 本实例写入后缓存失效
+            workout_id = tracker.start_workout()
+            tracker.add_set(workout_id, 10, 90.0, [])
+            tracker.end_workout(workout_id)
+            assert tracker.get_statistics(30)['total_reps'] == 18
+            
+            # 其他实例写入同一文件后，按文件修改时间重新加载
+            other = WorkoutTracker(data_file)
+            workout_id = other.start_workout()
+            other.add_set(workout_id, 5, 80.0, [])
+            other.end_workout(workout_id)
+            assert tracker.get_statistics(30)['total_reps'] == 23
+            assert len(tracker.get_progress_data(30)['dates']) == 3
+            
+            # 写入前先合并其他实例的数据，不会覆盖掉它们
+            workout_id = tracker.start_workout()
+            tracker.add_set(workout_id, 6, 88.0, [])
+            tracker.end_workout(workout_id)
+            assert WorkoutTracker(data_file).get_statistics(30)['total_reps'] == 29
+            
+            # 文件无法解析（如被外部程序写了一半）时保留已加载的数据，之后的写入不会清空历史
+            with open(data_file, 'w', encoding='utf-8') as f:
+                f.write('{"workouts": [')
+            assert tracker.get_statistics(30)['total_reps'] == 29
+            tracker.start_workout()
+            assert len(WorkoutTracker(data_file).workout_data['workouts']) == 5
+            assert not [name for name in os.listdir(directory) if name.endswith('.tmp')]
+        
+        print("✅ 统计查询缓存正常")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 统计查询缓存测试失败: {e}")
+        return False
+
 def test_video_processor():
     """测试视频处理器"""
     print("\n🔍 测试视频处理器...")
@@ -146,6 +201,1197 @@ def test_video_processor():
         print(f"❌ 视频处理器测试失败: {e}")
         return False
 
+def test_frame_grabber():
+    """测试摄像头采集线程"""
+    print("\n🔍 测试摄像头采集线程...")
+    
+    try:
+        import time
+        from frame_grabber import FrameGrabber, LatencyStats
+        
+        class FakeCapture:
+            """模拟摄像头，每次读取返回一帧"""
+            def __init__(self, total):
+                self.remaining = total
+            
+            def set(self, prop, value):
+                return False
+            
+            def read(self):
+                if self.remaining <= 0:
+                    return False, None
+                self.remaining -= 1
+                time.sleep(0.001)
+                return True, np.zeros((48, 64, 3), dtype=np.uint8)
+        
+        grabber = FrameGrabber(FakeCapture(50)).start()
+        latency_stats = LatencyStats()
+        processed = 0
+        while True:
+            ret, frame, capture_time = grabber.read()
+            if not ret:
+                break
+            processed += 1
+            time.sleep(0.005)  # 模拟较慢的推理
+            latency_stats.add(time.monotonic() - capture_time)
+        grabber.stop()
+        
+        assert grabber.captured_frames == 50
+        assert processed + grabber.dropped_frames == 50
+        assert grabber.dropped_frames > 0
+        print(f"✅ 采集线程正常: 处理{processed}帧, 丢弃{grabber.dropped_frames}帧, "
+              f"P95延迟 {latency_stats.summary()['p95_ms']:.1f}ms")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 采集线程测试失败: {e}")
+        return False
+
+def test_event_emitter():
+    """测试无界面模式的事件输出"""
+    print("\n🔍 测试事件输出...")
+    
+    try:
+        import json
+        import socket
+        from event_emitter import EventEmitter
+        
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+        
+        emitter = EventEmitter(f"127.0.0.1:{port}")
+        conn, _ = server.accept()
+        emitter.emit('rep', rep_count=np.int64(3))
+        emitter.emit('score', phase='DOWN', score=85.0, feedback=["左臂弯曲角度不当"])
+        emitter.close()
+        
+        received = b''
+        while True:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            received += chunk
+        conn.close()
+        server.close()
+        
+        events = [json.loads(line) for line in received.decode('utf-8').splitlines()]
+        assert [event['type'] for event in events] == ['rep', 'score']
+        assert events[0]['rep_count'] == 3
+        print(f"✅ 事件输出正常: 收到{len(events)}条事件")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 事件输出测试失败: {e}")
+        return False
+
+def test_headless_stdout():
+    """测试无界面实时分析的标准输出只有JSON事件"""
+    print("\n🔍 测试无界面输出...")
+    
+    try:
+        import json
+        import subprocess
+        import tempfile
+        import cv2
+        
+        # 子进程用模拟后端运行 run.py realtime --headless，视频文件代替摄像头
+        script = (
+            "import sys, run, video_processor\n"
+            "from pose_backends import FakePoseBackend\n"
+            "class Processor(video_processor.VideoProcessor):\n"
+            "    def __init__(self):\n"
+            "        super().__init__(FakePoseBackend.bench_press())\n"
+            "video_processor.VideoProcessor = Processor\n"
+            "sys.argv = ['run.py', 'realtime', '--headless', '--camera', sys.argv[1]]\n"
+            "run.main()\n"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            video_path = os.path.join(tmp, 'camera.mp4')
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (160, 120))
+            for i in range(90):
+                writer.write(np.full((120, 160, 3), i, dtype=np.uint8))
+            writer.release()
+            
+            env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+            result = subprocess.run([sys.executable, '-c', script, video_path], cwd=tmp, env=env,
+                                    capture_output=True, text=True, timeout=120)
+        
+        lines = result.stdout.splitlines()
+        events = [json.loads(line) for line in lines]
+        assert result.returncode == 0, result.stderr
+        assert events and events[-1]['type'] == 'session_end', lines[-1:]
+        assert '所有依赖包已安装' in result.stderr
+        print(f"✅ 无界面输出正常: 标准输出{len(lines)}行均为JSON事件")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 无界面输出测试失败: {e}")
+        return False
+
+def test_frame_pool():
+    """测试帧缓冲池"""
+    print("\n🔍 测试帧缓冲池...")
+    
+    try:
+        from frame_pool import FramePool
+        pool = FramePool((48, 64, 3))
+        
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+        assert second is first
+        
+        # 尺寸不符的数组不会进入缓冲池
+        pool.release(np.zeros((10, 10, 3), dtype=np.uint8))
+        pool.release(second)
+        assert pool.acquire() is first
+        
+        stats = pool.stats()
+        assert stats['allocations'] == 1 and stats['reuses'] == 2
+        print(f"✅ 帧缓冲池正常: 复用率 {stats['hit_rate']*100:.0f}%")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 帧缓冲池测试失败: {e}")
+        return False
+
+def test_video_writer():
+    """测试后台编码的输出视频"""
+    print("\n🔍 测试输出视频...")
+    
+    try:
+        import cv2
+        import tempfile
+        import time
+        from video_processor import VideoProcessor
+        from video_writer import AsyncVideoWriter
+        
+        def video_info(path):
+            cap = cv2.VideoCapture(path)
+            info = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                    round(cap.get(cv2.CAP_PROP_FPS)), int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+            cap.release()
+            return info
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = write_brightness_session(os.path.join(directory, 'session.mp4'))
+            processor = VideoProcessor(BrightnessBackend())
+            output_path = os.path.join(directory, 'output.mp4')
+            
+            # 缩小一半、按10fps抽帧的预览视频（520帧中每3帧写一帧）
+            processor.process_video_file(video_path, output_path, output_scale=0.5, output_fps=10)
+            assert video_info(output_path) == (80, 60, 10, 174)
+            
+            # 只写入卧推片段
+            results = processor.process_video_file(video_path, output_path, bench_segments_only=True)
+            assert video_info(output_path) == (160, 120, 30, results['bench_press_frames'])
+            
+            # 编码线程出错时，分析中已经发生的异常不被掩盖
+            resize = AsyncVideoWriter._resize
+            
+            def failing_resize(self, frame):
+                raise ValueError("编码失败")
+            
+            def failing_callback(frame, frame_index):
+                # 等编码线程写第一帧出错后，在下一帧写入之前失败
+                if frame_index == 2:
+                    time.sleep(0.2)
+                    raise RuntimeError("回调失败")
+            
+            AsyncVideoWriter._resize = failing_resize
+            try:
+                for frame_callback, expected in ((failing_callback, RuntimeError), (None, ValueError)):
+                    try:
+                        processor.process_video_file(video_path, output_path, frame_callback=frame_callback)
+                        assert False, "应抛出异常"
+                    except expected:
+                        pass
+            finally:
+                AsyncVideoWriter._resize = resize
+        
+        print("✅ 输出视频正常: 缩放、抽帧和只写卧推片段")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 输出视频测试失败: {e}")
+        return False
+
+def test_profiler():
+    """测试分阶段性能分析"""
+    print("\n🔍 测试性能分析器...")
+    
+    try:
+        import json
+        import tempfile
+        from profiler import StageProfiler, NULL_PROFILER, save_report
+        profiler = StageProfiler()
+        for i in range(1, 101):
+            profiler.record('inference', i / 1000)
+        with profiler.stage('decode'):
+            pass
+        
+        report = profiler.report()
+        inference = report['stages']['inference']
+        assert inference['count'] == 100
+        # 对数分桶的误差在一个桶宽（约12%）以内
+        assert 0.045 <= inference['p50_ms'] / 1000 <= 0.06
+        assert 0.09 <= inference['p95_ms'] / 1000 <= 0.11
+        
+        # 关闭时不记录任何数据
+        with NULL_PROFILER.stage('decode'):
+            pass
+        assert not NULL_PROFILER.histograms
+        
+        # 已有的报告（如分析结果中的 'profile'）直接保存，不需要创建分析器
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_report(os.path.join(directory, 'profile.json'), report)
+            with open(path, 'r', encoding='utf-8') as f:
+                assert json.load(f)['stages']['inference']['count'] == 100
+        print(f"✅ 性能分析器正常: P50 {inference['p50_ms']:.1f}ms, P99 {inference['p99_ms']:.1f}ms")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 性能分析器测试失败: {e}")
+        return False
+
+def test_metrics():
+    """测试运行时指标导出"""
+    print("\n🔍 测试运行时指标...")
+    
+    try:
+        import time
+        import urllib.request
+        from metrics import MetricsRegistry, MetricsExporter
+        
+        registry = MetricsRegistry()
+        frames = registry.counter('test_frames_total', '测试帧数')
+        latency = registry.histogram('test_latency_seconds', '测试延迟')
+        
+        # 记录开销需要远小于单帧耗时
+        start = time.perf_counter()
+        for i in range(10000):
+            frames.inc()
+            latency.observe(0.02)
+        per_frame_us = (time.perf_counter() - start) / 10000 * 1e6
+        assert per_frame_us < 50
+        
+        exporter = MetricsExporter(registry, port=0).start()
+        with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+            body = response.read().decode('utf-8')
+        exporter.stop()
+        
+        assert 'test_frames_total 10000' in body
+        assert 'test_latency_seconds_bucket{le="+Inf"} 10000' in body
+        print(f"✅ 运行时指标正常: 每帧记录开销 {per_frame_us:.2f}µs")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 运行时指标测试失败: {e}")
+        return False
+
+def test_pose_backends():
+    """测试可替换的姿态后端"""
+    print("\n🔍 测试姿态后端...")
+    
+    try:
+        import tempfile
+        from benchmarks.synthetic import generate_video
+        from pose_backends import FakePoseBackend, save_landmarks, load_landmarks, bench_press_sequence
+        from video_processor import VideoProcessor
+        
+        # 关键点录制与回放
+        sequence = bench_press_sequence(10) + [None]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'landmarks.npz')
+            save_landmarks(path, sequence)
+            replay = load_landmarks(path)
+            assert replay[-1] is None
+            assert np.allclose(replay[0], sequence[0])
+            
+            # 使用模拟后端跑完整的视频处理流程，不需要加载MediaPipe
+            video_path = generate_video(os.path.join(directory, 'input.mp4'), (160, 120), 60)
+            output_path = os.path.join(directory, 'output.mp4')
+            processor = VideoProcessor(FakePoseBackend.bench_press())
+            results = processor.process_video_file(video_path, output_path)
+            assert results['total_frames'] == 60
+            assert results['bench_press_frames'] > 0
+            assert os.path.getsize(output_path) > 0
+        
+        print(f"✅ 模拟后端端到端处理正常: {results['bench_press_frames']} 帧识别为卧推")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 姿态后端测试失败: {e}")
+        return False
+
+def test_analysis_jobs():
+    """测试后台分析任务队列"""
+    print("\n🔍 测试后台分析任务...")
+    
+    try:
+        import tempfile
+        import time
+        from analysis_jobs import AnalysisJobQueue
+        from benchmarks.synthetic import generate_video
+        from pose_backends import FakePoseBackend
+        from processor_pool import ProcessorPool
+        from video_processor import VideoProcessor
+        
+        with tempfile.TemporaryDirectory() as directory:
+            jobs_dir = os.path.join(directory, 'jobs')
+            pool = ProcessorPool(2, lambda: VideoProcessor(FakePoseBackend.bench_press()))
+            job_queue = AnalysisJobQueue(jobs_dir, max_workers=2, processor_pool=pool)
+            job_queue.start()
+            
+            job_ids = []
+            for i in range(3):
+                video_path = generate_video(os.path.join(directory, f'input_{i}.mp4'), (160, 120), 30)
+                if i == 2:
+                    # 上传的文件对象按块直接写入任务目录
+                    with open(video_path, 'rb') as f:
+                        job_ids.append(job_queue.submit_stream(f, 'upload.mp4'))
+                else:
+                    job_ids.append(job_queue.submit(video_path, {'save_output': i == 0}))
+            
+            # 提交立即返回，轮询直到全部完成
+            deadline = time.time() + 30
+            while time.time() < deadline:
+                if all(job_queue.get(job_id)['status'] == 'completed' for job_id in job_ids):
+                    break
+                time.sleep(0.05)
+            job_queue.stop()
+            
+            assert all(job_queue.get(job_id)['status'] == 'completed' for job_id in job_ids)
+            assert job_queue.result(job_ids[0])['total_frames'] == 30
+            assert os.path.exists(job_queue.get(job_ids[0])['output_path'])
+            # 分析过程中逐组记录的汇总与最终结果一致
+            assert len(job_queue.get(job_ids[0])['sets']) == len(job_queue.result(job_ids[0])['sets'])
+            
+            # 结果持久化在磁盘上，重新创建队列后仍可查询
+            reloaded = AnalysisJobQueue(jobs_dir)
+            assert len(reloaded.list_jobs()) == 3
+            assert reloaded.result(job_ids[1])['total_frames'] == 30
+        
+        print("✅ 后台分析任务正常: 3 个任务完成并已持久化")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 后台分析任务测试失败: {e}")
+        return False
+
+def test_processor_pool():
+    """测试视频处理器池"""
+    print("\n🔍 测试视频处理器池...")
+    
+    try:
+        import threading
+        import time
+        from processor_pool import ProcessorPool
+        from pose_backends import FakePoseBackend
+        from video_processor import VideoProcessor
+        
+        pool = ProcessorPool(2, lambda: VideoProcessor(FakePoseBackend.bench_press()))
+        seen = set()
+        lock = threading.Lock()
+        
+        def session(index):
+            with pool.session() as processor:
+                with lock:
+                    # 同一时间一个处理器只借给一个调用方
+                    assert id(processor) not in seen
+                    seen.add(id(processor))
+                processor.rep_count = index + 1
+                time.sleep(0.05)
+                with lock:
+                    seen.discard(id(processor))
+        
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = pool.stats()
+        assert stats['created'] == 2 and stats['in_use'] == 0
+        assert stats['checkouts'] == 6 and stats['waits'] > 0
+        
+        # 归还后会话状态被清空
+        with pool.session() as processor:
+            assert processor.rep_count == 0
+        
+        # 所有处理器共用池的锻炼跟踪器
+        with pool.session() as first, pool.session() as second:
+            assert first.tracker is second.tracker is pool.tracker
+        
+        try:
+            with pool.session(), pool.session(), pool.session(timeout=0.05):
+                pass
+            assert False, "池耗尽时应超时"
+        except TimeoutError:
+            pass
+        
+        print(f"✅ 处理器池正常: 最长等待 {stats['max_wait_ms']:.0f}ms")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 处理器池测试失败: {e}")
+        return False
+
+def test_file_transfer():
+    """测试分块上传和磁盘下载"""
+    print("\n🔍 测试文件传输...")
+    
+    try:
+        import io
+        import tempfile
+        import urllib.error
+        import urllib.request
+        from file_transfer import DownloadServer, spool_to_disk
+        
+        data = os.urandom(3 * 1024 * 1024 + 123)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'upload.mp4')
+            written = spool_to_disk(io.BytesIO(data), path, chunk_size=64 * 1024)
+            assert written == len(data)
+            
+            server = DownloadServer(directory, port=0).start()
+            try:
+                with urllib.request.urlopen(server.url_for(path)) as response:
+                    assert response.read() == data
+                
+                # 不能访问根目录之外的文件
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{server.port}/../etc/passwd")
+                    assert False, "越界路径应返回404"
+                except urllib.error.HTTPError as e:
+                    assert e.code == 404
+            finally:
+                server.stop()
+            
+            # 只提供白名单中的文件
+            os.makedirs(os.path.join(directory, 'job'))
+            output_path = os.path.join(directory, 'job', 'output.mp4')
+            spool_to_disk(io.BytesIO(data[:1024]), output_path)
+            server = DownloadServer(directory, port=0, patterns=('*/output.mp4',)).start()
+            try:
+                assert server.serves(output_path) and not server.serves(path)
+                with urllib.request.urlopen(server.url_for(output_path)) as response:
+                    assert response.read() == data[:1024]
+                try:
+                    urllib.request.urlopen(server.url_for(path))
+                    assert False, "白名单之外的文件应返回404"
+                except urllib.error.HTTPError as e:
+                    assert e.code == 404
+            finally:
+                server.stop()
+        
+        print("✅ 文件传输正常")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 文件传输测试失败: {e}")
+        return False
+
+def test_analysis_server():
+    """测试帧流分析服务"""
+    print("\n🔍 测试帧流分析服务...")
+    
+    try:
+        import json
+        import socket
+        import struct
+        import tempfile
+        import threading
+        from analysis_server import AnalysisServer, replay_video
+        from benchmarks.synthetic import generate_video
+        from pose_backends import FakePoseBackend
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = generate_video(os.path.join(directory, 'input.mp4'), (160, 120), 40)
+            server = AnalysisServer(workers=2, backend_factory=FakePoseBackend.bench_press,
+                                    max_batch=4).start()
+            try:
+                # 多个环回客户端同时回放，分别使用JPEG和原始帧
+                results = {}
+                
+                def replay(index, frame_format):
+                    results[index] = replay_video(video_path, port=server.port,
+                                                  frame_format=frame_format, stream=f'cam{index}')
+                
+                threads = [threading.Thread(target=replay, args=(i, 'jpeg' if i % 2 else 'raw'))
+                           for i in range(3)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                pool_stats = server.pool.stats()
+                
+                # 超过上限的头部或负载不读取，返回错误后关闭连接
+                oversized = []
+                for header_size, payload_size in [(1 << 31, 0), (2, 1 << 31)]:
+                    with socket.create_connection(('127.0.0.1', server.port), timeout=5) as client:
+                        client.sendall(struct.pack('>II', header_size, payload_size) + b'{}')
+                        with client.makefile('r', encoding='utf-8') as reader:
+                            oversized.append([json.loads(line) for line in reader])
+            finally:
+                server.stop()
+        
+        for index, events in results.items():
+            assert events['stats']['received_results'] == 40
+            assert [event['seq'] for event in events['results']] == list(range(1, 41))
+            assert events['summary']['stream'] == f'cam{index}'
+            assert events['summary']['bench_press_frames'] > 0
+        assert pool_stats['requests'] == 120
+        assert all(events[0]['type'] == 'error' and '过大' in events[0]['message'] for events in oversized)
+        
+        print(f"✅ 帧流分析服务正常: 平均批大小 {pool_stats['mean_batch_size']:.2f}")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 帧流分析服务测试失败: {e}")
+        return False
+
+def test_multi_stream():
+    """测试多路并发实时分析"""
+    print("\n🔍 测试多路并发实时分析...")
+    
+    try:
+        import tempfile
+        from benchmarks.synthetic import generate_video
+        from multi_stream import MultiStreamAnalyzer
+        from pose_backends import FakePoseBackend
+        from workout_tracker import WorkoutTracker
+        
+        with tempfile.TemporaryDirectory() as directory:
+            # 用视频文件代替摄像头，按原帧率读取
+            sources = [generate_video(os.path.join(directory, f'cam{i}.mp4'), (160, 120), 30, fps=60)
+                       for i in range(3)]
+            tracker = WorkoutTracker(os.path.join(directory, 'workouts.json'))
+            analyzer = MultiStreamAnalyzer(sources, workers=2, backend_factory=FakePoseBackend.bench_press,
+                                           tracker=tracker)
+            stats = analyzer.run(duration=10)
+            
+            assert len(stats['streams']) == 3
+            workout_ids = {stream['workout_id'] for stream in stats['streams'].values()}
+            assert len(workout_ids) == 3
+            for stream in stats['streams'].values():
+                assert stream['processed_frames'] > 0
+                assert stream['processed_frames'] + stream['dropped_frames'] == stream['captured_frames'] == 30
+                assert stream['latency']['count'] == stream['processed_frames']
+                assert stream['sets'] == 1
+                summary = tracker.get_workout_summary(stream['workout_id'])
+                assert summary is not None and summary['total_sets'] == 1
+        
+        print(f"✅ 多路并发实时分析正常: 推理 {stats['inference']['requests']} 帧")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 多路并发实时分析测试失败: {e}")
+        return False
+
+def test_multi_station():
+    """测试单摄像头多训练站分析"""
+    print("\n🔍 测试多训练站分析...")
+    
+    try:
+        import tempfile
+        import cv2
+        from benchmarks.synthetic import generate_video
+        from multi_station import MultiStationAnalyzer, parse_stations
+        from pose_backends import FakePoseBackend
+        from workout_tracker import WorkoutTracker
+        
+        stations = parse_stations('a:0,0,0.5,1;b:0.5,0,0.5,1')
+        assert [station.pixel_box(480, 160) for station in stations] == [(0, 0, 240, 160), (240, 0, 480, 160)]
+        assert len(parse_stations('3')) == 3
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = generate_video(os.path.join(directory, 'gym.mp4'), (480, 160), 30)
+            output_path = os.path.join(directory, 'annotated.mp4')
+            tracker = WorkoutTracker(os.path.join(directory, 'workouts.json'))
+            analyzer = MultiStationAnalyzer(parse_stations('3'), workers=2,
+                                            backend_factory=FakePoseBackend.bench_press, tracker=tracker)
+            results = analyzer.process_video(video_path, output_path)
+            
+            assert results['frames'] == 30
+            assert results['inference']['requests'] == 90
+            assert len({station['workout_id'] for station in results['stations'].values()}) == 3
+            for station in results['stations'].values():
+                assert station['bench_press_frames'] == 30
+                assert tracker.get_workout_summary(station['workout_id'])['total_sets'] == 1
+            
+            cap = cv2.VideoCapture(output_path)
+            assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 30
+            assert int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) == 480
+            cap.release()
+        
+        print("✅ 多训练站分析正常")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 多训练站分析测试失败: {e}")
+        return False
+
+def test_motion_gate():
+    """测试运动门控"""
+    print("\n🔍 测试运动门控...")
+    
+    try:
+        import tempfile
+        from benchmarks.synthetic import generate_session_video
+        from motion_gate import MotionGate
+        from pose_backends import FakePoseBackend
+        from video_processor import VideoProcessor
+        
+        # 静止画面跳过，超过 max_skip 时强制推理，画面变化时推理
+        gate = MotionGate(threshold=0.01, max_skip=3)
+        still = np.zeros((120, 160, 3), dtype=np.uint8)
+        moved = still.copy()
+        moved[40:80, 60:100] = 255
+        decisions = [gate.should_infer(frame) for frame in [still] * 6 + [moved]]
+        assert decisions == [True, False, False, False, True, False, True]
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = generate_session_video(os.path.join(directory, 'session.mp4'), (320, 180),
+                                                sets=2, set_frames=30, rest_frames=90)
+            baseline = VideoProcessor(FakePoseBackend.bench_press()).process_video_file(video_path)
+            # 记录实际推理的次数
+            backend = FakePoseBackend.bench_press()
+            calls = []
+            process = backend.process
+            backend.process = lambda frame: calls.append(frame) or process(frame)
+            results = VideoProcessor(backend).process_video_file(video_path, motion_threshold=0.01)
+        
+        gating = results['motion_gating']
+        assert gating['analyzed_frames'] == 240
+        assert gating['inferred_frames'] == len(calls)
+        assert gating['skipped_frames'] + gating['inferred_frames'] == 240
+        assert gating['skipped_frames'] > 120
+        # 复用检测结果后分组和计数不变
+        assert results['bench_press_frames'] == baseline['bench_press_frames']
+        assert len(results['sets']) == len(baseline['sets'])
+        
+        print(f"✅ 运动门控正常: 跳过 {gating['skip_ratio']*100:.0f}% 的帧")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 运动门控测试失败: {e}")
+        return False
+
+class BrightnessBackend:
+    """按画面亮度返回姿态的测试后端：很暗为无人，较暗为非卧推姿势，较亮为卧推（肘部角度随亮度变化）
+    
+    与 FakePoseBackend 不同，结果只取决于画面内容，跳转或重新运行后结果不变。
+    """
+    input_format = None
+    name = 'brightness'
+    
+    def load(self):
+        pass
+    
+    def process(self, frame):
+        from pose_backends import bench_press_landmarks
+        level = float(frame.mean())
+        if level < 20:
+            return None
+        if level < 80:
+            return bench_press_landmarks(170, 170)
+        return bench_press_landmarks(level - 50, level - 50)
+    
+    def close(self):
+        pass
+
+def write_brightness_session(path):
+    """生成配合 BrightnessBackend 的训练录像：休息、组、休息、组、离开画面、组、休息"""
+    import cv2
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (160, 120))
+    for frames, kind in [(50, 'rest'), (60, 'set'), (150, 'rest'), (60, 'set'),
+                         (40, 'away'), (60, 'set'), (100, 'rest')]:
+        for i in range(frames):
+            level = {'rest': 50, 'away': 5}.get(kind, 140 + 20 * np.sin(i / 10))
+            writer.write(np.full((120, 160, 3), level, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_two_pass():
+    """测试两遍粗到细分析"""
+    print("\n🔍 测试两遍分析...")
+    
+    try:
+        import tempfile
+        from pose_backends import FakePoseBackend
+        from video_processor import VideoProcessor
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = write_brightness_session(os.path.join(directory, 'session.mp4'))
+            processor = VideoProcessor(BrightnessBackend())
+            single = processor.process_video_file(video_path)
+            two_pass = processor.process_video_file(video_path, two_pass=True)
+            
+            # 第一遍使用处理器缓存的后端副本，不推进精细分析后端的回放位置
+            fake_processor = VideoProcessor(FakePoseBackend.bench_press())
+            for _ in range(2):
+                fake_processor.pose_detector.backend.reset()
+                fake_result = fake_processor.process_video_file(video_path, two_pass=True)
+                assert fake_processor.pose_detector.backend.frame_index == fake_result['analyzed_frames']
+            coarse_backend = fake_processor._default_coarse_backend()
+            assert coarse_backend is fake_processor._default_coarse_backend()
+            assert coarse_backend is not fake_processor.pose_detector.backend
+        
+        # 除耗时和扫描统计外与单遍分析一致
+        ignored = ('start_time', 'end_time', 'analyzed_frames', 'two_pass')
+        assert {key: value for key, value in single.items() if key not in ignored} == \
+               {key: value for key, value in two_pass.items() if key not in ignored}
+        assert len(single['sets']) == 2
+        assert two_pass['two_pass']['fine_frames'] < single['analyzed_frames'] / 2
+        
+        print(f"✅ 两遍分析正常: 精细分析 {two_pass['two_pass']['fine_ratio']*100:.0f}% 的帧")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 两遍分析测试失败: {e}")
+        return False
+
+def test_streaming_analysis():
+    """测试流式视频分析接口"""
+    print("\n🔍 测试流式视频分析...")
+    
+    try:
+        import tempfile
+        from benchmarks.synthetic import generate_video
+        from pose_backends import FakePoseBackend, bench_press_landmarks, bench_press_sequence
+        from profiler import NULL_PROFILER
+        from video_processor import VideoProcessor
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = generate_video(os.path.join(directory, 'input.mp4'), (160, 120), 60)
+            
+            # 第41帧为非卧推姿势，视频分为两组
+            sequence = bench_press_sequence(60)
+            
+            def script(index):
+                return bench_press_landmarks(170, 170) if index == 40 else sequence[index]
+            
+            processor = VideoProcessor(FakePoseBackend(script))
+            events = list(processor.iter_video_analysis(video_path))
+            assert events[0]['type'] == 'start' and events[-1]['type'] == 'end'
+            frame_events = [event for event in events if event['type'] == 'frame']
+            set_events = [event for event in events if event['type'] == 'set']
+            assert [event['frame'] for event in frame_events] == list(range(1, 61))
+            assert len(set_events) == 2
+            # 组在结束的那一帧之后立即产出，而不是等整个视频处理完
+            assert events.index(set_events[0]) < events.index(frame_events[41])
+            assert events[-1]['summary']['set_count'] == 2
+            
+            # 消费者结果与流式事件一致
+            processor = VideoProcessor(FakePoseBackend(script))
+            live_sets = []
+            progress = []
+            results = processor.process_video_file(video_path, callback=lambda *args: progress.append(args),
+                                                   set_callback=live_sets.append)
+            assert len(results['sets']) == len(live_sets) == 2
+            assert results['bench_press_frames'] == events[-1]['summary']['bench_press_frames']
+            
+            # 不产出逐帧事件时仍然报告进度（process_video_file 默认不产出逐帧事件）
+            assert [current for _, current, _ in progress] == list(range(1, 61)) and progress[-1][0] == 1.0
+            progress = []
+            processor = VideoProcessor(FakePoseBackend(script))
+            quiet = list(processor.iter_video_analysis(video_path, include_frames=False,
+                                                       progress_callback=lambda *args: progress.append(args)))
+            assert not [event for event in quiet if event['type'] == 'frame'] and len(progress) == 60
+            
+            # 提前停止时释放资源
+            processor = VideoProcessor(FakePoseBackend.bench_press())
+            stream = processor.iter_video_analysis(video_path, os.path.join(directory, 'out.mp4'), profile=True)
+            for event in stream:
+                if event['type'] == 'frame' and event['frame'] == 10:
+                    break
+            stream.close()
+            assert processor.pose_detector.profiler is NULL_PROFILER
+            assert os.path.getsize(os.path.join(directory, 'out.mp4')) > 0
+        
+        print(f"✅ 流式视频分析正常: {len(events)} 个事件")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 流式视频分析测试失败: {e}")
+        return False
+
+def test_checkpoint_resume():
+    """测试检查点恢复和取消"""
+    print("\n🔍 测试检查点恢复和取消...")
+    
+    try:
+        import cv2
+        import tempfile
+        import time
+        from analysis_jobs import AnalysisJobQueue
+        from checkpoint import CancellationToken
+        from processor_pool import ProcessorPool
+        from video_processor import VideoProcessor
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = write_brightness_session(os.path.join(directory, 'session.mp4'))
+            checkpoint_path = os.path.join(directory, 'checkpoint.json')
+            processor = VideoProcessor(BrightnessBackend())
+            baseline = processor.process_video_file(video_path)
+            
+            # 在第二组中途取消：返回部分结果并保存检查点
+            token = CancellationToken()
+            
+            def cancel_at(frame, frame_index):
+                if frame_index == 290:
+                    token.cancel()
+            
+            partial = processor.process_video_file(video_path, frame_callback=cancel_at,
+                                                   checkpoint_path=checkpoint_path, cancel_token=token)
+            assert partial['cancelled'] and partial['resume_frame'] == 290
+            assert len(partial['sets']) == 1 and partial['partial_set']['frames'] == 30
+            checkpoint_files = lambda: [name for name in os.listdir(directory) if name.startswith('checkpoint.')]
+            assert len(checkpoint_files()) == 2
+            
+            # 配置不同时不使用检查点，也不删除原来的进度
+            strided = processor.process_video_file(video_path, frame_stride=2, checkpoint_path=checkpoint_path)
+            assert 'resumed_from' not in strided and len(checkpoint_files()) == 2
+            
+            # 换回原来的配置后恢复，结果与不中断时一致
+            resumed = processor.process_video_file(video_path, checkpoint_path=checkpoint_path)
+            assert resumed['resumed_from'] == 290 and not resumed['cancelled']
+            ignored = ('start_time', 'end_time', 'resumed_from')
+            assert {key: value for key, value in resumed.items() if key not in ignored} == \
+                   {key: value for key, value in baseline.items() if key not in ignored}
+            assert not checkpoint_files()
+            
+            # 恢复后输出视频接着写，拼接结果包含全部帧
+            output_path = os.path.join(directory, 'output.mp4')
+            token = CancellationToken()
+            processor.process_video_file(video_path, output_path, frame_callback=cancel_at,
+                                         checkpoint_path=checkpoint_path, cancel_token=token)
+            assert not os.path.exists(output_path)
+            processor.process_video_file(video_path, output_path, checkpoint_path=checkpoint_path)
+            output = cv2.VideoCapture(output_path)
+            assert int(output.get(cv2.CAP_PROP_FRAME_COUNT)) == baseline['total_frames']
+            output.release()
+            assert not checkpoint_files()
+            
+            # 失败的后台任务保留原始视频和检查点，继续时从失败的位置开始
+            class FlakyBackend(BrightnessBackend):
+                calls = 0
+                
+                def process(self, frame):
+                    FlakyBackend.calls += 1
+                    if FlakyBackend.calls == 200:
+                        raise RuntimeError("模拟推理失败")
+                    return super().process(frame)
+            
+            def wait_for(job_id, status):
+                deadline = time.time() + 30
+                while job_queue.get(job_id)['status'] != status and time.time() < deadline:
+                    time.sleep(0.05)
+                return job_queue.get(job_id)
+            
+            pool = ProcessorPool(1, lambda: VideoProcessor(FlakyBackend()))
+            job_queue = AnalysisJobQueue(os.path.join(directory, 'jobs'), 1, pool).start()
+            job_id = job_queue.submit(write_brightness_session(os.path.join(directory, 'upload.mp4')),
+                                      {'checkpoint_interval': 0})
+            job = wait_for(job_id, 'failed')
+            assert job['error'] == "模拟推理失败" and os.path.exists(job['input_path'])
+            assert job_queue.resume(job_id)
+            job = wait_for(job_id, 'completed')
+            job_queue.stop()
+            results = job_queue.result(job_id)
+            assert results['resumed_from'] == 199 and len(results['sets']) == len(baseline['sets'])
+            assert not os.path.exists(job['input_path'])
+        
+        print(f"✅ 检查点恢复和取消正常: {len(resumed['sets'])} 组")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 检查点恢复和取消测试失败: {e}")
+        return False
+
+def test_result_columns():
+    """测试列式分析结果"""
+    print("\n🔍 测试列式分析结果...")
+    
+    try:
+        import json
+        import tempfile
+        from benchmarks.synthetic import generate_video
+        from bench_press_analyzer import feedback_messages
+        from pose_backends import FakePoseBackend, bench_press_landmarks, bench_press_sequence
+        from result_columns import SetColumns, load_results, results_to_json, save_results
+        from video_processor import VideoProcessor
+        
+        with tempfile.TemporaryDirectory() as directory:
+            video_path = generate_video(os.path.join(directory, 'input.mp4'), (160, 120), 90)
+            
+            # 每10帧一次左右不对称（有反馈），第46帧为非卧推姿势
+            sequence = bench_press_sequence(90)
+            
+            def script(index):
+                if index == 45:
+                    return bench_press_landmarks(170, 170)
+                return bench_press_landmarks(70, 100) if index % 10 == 0 else sequence[index]
+            
+            results = VideoProcessor(FakePoseBackend(script)).process_video_file(video_path)
+            frame_events = [event for event in VideoProcessor(FakePoseBackend(script)).iter_video_analysis(video_path)
+                            if event['type'] == 'frame' and event['is_bench_press']]
+            
+            assert len(results['sets']) == 2
+            columns = [set_summary['columns'] for set_summary in results['sets']]
+            assert all(isinstance(set_columns, SetColumns) for set_columns in columns)
+            assert sum(len(set_columns) for set_columns in columns) == len(frame_events)
+            
+            # 反馈掩码按代码表解码后与逐帧反馈一致
+            frames = [frame for set_columns in columns for frame in set_columns.to_frames()]
+            assert [frame['feedback'] for frame in frames] == [event['feedback'] for event in frame_events]
+            assert any(frame['feedback'] for frame in frames)
+            assert feedback_messages(int(columns[0].feedback[0])) == frames[0]['feedback']
+            assert [frame['phase'] for frame in frames] == [event['phase'] for event in frame_events]
+            
+            # 二进制保存和读取
+            binary_path = os.path.join(directory, 'result.npz')
+            save_results(binary_path, results)
+            loaded = load_results(binary_path)
+            assert loaded['sets'] == results['sets'] and loaded['total_reps'] == results['total_reps']
+            
+            # 旧版本保存的代码表顺序不同：按名称换算为当前的代码表
+            with np.load(binary_path) as data:
+                arrays = {name: data[name] for name in data.files}
+            meta = json.loads(arrays['meta'].tobytes().decode('utf-8'))
+            meta['phases'] = meta['phases'][::-1]
+            meta['angle_names'] = meta['angle_names'][::-1]
+            meta['feedback_codes'] = meta['feedback_codes'][::-1]
+            bits = len(meta['feedback_codes'])
+            arrays['phase'] = (len(meta['phases']) - 1 - arrays['phase']).astype(np.uint8)
+            arrays['angles'] = arrays['angles'][:, ::-1]
+            arrays['feedback'] = sum(((arrays['feedback'] >> bit) & 1) << (bits - 1 - bit)
+                                     for bit in range(bits)).astype(np.uint16)
+            arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+            old_path = os.path.join(directory, 'old_result.npz')
+            np.savez(old_path, **arrays)
+            assert load_results(old_path)['sets'] == results['sets']
+
+            # 按需生成JSON
+            json_path = os.path.join(directory, 'result.json')
+            results_to_json(results, per_frame=True, path=json_path)
+            with open(json_path, 'r', encoding='utf-8') as f:
+                exported = json.load(f)
+            assert exported['sets'][0]['phase_data'][0]['angles'].keys() == frames[0]['angles'].keys()
+            assert json.loads(results_to_json(results))['sets'][1]['columns']['frame'] == columns[1].frame.tolist()
+            binary_size, json_size = os.path.getsize(binary_path), os.path.getsize(json_path)
+            assert binary_size < json_size
+        
+        print(f"✅ 列式分析结果正常: {len(frames)} 帧, 二进制 {binary_size} 字节, 逐帧JSON {json_size} 字节")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 列式分析结果测试失败: {e}")
+        return False
+
+def test_frame_query():
+    """测试跨锻炼的逐帧查询"""
+    print("\n🔍 测试逐帧查询...")
+    
+    try:
+        import json
+        import tempfile
+        import time
+        import warnings
+        from datetime import datetime, timedelta
+        from benchmarks.synthetic import synthetic_set_data
+        from bench_press_analyzer import ANGLE_NAMES
+        from frame_query import FrameIndex
+        from result_columns import SetColumns
+        from workout_tracker import WorkoutTracker
+        
+        with tempfile.TemporaryDirectory() as directory:
+            data_file = os.path.join(directory, 'history.json')
+            now = datetime.now()
+            
+            # 20次锻炼，每次2组，每10天一次
+            workouts = [{
+                'id': f'workout_{i:02d}',
+                'start_time': (now - timedelta(days=195 - i * 10)).isoformat(),
+                'sets': [{
+                    'set_number': n + 1,
+                    'reps': 3,
+                    'score': 80.0,
+                    'phase_data': synthetic_set_data(180, seed=i * 2 + n),
+                    'timestamp': (now - timedelta(days=195 - i * 10, minutes=-5 * n)).isoformat(),
+                    'notes': ''
+                } for n in range(2)]
+            } for i in range(20)]
+            with open(data_file, 'w', encoding='utf-8') as f:
+                json.dump({'workouts': workouts, 'statistics': {}}, f)
+            
+            tracker = WorkoutTracker(data_file)
+            index = tracker.frame_index()
+            assert len(index) == 20 * 2 * 180
+            assert tracker.frame_index() is index
+            
+            # 与逐帧循环的结果比较
+            cutoff = now - timedelta(days=90)
+            expected = []
+            for workout in tracker.workout_data['workouts']:
+                for set_data in workout['sets']:
+                    set_time = datetime.fromisoformat(set_data['timestamp'])
+                    last = set_data['phase_data'][-1]['timestamp']
+                    for frame in set_data['phase_data']:
+                        elbow = (frame['angles']['left_elbow_angle'] + frame['angles']['right_elbow_angle']) / 2
+                        if (set_time - timedelta(seconds=last - frame['timestamp']) >= cutoff and
+                                frame['phase'] == 'DOWN' and elbow <= 75):
+                            expected.append(frame['score'])
+            rows = index.select(days=90, phases=['DOWN'], angles={'elbow_angle': (None, 75)})
+            assert len(rows) == len(expected) > 0
+            assert np.allclose(np.sort(index.values('score', rows)), np.sort(expected))
+            
+            # 按重复分组：每次下放的最低肘部角度
+            rows = index.select(days=90, phases=['DOWN'])
+            reps = index.group_by(rows, ('workout', 'set', 'rep'), 'elbow_angle', ['min', 'count'])
+            assert len(reps['min']) == 9 * 2 * 3 and np.all(reps['min'] < 75)
+            
+            # 按周和阶段的分数分布
+            weekly = index.group_by(index.select(), ('week', 'phase'), 'score', ['count', 'mean', 'std'])
+            assert weekly['count'].sum() == len(index)
+            assert set(weekly['phase']) == {'DOWN', 'UP', 'SETUP'}
+            assert all(np.datetime64(week, 'D').astype(datetime).weekday() == 0 for week in weekly['week'])
+            
+            # 新增的组增量追加为新的索引，与重新构建的一致；已经拿到的索引不变
+            workout_id = tracker.start_workout()
+            tracker.add_set(workout_id, 3, 80.0, synthetic_set_data(90, seed=99))
+            rebuilt = FrameIndex.build(tracker.workout_data['workouts'])
+            previous, index = index, tracker.frame_index()
+            assert index is not previous and len(previous) == 20 * 2 * 180 and len(index) == len(rebuilt)
+            assert np.array_equal(index.time, rebuilt.time) and np.array_equal(index.rep, rebuilt.rep)
+            
+            # 没有角度或只有部分角度的帧（如演示数据）缺少的角度记为NaN
+            partial = [{'timestamp': 0, 'phase': 'DOWN', 'score': 80, 'angles': {}},
+                       {'timestamp': 1, 'phase': 'UP', 'score': 90, 'angles': {'left_elbow_angle': 150.0}}]
+            assert tracker.add_set(workout_id, 1, 85.0, partial)
+            index = tracker.frame_index()
+            assert len(index) == len(rebuilt) + 2
+            angles = SetColumns.from_frames(partial).angles
+            assert np.isnan(angles[0]).all() and np.isnan(angles[1]).sum() == len(angles[1]) - 1
+            assert angles[1][ANGLE_NAMES.index('left_elbow_angle')] == 150.0
+            
+            # NaN角度不参与统计：两种分组方式（按编码计数、排序后归约）都与逐组计算一致且没有警告
+            gap = synthetic_set_data(90, seed=7)
+            gap[40]['angles'] = {}
+            assert tracker.add_set(workout_id, 3, 80.0, gap)
+            index = tracker.frame_index()
+            rows = index.select()
+            field = index.values('left_elbow_angle', rows)
+            for keys in [('workout', 'set', 'rep'), ('day', 'workout', 'set', 'rep', 'phase')]:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error')
+                    stats = index.group_by(rows, keys, 'left_elbow_angle', ['count', 'min', 'max', 'mean', 'std'])
+                members = {}
+                for j, group_key in enumerate(zip(*(index._key_labels(key, index._group_key(key, rows)) for key in keys))):
+                    members.setdefault(group_key, []).append(j)
+                for i, label in enumerate(zip(*(stats[key] for key in keys))):
+                    group = field[members[label]]
+                    group = group[~np.isnan(group)]
+                    assert stats['count'][i] == len(group)
+                    if len(group):
+                        assert np.isclose(stats['min'][i], group.min()) and np.isclose(stats['max'][i], group.max())
+                        assert np.isclose(stats['mean'][i], group.mean())
+                        assert np.isclose(stats['std'][i], group.std(), atol=1e-4)
+                    else:
+                        assert np.isnan(stats['min'][i]) and np.isnan(stats['mean'][i])
+
+            start = time.perf_counter()
+            index.group_by(index.select(days=90, phases=['DOWN']), ('workout', 'set', 'rep'), 'elbow_angle', ['min'])
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        print(f"✅ 逐帧查询正常: {len(index)} 帧, 按重复分组 {elapsed_ms:.2f}ms")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 逐帧查询测试失败: {e}")
+        return False
+
+def test_rep_kinematics():
+    """测试单次重复的运动学指标"""
+    print("\n🔍 测试重复运动学指标...")
+    
+    try:
+        import tempfile
+        from benchmarks.synthetic import synthetic_set_data
+        from pose_backends import bench_press_sequence
+        from rep_analysis import analyze_reps
+        from result_columns import SetColumns
+        from stream_analysis import StreamSession
+        from video_processor import VideoProcessor
+        from workout_tracker import WorkoutTracker
+        
+        # 合成数据：每2秒一次，肘部角度在70°和170°之间
+        reps = analyze_reps(SetColumns.from_frames(synthetic_set_data(180)))
+        assert len(reps) == 3
+        assert all(abs(rep['range_of_motion'] - 100) < 5 and abs(rep['tempo'] - 1) < 0.1 for rep in reps)
+        assert all(rep['asymmetry'] < 3 for rep in reps)
+        
+        # 下放2秒、推起1秒，右臂比左臂多弯12°
+        fps = 30
+        elbow = np.concatenate([np.linspace(165, 75, 2 * fps, endpoint=False),
+                                np.linspace(75, 165, fps, endpoint=False)] * 4 + [[165.0]])
+        frames = [{
+            'frame': i + 1,
+            'timestamp': (i + 1) / fps,
+            'phase': 'DOWN' if angle < 90 else 'UP' if angle > 160 else 'SETUP',
+            'score': 90.0,
+            'angles': {'shoulder_hip_angle': 175.0, 'left_elbow_angle': angle - 6,
+                       'right_elbow_angle': angle + 6, 'left_knee_angle': 90.0, 'right_knee_angle': 90.0}
+        } for i, angle in enumerate(elbow)]
+        reps = analyze_reps(SetColumns.from_frames(frames))
+        assert len(reps) == 4
+        assert all(abs(rep['tempo'] - 2) < 0.1 and abs(rep['asymmetry'] - 12) < 0.01 for rep in reps)
+        assert all(abs(rep['bottom_angle'] - 75) < 1 and abs(rep['top_angle'] - 165) < 1 for rep in reps)
+        assert reps[0]['start_frame'] == 1 and reps[1]['start_frame'] == reps[0]['end_frame']
+        
+        # 组中间缺少关键点的帧按前后帧插值，不影响整组的指标
+        gap = [dict(frame, angles={}) if i in (70, 71, 100) else frame for i, frame in enumerate(frames)]
+        gap_reps = analyze_reps(SetColumns.from_frames(gap))
+        assert len(gap_reps) == len(reps)
+        assert all(abs(a['range_of_motion'] - b['range_of_motion']) < 1 and abs(a['tempo'] - b['tempo']) < 0.1
+                   for a, b in zip(gap_reps, reps))
+        
+        # 只有小幅抖动时没有重复
+        still = [dict(frame, angles=dict(frame['angles'], left_elbow_angle=100 + i % 3,
+                                         right_elbow_angle=100 - i % 3))
+                 for i, frame in enumerate(frames)]
+        assert analyze_reps(SetColumns.from_frames(still)) == []
+        
+        # 指标随组汇总一起保存到锻炼记录
+        set_summary = VideoProcessor()._analyze_set(frames)
+        assert set_summary['rep_metrics'] == reps
+        
+        # 视频流分析的组汇总与视频文件分析相同（另加组号）
+        session = StreamSession('test')
+        for i, landmarks in enumerate(bench_press_sequence(120)):
+            session.update({'landmarks': landmarks}, i / fps)
+        stream_set = session.finish_set()
+        assert set(stream_set) == set(set_summary) | {'set_number'}
+        assert len(stream_set['rep_metrics']) == 2 and len(stream_set['columns']) == stream_set['frames'] == 120
+        with tempfile.TemporaryDirectory() as directory:
+            data_file = os.path.join(directory, 'history.json')
+            tracker = WorkoutTracker(data_file)
+            workout_id = tracker.start_workout()
+            tracker.add_set(workout_id, set_summary['reps'], set_summary['average_score'], frames,
+                            rep_metrics=set_summary['rep_metrics'])
+            stored = WorkoutTracker(data_file)._find_workout(workout_id)['sets'][0]['rep_metrics']
+            assert stored == reps
+        
+        print(f"✅ 重复运动学指标正常: 离心/向心 {reps[0]['tempo']:.2f}, 左右差 {reps[0]['asymmetry']:.1f}°")
+        
+        return True
+    except Exception as e:
+        print(f"❌ 重复运动学指标测试失败: {e}")
+        return False
+
 def test_web_app():
     """测试Web应用模块"""
     print("\n🔍 测试Web应用模块...")
@@ -193,7 +1439,29 @@ def main():
         ("姿态检测", test_pose_detection),
         ("卧推分析器", test_bench_press_analyzer),
         ("锻炼跟踪器", test_workout_tracker),
+        ("统计查询缓存", test_tracker_query_cache),
         ("视频处理器", test_video_processor),
+        ("采集线程", test_frame_grabber),
+        ("事件输出", test_event_emitter),
+        ("无界面输出", test_headless_stdout),
+        ("帧缓冲池", test_frame_pool),
+        ("输出视频", test_video_writer),
+        ("性能分析", test_profiler),
+        ("运行时指标", test_metrics),
+        ("姿态后端", test_pose_backends),
+        ("后台分析任务", test_analysis_jobs),
+        ("处理器池", test_processor_pool),
+        ("文件传输", test_file_transfer),
+        ("帧流分析服务", test_analysis_server),
+        ("多路实时分析", test_multi_stream),
+        ("多训练站分析", test_multi_station),
+        ("运动门控", test_motion_gate),
+        ("两遍分析", test_two_pass),
+        ("流式分析", test_streaming_analysis),
+        ("检查点恢复", test_checkpoint_resume),
+        ("列式分析结果", test_result_columns),
+        ("逐帧查询", test_frame_query),
+        ("重复运动学指标", test_rep_kinematics),
         ("Web应用", test_web_app),
         ("摄像头", test_camera)
     ]
@@ -1,20 +1,60 @@
+import copy
 import cv2
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Callable
+from typing import Dict, Generator, Iterator, List, Optional, Tuple, Callable, Union
 from pose_detection import PoseDetector
+from pose_backends import MediaPipeBackend, PoseBackend
 from bench_press_analyzer import BenchPressAnalyzer
 from workout_tracker import WorkoutTracker
+from frame_grabber import FrameGrabber, LatencyStats
+from display_worker import DisplayWorker
+from event_emitter import EventEmitter
+from frame_pool import FramePool
+from video_writer import AsyncVideoWriter, SegmentedVideoWriter
+from motion_gate import MotionGate
+from coarse_scan import scan_bench_segments
+from rep_analysis import summarize_set
+from bench_press_analyzer import FEEDBACK_MESSAGES
+from checkpoint import AnalysisCheckpoint, CancellationToken, checkpoint_key
+from profiler import StageProfiler, NULL_PROFILER
+from metrics import REGISTRY
+import os
+import sys
 import time
 from datetime import datetime
 
+# 运行时指标
+FRAMES_PROCESSED = REGISTRY.counter('frames_processed_total', '已分析的视频帧总数')
+BENCH_PRESS_FRAMES = REGISTRY.counter('bench_press_frames_total', '识别为卧推姿势的帧总数')
+PROCESSING_FPS = REGISTRY.gauge('processing_fps', '最近的分析帧率')
+DROPPED_FRAMES = REGISTRY.counter('realtime_dropped_frames_total', '实时分析中丢弃的过期帧总数')
+FRAME_POOL_REUSES = REGISTRY.counter('frame_pool_reuses_total', '帧缓冲池复用次数')
+FRAME_POOL_ALLOCATIONS = REGISTRY.counter('frame_pool_allocations_total', '帧缓冲池新分配次数')
+FRAME_POOL_HIT_RATE = REGISTRY.gauge('frame_pool_hit_rate', '最近一次视频处理的帧缓冲池命中率')
+MOTION_SKIPPED_FRAMES = REGISTRY.counter('motion_skipped_frames_total', '画面静止、复用上次检测结果而跳过推理的帧总数')
+
+# 帧率指标的统计窗口（帧）
+FPS_WINDOW = 30
+
 class VideoProcessor:
     """视频处理器，用于分析卧推视频"""
     
-    def __init__(self):
-        self.pose_detector = PoseDetector()
-        self.analyzer = BenchPressAnalyzer()
-        self.tracker = WorkoutTracker()
+    def __init__(self, pose_backend: Optional[PoseBackend] = None,
+                 tracker: Optional[WorkoutTracker] = None):
+        self.pose_detector = PoseDetector(pose_backend)
+        self.analyzer = BenchPressAnalyzer(self.pose_detector)
+        self.tracker = tracker or WorkoutTracker()
+        
+        # 两遍分析第一遍使用的后端（首次两遍分析时创建，之后复用）
+        self._coarse_backend = None
+        
+        self.reset_session()
+    
+    def reset_session(self):
+        """清空会话状态（计数、当前组、事件输出），模型保留
         
+        处理器被处理器池交给下一个调用方之前调用。
+        """
         # 状态变量
         self.current_workout_id = None
         self.is_recording = False
@@ -23,9 +63,101 @@ class VideoProcessor:
         self.last_phase = 'IDLE'
         self.phase_transitions = []
         
+        # 实时事件输出
+        self.event_emitter = None
+        self._log_stream = sys.stdout
+        
+        # 最近一次视频处理的缓冲池统计
+        self.last_frame_pool_stats = None
+        
     def process_video_file(self, video_path: str, output_path: Optional[str] = None,
-                          callback: Optional[Callable] = None) -> Dict:
-        """处理视频文件"""
+                          callback: Optional[Callable] = None,
+                          frame_callback: Optional[Callable] = None,
+                          set_callback: Optional[Callable] = None, **options) -> Dict:
+        """处理视频文件，返回完整的分析结果
+        
+        iter_video_analysis 的消费者：收集每组的汇总，callback(progress, frame_index, total_frames)
+        报告进度，set_callback(set_summary) 在每组结束时调用。其余参数见 iter_video_analysis，
+        不需要逐帧事件，include_frames 默认为 False。
+        """
+        analysis_results = {
+            'total_frames': 0,
+            'bench_press_frames': 0,
+            'sets': [],
+            'average_score': 0,
+            'total_reps': 0,
+            'duration': 0,
+            'feedback_codes': list(FEEDBACK_MESSAGES),
+            'start_time': datetime.now().isoformat()
+        }
+        
+        options.setdefault('include_frames', False)
+        for event in self.iter_video_analysis(video_path, output_path, frame_callback,
+                                              progress_callback=callback, **options):
+            if event['type'] == 'set':
+                analysis_results['sets'].append(event['set'])
+                if set_callback:
+                    set_callback(event['set'])
+            elif event['type'] == 'end':
+                analysis_results.update(event['summary'])
+        
+        analysis_results['end_time'] = datetime.now().isoformat()
+        return analysis_results
+    
+    def iter_video_analysis(self, video_path: str, output_path: Optional[str] = None,
+                            frame_callback: Optional[Callable] = None,
+                            progress_callback: Optional[Callable] = None,
+                            output_scale: float = 1.0, output_fps: Optional[float] = None,
+                            bench_segments_only: bool = False, profile: bool = False,
+                            frame_stride: int = 1, motion_threshold: Optional[float] = None,
+                            two_pass: bool = False, coarse_stride: Optional[int] = None,
+                            coarse_backend: Optional[PoseBackend] = None,
+                            include_frames: bool = True, checkpoint_path: Optional[str] = None,
+                            checkpoint_interval: float = 30.0,
+                            cancel_token: Optional[CancellationToken] = None) -> Iterator[Dict]:
+        """逐步产出视频分析结果的生成器
+        
+        产出的事件:
+            {'type': 'start', 'video', 'width', 'height', 'fps', 'total_frames'}
+            {'type': 'frame', 'frame', 'total_frames', 'timestamp', 'detected', 'is_bench_press',
+             'phase', 'score', 'feedback'}                   每个分析的帧（include_frames=False 时不产出）
+            {'type': 'set', 'set': 组汇总（逐帧数据为 'columns'）}  每组结束时
+            {'type': 'end', 'summary': 总体统计（不含各组）}
+        
+        已产出的组不再保留，内存占用与视频长度无关。调用方可以随时停止迭代，
+        生成器关闭时释放视频和输出文件。
+        
+        只有在有帧的消费者（输出视频 output_path 或预览回调 frame_callback(frame, frame_index)）
+        时才会绘制分析结果，并且直接在解码出的帧上绘制。解码帧来自复用的缓冲池，
+        frame_callback 返回后缓冲区即被回收，需要保留画面时请自行拷贝。
+        
+        progress_callback(progress, frame_index, total_frames) 在每个分析的帧之后调用，与 include_frames 无关。
+        
+        输出视频由后台线程编码：output_scale 和 output_fps 用于生成缩小的预览视频，
+        bench_segments_only=True 时只写入卧推片段。
+        
+        profile=True 时记录各阶段耗时直方图，报告放在总体统计的 'profile' 字段中。
+        
+        frame_stride=N 时每N帧只解码分析一帧，其余帧只抓取不解码，输出视频帧率相应降低。
+        
+        motion_threshold 不为空时启用运动门控：画面变化像素比例低于该值（如 0.01）的帧
+        复用上一次的检测结果，不重新推理，至少每秒推理一次。跳过的帧数和节省的时间
+        放在总体统计的 'motion_gating' 字段中。
+        
+        two_pass=True 时先用低分辨率、低复杂度模型按 coarse_stride（默认半秒）抽帧扫描，
+        定位卧推片段，第二遍只对这些片段跳转解码并完整分析，适合很长的录像。
+        coarse_stride 应短于最短的一组，输出视频只包含这些片段；扫描统计放在总体统计的 'two_pass' 字段中。
+        
+        checkpoint_path 不为空时每隔 checkpoint_interval 秒把帧位置、进行中的组和计数写入检查点，
+        已完成的组随时追加保存。对同一视频、同一配置重新运行时从检查点继续，之前完成的组先
+        作为事件重新产出（'resumed': True）。检查点文件名中带有视频和配置的标识（见 AnalysisCheckpoint），
+        换一种配置运行不会删除原来的进度。输出视频此时分段写入检查点旁的文件（见 SegmentedVideoWriter），
+        恢复后接着写新的一段，分析完成时拼接为 output_path；取消时不生成 output_path。分析完成后删除检查点。
+        
+        cancel_token 被取消时在当前帧结束后停止，保存检查点并产出 'end'，总体统计中
+        'cancelled' 为 True，进行中的组放在 'partial_set' 中（不作为组事件产出，恢复后继续累积）。
+        """
+        frame_stride = max(1, int(frame_stride))
         cap = cv2.VideoCapture(video_path)
         
         if not cap.isOpened():
@@ -37,53 +169,313 @@ class VideoProcessor:
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
-        # 设置输出视频
-        if output_path:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        else:
-            out = None
-        
-        # 初始化分析结果
-        analysis_results = {
-            'total_frames': total_frames,
-            'bench_press_frames': 0,
-            'sets': [],
-            'average_score': 0,
-            'total_reps': 0,
-            'duration': 0,
-            'start_time': datetime.now().isoformat()
-        }
+        # 分阶段性能分析
+        profiler = StageProfiler() if profile else NULL_PROFILER
+        self.pose_detector.profiler = profiler
+        
+        # 解码直接写入池中的缓冲区，帧处理完毕后归还
+        writer_queue_size = 8
+        frame_pool = FramePool((height, width, 3), max_free=writer_queue_size + 2)
+        out = None
+        
+        try:
+            # 检查点：视频或配置变化时使用另一个检查点文件，不恢复也不覆盖原来的进度
+            checkpoint = None
+            resume_state = None
+            if checkpoint_path:
+                config = {
+                    'frame_stride': frame_stride,
+                    'motion_threshold': motion_threshold,
+                    'two_pass': two_pass,
+                    'coarse_stride': coarse_stride,
+                    'backend': getattr(self.pose_detector.backend, 'name', type(self.pose_detector.backend).__name__),
+                    # 输出视频的各段必须用相同的参数写入才能拼接
+                    'output': [output_scale, output_fps, bench_segments_only] if output_path else None
+                }
+                checkpoint = AnalysisCheckpoint(checkpoint_path, checkpoint_key(video_path, config))
+                resume_state = checkpoint.load()
+                if resume_state is None:
+                    # 本配置的检查点不存在或已损坏，从头开始
+                    checkpoint.clear()
+            
+            # 设置输出视频（后台编码，写完后把缓冲区归还缓冲池）；有检查点时分段写入
+            if output_path:
+                writer_options = dict(fps=fps / frame_stride, size=(width, height),
+                                      scale=output_scale, output_fps=output_fps,
+                                      max_queue=writer_queue_size,
+                                      on_frame_done=frame_pool.release,
+                                      profiler=profiler)
+                if checkpoint is not None:
+                    ext = os.path.splitext(output_path)[1] or '.mp4'
+                    out = SegmentedVideoWriter(output_path, lambda index: checkpoint.segment_path(index, ext),
+                                               resume_state['output_segments'] if resume_state else [],
+                                               **writer_options)
+                else:
+                    out = AsyncVideoWriter(output_path, **writer_options)
+            
+            print(f"开始处理视频: {video_path}")
+            print(f"视频信息: {width}x{height}, {fps}fps, {total_frames}帧")
+            yield {'type': 'start', 'video': video_path, 'width': width, 'height': height,
+                   'fps': fps, 'total_frames': total_frames}
+            
+            if resume_state is not None:
+                print(f"从检查点恢复: 第{resume_state['frame']}帧, 已完成{resume_state['set_count']}组")
+                for set_summary in resume_state['completed_sets']:
+                    yield {'type': 'set', 'set': set_summary, 'resumed': True}
+            
+            # 两遍分析：先粗扫描定位卧推片段（恢复时沿用检查点中的扫描结果）
+            scan = None
+            if two_pass and resume_state is not None:
+                scan = resume_state['scan']
+            elif two_pass:
+                owned = coarse_backend is None
+                if owned:
+                    coarse_backend = self._default_coarse_backend()
+                try:
+                    scan = scan_bench_segments(video_path, coarse_backend, self.analyzer,
+                                               coarse_stride or max(1, fps // 2))
+                finally:
+                    # 释放本处理器创建的MediaPipe计算图（下次两遍分析时由同一实例重新加载）
+                    if owned and isinstance(coarse_backend, MediaPipeBackend):
+                        coarse_backend.close()
+                print(f"粗扫描完成: {scan['samples']}个采样, {len(scan['segments'])}个卧推片段, "
+                      f"需精细分析 {scan['segment_frames']}/{scan['total_frames']}帧")
+            
+            # 运动门控（至少每秒推理一次）
+            motion_gate = None
+            if motion_threshold is not None:
+                motion_gate = MotionGate(motion_threshold, max_skip=max(1, fps // frame_stride))
+            
+            summary = yield from self._iter_frames(cap, fps, total_frames, frame_pool, out,
+                                                   frame_callback, progress_callback, bench_segments_only,
+                                                   profiler, frame_stride, motion_gate, scan, include_frames,
+                                                   checkpoint, checkpoint_interval, resume_state,
+                                                   cancel_token)
+        except BaseException:
+            # 已有异常（包括迭代提前停止）时关闭输出视频，不让编码线程的错误掩盖原来的异常
+            if out:
+                out.close(raise_error=False)
+                out = None
+            raise
+        finally:
+            # 清理资源（迭代提前停止时也会执行）
+            cap.release()
+            if out:
+                out.close()
+            profiler.finish()
+            self.pose_detector.profiler = NULL_PROFILER
         
+        # 计算总体统计
+        summary['total_frames'] = total_frames
+        summary['duration'] = total_frames / fps
+        self.last_frame_pool_stats = frame_pool.stats()
+        FRAME_POOL_REUSES.inc(self.last_frame_pool_stats['reuses'])
+        FRAME_POOL_ALLOCATIONS.inc(self.last_frame_pool_stats['allocations'])
+        FRAME_POOL_HIT_RATE.set(self.last_frame_pool_stats['hit_rate'])
+        if profile:
+            summary['profile'] = profiler.report()
+        if resume_state is not None:
+            summary['resumed_from'] = resume_state['frame']
+        if two_pass:
+            summary['two_pass'] = {
+                'coarse_stride': scan['stride'],
+                'coarse_samples': scan['samples'],
+                'coarse_seconds': scan['seconds'],
+                'segments': [[begin, end] for begin, end, _ in scan['segments']],
+                'fine_frames': summary['analyzed_frames'],
+                'fine_ratio': summary['analyzed_frames'] / total_frames if total_frames else 0.0
+            }
+        
+        print(f"视频处理完成: {summary['total_reps']}次重复, 平均分数: {summary['average_score']:.1f}")
+        yield {'type': 'end', 'summary': summary}
+    
+    def _default_coarse_backend(self) -> PoseBackend:
+        """两遍分析第一遍的默认后端，每个处理器只创建一个
+        
+        MediaPipe使用轻量模型的单帧检测；其他后端复制一份（共享模型，回放位置等状态各自独立），
+        第一遍扫描不会改变精细分析后端的状态。
+        """
+        if self._coarse_backend is None:
+            backend = self.pose_detector.backend
+            if isinstance(backend, MediaPipeBackend):
+                self._coarse_backend = MediaPipeBackend(model_complexity=0, static_image_mode=True)
+            else:
+                self._coarse_backend = copy.copy(backend)
+        if hasattr(self._coarse_backend, 'reset'):
+            self._coarse_backend.reset()
+        return self._coarse_backend
+    
+    def _iter_frames(self, cap: cv2.VideoCapture, fps: int, total_frames: int,
+                     frame_pool: FramePool, out: Optional[Union[AsyncVideoWriter, SegmentedVideoWriter]],
+                     frame_callback: Optional[Callable], progress_callback: Optional[Callable],
+                     bench_segments_only: bool,
+                     profiler: StageProfiler = NULL_PROFILER, frame_stride: int = 1,
+                     motion_gate: Optional[MotionGate] = None, scan: Optional[Dict] = None,
+                     include_frames: bool = True,
+                     checkpoint: Optional[AnalysisCheckpoint] = None,
+                     checkpoint_interval: float = 30.0, resume_state: Optional[Dict] = None,
+                     cancel_token: Optional[CancellationToken] = None) -> Generator[Dict, None, Dict]:
+        """逐帧解码、分析并把帧交给输出，产出帧和组事件，结束时返回总体统计
+        
+        scan 不为空时只分析其中的帧区间（见 scan_bench_segments），区间之间直接跳转。
+        """
+        segments = scan['segments'] if scan else None
         frame_count = 0
+        analyzed_frames = 0
         bench_press_frames = 0
         current_set = []
-        
-        print(f"开始处理视频: {video_path}")
-        print(f"视频信息: {width}x{height}, {fps}fps, {total_frames}帧")
+        fps_window_start = time.perf_counter()
+        
+        # 各组只保留次数和平均分数，用于总体统计
+        set_reps = []
+        set_scores = []
+        
+        # 运动门控统计
+        pose_data = None
+        inferred_frames = 0
+        inference_seconds = 0.0
+        gate_seconds = 0.0
+        
+        # 两遍分析的当前片段
+        segment_index = -1
+        seeked = False
+        
+        # 从检查点恢复状态并跳到上次的位置
+        if resume_state is not None:
+            frame_count = resume_state['frame']
+            analyzed_frames = resume_state['analyzed_frames']
+            bench_press_frames = resume_state['bench_press_frames']
+            current_set = resume_state['current_set']
+            set_reps = [set_summary['reps'] for set_summary in resume_state['completed_sets']]
+            set_scores = [set_summary['average_score'] for set_summary in resume_state['completed_sets']]
+            segment_index = resume_state['segment_index']
+            inferred_frames = resume_state['inferred_frames']
+            inference_seconds = resume_state['inference_seconds']
+            gate_seconds = resume_state['gate_seconds']
+            if motion_gate is not None:
+                motion_gate.skipped_frames = resume_state['skipped_frames']
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+        last_checkpoint = time.monotonic()
+        cancelled = False
+        
+        def finish_set() -> Dict:
+            set_summary = self._analyze_set(current_set)
+            set_reps.append(set_summary['reps'])
+            set_scores.append(set_summary['average_score'])
+            if checkpoint is not None:
+                checkpoint.append_set(set_summary)
+            return {'type': 'set', 'set': set_summary}
+        
+        def save_checkpoint():
+            # 只在一帧处理完之后调用，保存的状态总是一致的
+            checkpoint.save({
+                'frame': frame_count,
+                'analyzed_frames': analyzed_frames,
+                'bench_press_frames': bench_press_frames,
+                'set_count': len(set_reps),
+                'current_set': current_set,
+                'segment_index': segment_index,
+                'scan': scan,
+                'inferred_frames': inferred_frames,
+                'inference_seconds': inference_seconds,
+                'gate_seconds': gate_seconds,
+                'skipped_frames': motion_gate.skipped_frames if motion_gate is not None else 0,
+                # 结束输出视频的当前段，检查点只引用已写完的段
+                'output_segments': out.rotate() if isinstance(out, SegmentedVideoWriter) else []
+            })
         
         while True:
-            ret, frame = cap.read()
+            if cancel_token is not None and cancel_token.cancelled:
+                cancelled = True
+                if checkpoint is not None:
+                    save_checkpoint()
+                print(f"分析已取消: 停在第{frame_count}帧")
+                break
+            
+            if segments is not None and (segment_index < 0 or frame_count >= segments[segment_index][1]):
+                # 当前片段处理完，跳到下一个片段
+                segment_index += 1
+                if segment_index >= len(segments):
+                    break
+                segment_start, _, split_before = segments[segment_index]
+                if split_before and current_set:
+                    completed_set = finish_set()
+                    current_set = []
+                    yield completed_set
+                cap.set(cv2.CAP_PROP_POS_FRAMES, segment_start)
+                frame_count = segment_start
+                seeked = True
+                if motion_gate is not None:
+                    motion_gate.reset()
+            
+            frame_start = time.perf_counter()
+            with profiler.stage('decode'):
+                # 按步长跳过的帧只抓取不解码
+                ret = True
+                if frame_count and frame_stride > 1 and not seeked:
+                    for _ in range(frame_stride - 1):
+                        ret = cap.grab()
+                        if not ret:
+                            break
+                        frame_count += 1
+                buffer = frame_pool.acquire()
+                if ret:
+                    ret, frame = cap.read(image=buffer)
+            seeked = False
             if not ret:
+                frame_pool.release(buffer)
                 break
             
             frame_count += 1
+            analyzed_frames += 1
+            is_bench_press = False
+            completed_set = None
+            frame_event = {
+                'type': 'frame',
+                'frame': frame_count,
+                'total_frames': total_frames,
+                'timestamp': frame_count / fps,
+                'detected': False,
+                'is_bench_press': False,
+                'phase': None,
+                'score': None,
+                'feedback': []
+            }
             
-            # 检测姿态
-            pose_data = self.pose_detector.detect_pose(frame)
+            # 只有帧会被消费时才绘制
+            render = frame_callback is not None or (out is not None and out.accepts(analyzed_frames))
+            
+            # 检测姿态（画面静止时复用上一次的检测结果）
+            infer = True
+            if motion_gate is not None:
+                gate_start = time.perf_counter()
+                with profiler.stage('motion'):
+                    infer = motion_gate.should_infer(frame)
+                gate_seconds += time.perf_counter() - gate_start
+            if infer:
+                inference_start = time.perf_counter()
+                pose_data = self.pose_detector.detect_pose(frame)
+                inference_seconds += time.perf_counter() - inference_start
+                inferred_frames += 1
+            else:
+                MOTION_SKIPPED_FRAMES.inc()
             
             if pose_data:
+                frame_event['detected'] = True
                 # 判断是否为卧推姿势
-                is_bench_press = self.analyzer.is_bench_press_pose(pose_data)
+                with profiler.stage('features'):
+                    is_bench_press = self.analyzer.is_bench_press_pose(pose_data)
                 
                 if is_bench_press:
                     bench_press_frames += 1
+                    BENCH_PRESS_FRAMES.inc()
                     
-                    # 分析姿势质量
-                    quality_analysis = self.analyzer.analyze_pose_quality(pose_data)
-                    
-                    # 检测动作阶段
-                    current_phase = self.analyzer.detect_bench_press_phase(pose_data)
+                    with profiler.stage('scoring'):
+                        # 分析姿势质量
+                        quality_analysis = self.analyzer.analyze_pose_quality(pose_data)
+                        
+                        # 检测动作阶段
+                        current_phase = self.analyzer.detect_bench_press_phase(pose_data)
                     
                     # 记录当前帧数据
                     frame_data = {
@@ -92,67 +484,126 @@ class VideoProcessor:
                         'phase': current_phase,
                         'score': quality_analysis['score'],
                         'angles': quality_analysis['angles'],
-                        'feedback': quality_analysis['feedback']
+                        'feedback_mask': quality_analysis['feedback_mask']
                     }
                     
                     current_set.append(frame_data)
+                    frame_event.update({
+                        'is_bench_press': True,
+                        'phase': current_phase,
+                        'score': quality_analysis['score'],
+                        'feedback': quality_analysis['feedback']
+                    })
                     
-                    # 在帧上绘制分析结果
-                    annotated_frame = self._draw_analysis_on_frame(
-                        frame, pose_data, quality_analysis, current_phase
-                    )
+                    # 在帧上绘制分析结果（解码帧之后不再使用，直接原地绘制）
+                    if render:
+                        with profiler.stage('drawing'):
+                            annotated_frame = self._draw_analysis_on_frame(
+                                frame, pose_data, quality_analysis, current_phase, in_place=True
+                            )
+                    else:
+                        annotated_frame = frame
                 else:
                     # 如果不是卧推姿势，结束当前组
                     if current_set:
-                        set_summary = self._analyze_set(current_set)
-                        analysis_results['sets'].append(set_summary)
+                        completed_set = finish_set()
                         current_set = []
                     
                     annotated_frame = frame
             else:
                 annotated_frame = frame
             
-            # 写入输出视频
-            if out:
-                out.write(annotated_frame)
+            if frame_callback:
+                frame_callback(annotated_frame, frame_count)
             
-            # 调用回调函数
-            if callback:
-                progress = frame_count / total_frames
-                callback(progress, frame_count, total_frames)
+            # 写入输出视频：交给编码线程后由它归还缓冲区，否则在此归还
+            handed_off = False
+            if out and (is_bench_press or not bench_segments_only):
+                handed_off = out.write(annotated_frame, analyzed_frames)
+            if not handed_off:
+                frame_pool.release(frame)
+            profiler.record('frame', time.perf_counter() - frame_start)
+            
+            # 更新运行时指标
+            FRAMES_PROCESSED.inc()
+            if analyzed_frames % FPS_WINDOW == 0:
+                now = time.perf_counter()
+                PROCESSING_FPS.set(FPS_WINDOW / (now - fps_window_start))
+                fps_window_start = now
             
             # 显示进度
-            if frame_count % 100 == 0:
+            if analyzed_frames % 100 == 0:
                 print(f"处理进度: {frame_count}/{total_frames} ({frame_count/total_frames*100:.1f}%)")
-        
-        # 处理最后一组
-        if current_set:
-            set_summary = self._analyze_set(current_set)
-            analysis_results['sets'].append(set_summary)
-        
-        # 计算总体统计
-        analysis_results['bench_press_frames'] = bench_press_frames
-        analysis_results['total_reps'] = sum(set_data['reps'] for set_data in analysis_results['sets'])
-        analysis_results['average_score'] = np.mean([set_data['average_score'] for set_data in analysis_results['sets']]) if analysis_results['sets'] else 0
-        analysis_results['duration'] = total_frames / fps
-        analysis_results['end_time'] = datetime.now().isoformat()
-        
-        # 清理资源
-        cap.release()
-        if out:
-            out.release()
-        
-        print(f"视频处理完成: {analysis_results['total_reps']}次重复, 平均分数: {analysis_results['average_score']:.1f}")
-        
-        return analysis_results
+            
+            # 定期保存检查点
+            if checkpoint is not None and time.monotonic() - last_checkpoint >= checkpoint_interval:
+                save_checkpoint()
+                last_checkpoint = time.monotonic()
+            
+            if progress_callback:
+                progress_callback(frame_count / total_frames if total_frames else 0.0, frame_count, total_frames)
+            
+            # 帧已交出或归还后再产出事件，调用方暂停迭代时不占用缓冲区
+            if completed_set:
+                yield completed_set
+            if include_frames:
+                yield frame_event
+        
+        # 处理最后一组（取消时进行中的组留在检查点里，恢复后继续）
+        partial_set = None
+        if cancelled:
+            partial_set = self._analyze_set(current_set) if current_set else None
+        elif current_set:
+            completed_set = finish_set()
+            current_set = []
+            yield completed_set
+        if checkpoint is not None and not cancelled:
+            if isinstance(out, SegmentedVideoWriter):
+                out.finish()
+            checkpoint.clear()
+        
+        summary = {
+            'bench_press_frames': bench_press_frames,
+            'analyzed_frames': analyzed_frames,
+            'set_count': len(set_reps),
+            'total_reps': sum(set_reps),
+            'average_score': float(np.mean(set_scores)) if set_scores else 0,
+            'cancelled': cancelled
+        }
+        if cancelled:
+            summary['resume_frame'] = frame_count
+            summary['partial_set'] = partial_set
+        
+        if motion_gate is not None:
+            # 节省的时间按推理帧的平均推理耗时估算，扣除门控本身的开销
+            mean_inference = inference_seconds / inferred_frames if inferred_frames else 0.0
+            summary['motion_gating'] = {
+                'analyzed_frames': analyzed_frames,
+                'inferred_frames': inferred_frames,
+                'skipped_frames': motion_gate.skipped_frames,
+                'skip_ratio': motion_gate.skipped_frames / analyzed_frames if analyzed_frames else 0.0,
+                'inference_seconds': inference_seconds,
+                'gate_seconds': gate_seconds,
+                'time_saved_seconds': motion_gate.skipped_frames * mean_inference - gate_seconds
+            }
+        return summary
     
-    def start_realtime_analysis(self, camera_id: int = 0):
-        """开始实时分析（摄像头）"""
+    def start_realtime_analysis(self, camera_id: int = 0, headless: bool = False,
+                                event_target: Optional[str] = None):
+        """开始实时分析（摄像头）
+        
+        headless=True 时不做任何绘制和显示，只把重复、组和分数事件以JSON Lines
+        输出到 event_target（默认标准输出，也可以是 'host:port' 或Unix套接字路径）。
+        """
         cap = cv2.VideoCapture(camera_id)
         
         if not cap.isOpened():
             raise ValueError(f"无法打开摄像头: {camera_id}")
         
+        # 无界面模式下事件占用标准输出，提示信息改写到标准错误
+        self.event_emitter = EventEmitter(event_target) if headless or event_target else None
+        self._log_stream = sys.stderr if headless else sys.stdout
+        
         # 开始新的锻炼会话
         self.current_workout_id = self.tracker.start_workout()
         self.is_recording = True
@@ -161,69 +612,102 @@ class VideoProcessor:
         self.last_phase = 'IDLE'
         self.phase_transitions = []
         
-        print("开始实时卧推分析...")
-        print("按 'q' 退出, 's' 开始/停止记录, 'r' 重置计数")
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # 检测姿态
-            pose_data = self.pose_detector.detect_pose(frame)
-            
-            if pose_data:
-                # 判断是否为卧推姿势
-                is_bench_press = self.analyzer.is_bench_press_pose(pose_data)
+        self._log("开始实时卧推分析...")
+        if headless:
+            self._log("无界面模式，按 Ctrl+C 退出")
+        else:
+            self._log("按 'q' 退出, 's' 开始/停止记录, 'r' 重置计数")
+        
+        # 独立线程采集，只保留最新一帧；显示和按键在另一个线程处理
+        grabber = FrameGrabber(cap).start()
+        latency_stats = LatencyStats()
+        display = None if headless else DisplayWorker('卧推姿势分析', latency_stats).start()
+        processed_frames = 0
+        session_start = time.monotonic()
+        fps_window_start = session_start
+        reported_drops = 0
+        
+        try:
+            while True:
+                ret, frame, capture_time = grabber.read()
+                if not ret:
+                    break
                 
-                if is_bench_press:
-                    # 分析姿势质量
-                    quality_analysis = self.analyzer.analyze_pose_quality(pose_data)
-                    
-                    # 检测动作阶段
-                    current_phase = self.analyzer.detect_bench_press_phase(pose_data)
-                    
-                    # 检测重复次数
-                    if self.last_phase == 'DOWN' and current_phase == 'UP':
-                        self.rep_count += 1
-                        print(f"重复次数: {self.rep_count}")
-                    
-                    self.last_phase = current_phase
-                    
-                    # 记录数据
-                    if self.is_recording:
-                        frame_data = {
-                            'timestamp': time.time(),
-                            'phase': current_phase,
-                            'score': quality_analysis['score'],
-                            'angles': quality_analysis['angles']
-                        }
-                        self.current_set_data.append(frame_data)
-                    
-                    # 在帧上绘制分析结果
-                    annotated_frame = self._draw_realtime_analysis(
-                        frame, pose_data, quality_analysis, current_phase
-                    )
-                else:
-                    annotated_frame = frame
-            else:
+                processed_frames += 1
+                
+                # 更新运行时指标
+                FRAMES_PROCESSED.inc()
+                if grabber.dropped_frames != reported_drops:
+                    DROPPED_FRAMES.inc(grabber.dropped_frames - reported_drops)
+                    reported_drops = grabber.dropped_frames
+                if processed_frames % FPS_WINDOW == 0:
+                    now = time.monotonic()
+                    PROCESSING_FPS.set(FPS_WINDOW / (now - fps_window_start))
+                    fps_window_start = now
+                
+                # 检测姿态
+                pose_data = self.pose_detector.detect_pose(frame)
                 annotated_frame = frame
-            
-            # 显示帧
-            cv2.imshow('卧推姿势分析', annotated_frame)
-            
-            # 处理按键
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('s'):
-                self.is_recording = not self.is_recording
-                print(f"记录状态: {'开启' if self.is_recording else '关闭'}")
-            elif key == ord('r'):
-                self._save_current_set()
-                self.rep_count = 0
-                self.current_set_data = []
-                print("重置计数")
+                
+                if pose_data:
+                    # 判断是否为卧推姿势
+                    is_bench_press = self.analyzer.is_bench_press_pose(pose_data)
+                    
+                    if is_bench_press:
+                        BENCH_PRESS_FRAMES.inc()
+                        
+                        # 分析姿势质量
+                        quality_analysis = self.analyzer.analyze_pose_quality(pose_data)
+                        
+                        # 检测动作阶段
+                        current_phase = self.analyzer.detect_bench_press_phase(pose_data)
+                        
+                        # 检测重复次数
+                        if self.last_phase == 'DOWN' and current_phase == 'UP':
+                            self.rep_count += 1
+                            self._log(f"重复次数: {self.rep_count}")
+                            self._emit('rep', rep_count=self.rep_count)
+                        
+                        self.last_phase = current_phase
+                        self._emit('score', phase=current_phase,
+                                   score=quality_analysis['score'],
+                                   feedback=quality_analysis['feedback'])
+                        
+                        # 记录数据
+                        if self.is_recording:
+                            frame_data = {
+                                'timestamp': time.time(),
+                                'phase': current_phase,
+                                'score': quality_analysis['score'],
+                                'angles': quality_analysis['angles']
+                            }
+                            self.current_set_data.append(frame_data)
+                        
+                        # 在帧上绘制分析结果
+                        if display:
+                            annotated_frame = self._draw_realtime_analysis(
+                                frame, pose_data, quality_analysis, current_phase, in_place=True
+                            )
+                
+                if display is None:
+                    # 无界面模式：分析完成即视为已送达
+                    latency_stats.add(time.monotonic() - capture_time)
+                    continue
+                
+                # 交给显示线程
+                display.submit(annotated_frame, capture_time)
+                
+                # 处理按键
+                if self._handle_realtime_keys(display.get_keys()):
+                    break
+        except KeyboardInterrupt:
+            self._log("收到中断信号，结束实时分析")
+        finally:
+            grabber.stop()
+            if display:
+                display.stop()
+            cap.release()
+            DROPPED_FRAMES.inc(grabber.dropped_frames - reported_drops)
         
         # 保存最后一组数据
         if self.current_set_data:
@@ -233,17 +717,68 @@ class VideoProcessor:
         if self.current_workout_id:
             self.tracker.end_workout(self.current_workout_id)
         
-        cap.release()
-        cv2.destroyAllWindows()
+        stats = self._report_realtime_stats(grabber, latency_stats, processed_frames,
+                                            time.monotonic() - session_start)
+        self._emit('session_end', stats=stats)
+        if self.event_emitter:
+            self.event_emitter.close()
+            self.event_emitter = None
+        self._log_stream = sys.stdout
+        
+        return stats
+    
+    def _handle_realtime_keys(self, keys: List[int]) -> bool:
+        """处理显示线程收到的按键，返回是否退出"""
+        for key in keys:
+            if key == ord('q'):
+                return True
+            elif key == ord('s'):
+                self.is_recording = not self.is_recording
+                self._log(f"记录状态: {'开启' if self.is_recording else '关闭'}")
+            elif key == ord('r'):
+                self._save_current_set()
+                self.rep_count = 0
+                self.current_set_data = []
+                self._log("重置计数")
+        return False
+    
+    def _emit(self, event_type: str, **fields):
+        """输出实时事件（仅在配置了事件输出时）"""
+        if self.event_emitter:
+            self.event_emitter.emit(event_type, **fields)
+    
+    def _log(self, message: str):
+        """输出提示信息"""
+        print(message, file=self._log_stream)
+    
+    def _report_realtime_stats(self, grabber: FrameGrabber, latency_stats: LatencyStats,
+                               processed_frames: int, elapsed: float) -> Dict:
+        """输出实时会话的延迟和丢帧统计"""
+        latency = latency_stats.summary()
+        stats = {
+            'captured_frames': grabber.captured_frames,
+            'processed_frames': processed_frames,
+            'dropped_frames': grabber.dropped_frames,
+            'processing_fps': processed_frames / elapsed if elapsed > 0 else 0,
+            'latency': latency
+        }
+        
+        self._log("实时会话统计:")
+        self._log(f"  采集帧数: {stats['captured_frames']}, 处理帧数: {processed_frames}, "
+                  f"丢弃过期帧: {stats['dropped_frames']}")
+        self._log(f"  处理帧率: {stats['processing_fps']:.1f}fps")
+        self._log(f"  采集到显示延迟: 平均 {latency['mean_ms']:.1f}ms, "
+                  f"P50 {latency['p50_ms']:.1f}ms, P95 {latency['p95_ms']:.1f}ms, "
+                  f"最大 {latency['max_ms']:.1f}ms")
+        
+        return stats
     
     def _draw_analysis_on_frame(self, frame: np.ndarray, pose_data: Dict, 
-                               quality_analysis: Dict, phase: str) -> np.ndarray:
+                               quality_analysis: Dict, phase: str,
+                               in_place: bool = False) -> np.ndarray:
         """在帧上绘制分析结果"""
         # 绘制姿态关键点
-        annotated_frame = self.pose_detector.draw_pose(frame, pose_data)
-        
-        # 添加文本信息
-        height, width = annotated_frame.shape[:2]
+        annotated_frame = self.pose_detector.draw_pose(frame, pose_data, in_place=in_place)
         
         # 姿势分数
         score = quality_analysis['score']
@@ -266,9 +801,11 @@ class VideoProcessor:
         return annotated_frame
     
     def _draw_realtime_analysis(self, frame: np.ndarray, pose_data: Dict, 
-                               quality_analysis: Dict, phase: str) -> np.ndarray:
+                               quality_analysis: Dict, phase: str,
+                               in_place: bool = False) -> np.ndarray:
         """在帧上绘制实时分析结果"""
-        annotated_frame = self._draw_analysis_on_frame(frame, pose_data, quality_analysis, phase)
+        annotated_frame = self._draw_analysis_on_frame(frame, pose_data, quality_analysis, phase,
+                                                       in_place=in_place)
         
         # 添加实时信息
         height, width = annotated_frame.shape[:2]
@@ -286,28 +823,10 @@ class VideoProcessor:
         return annotated_frame
     
     def _analyze_set(self, set_data: List[Dict]) -> Dict:
-        """分析一组数据"""
+        """分析一组数据（见 summarize_set），逐帧数据转换为按列保存的 'columns'"""
         if not set_data:
             return {}
-        
-        # 计算重复次数
-        phases = [frame['phase'] for frame in set_data]
-        rep_count = 0
-        for i in range(1, len(phases)):
-            if phases[i-1] == 'DOWN' and phases[i] == 'UP':
-                rep_count += 1
-        
-        # 计算平均分数
-        scores = [frame['score'] for frame in set_data]
-        average_score = np.mean(scores)
-        
-        return {
-            'reps': rep_count,
-            'average_score': average_score,
-            'frames': len(set_data),
-            'duration': set_data[-1]['timestamp'] - set_data[0]['timestamp'],
-            'phase_data': set_data
-        }
+        return summarize_set(set_data)
     
     def _save_current_set(self):
         """保存当前组数据"""
@@ -320,6 +839,9 @@ class VideoProcessor:
                 self.current_workout_id,
                 set_analysis['reps'],
                 set_analysis['average_score'],
-                self.current_set_data
+                self.current_set_data,
+                rep_metrics=set_analysis['rep_metrics']
             )
-            print(f"保存组数据: {set_analysis['reps']}次重复, 平均分数: {set_analysis['average_score']:.1f}") 
\ No newline at end of file
+            self._log(f"保存组数据: {set_analysis['reps']}次重复, 平均分数: {set_analysis['average_score']:.1f}")
+            self._emit('set', reps=set_analysis['reps'], average_score=set_analysis['average_score'],
+                       duration=set_analysis['duration']) 
\ No newline at end of file
@@ -0,0 +1,178 @@
+import cv2
+import numpy as np
+import os
+import queue
+import threading
+from typing import Callable, List, Optional, Tuple
+from profiler import NULL_PROFILER, StageProfiler
+
+class AsyncVideoWriter:
+    """后台编码线程：分析循环只把帧放入有界队列，编码和缩放在独立线程完成
+
+    scale < 1 时输出缩小分辨率的预览视频；output_fps 低于原视频帧率时按间隔抽帧。
+    write() 接受的帧所有权交给编码线程，写完后通过 on_frame_done 交还（如归还缓冲池）。
+    """
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int],
+                 scale: float = 1.0, output_fps: Optional[float] = None,
+                 fourcc: str = 'mp4v', max_queue: int = 8,
+                 on_frame_done: Optional[Callable[[np.ndarray], None]] = None,
+                 profiler: StageProfiler = NULL_PROFILER):
+        self.path = path
+        self.input_size = size
+        self.on_frame_done = on_frame_done
+        self.profiler = profiler
+
+        # 按目标帧率计算抽帧间隔
+        fps = fps or 30
+        self.frame_step = max(1, int(round(fps / output_fps))) if output_fps else 1
+        self.output_fps = fps / self.frame_step
+
+        # 缩放后的尺寸保持为偶数，兼容常见编码器
+        width, height = size
+        if scale < 1.0:
+            width = max(2, int(width * scale) // 2 * 2)
+            height = max(2, int(height * scale) // 2 * 2)
+        self.output_size = (width, height)
+        self._resize_buffer = None
+
+        self.fourcc = fourcc
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc),
+                                       self.output_fps, self.output_size)
+        if not self._writer.isOpened():
+            raise ValueError(f"无法创建输出视频: {path}")
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='AsyncVideoWriter', daemon=True)
+        self._thread.start()
+
+        self.written_frames = 0
+
+    def accepts(self, frame_index: int) -> bool:
+        """该帧是否会被写入（用于跳过不需要的绘制）"""
+        return (frame_index - 1) % self.frame_step == 0
+
+    def write(self, frame: np.ndarray, frame_index: int) -> bool:
+        """提交一帧；返回 True 表示帧已交给编码线程，调用方不能再修改或回收它"""
+        if self._error is not None:
+            raise self._error
+        if not self.accepts(frame_index):
+            return False
+        # 队列满时阻塞，防止编码跟不上时内存无限增长
+        self._queue.put(frame)
+        return True
+
+    def close(self, raise_error: bool = True):
+        """等待队列中的帧写完并关闭文件
+
+        编码线程出错时抛出该错误；raise_error=False 用于已有异常正在传播时关闭，不掩盖原来的异常。
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._writer.release()
+        if self._error is not None and raise_error:
+            raise self._error
+
+    def _run(self):
+        """编码循环"""
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            try:
+                if self._error is None:
+                    with self.profiler.stage('encode'):
+                        self._writer.write(self._resize(frame))
+                    self.written_frames += 1
+            except Exception as e:
+                self._error = e
+            finally:
+                if self.on_frame_done:
+                    self.on_frame_done(frame)
+
+    def _resize(self, frame: np.ndarray) -> np.ndarray:
+        """缩放到输出尺寸，结果写入复用的缓冲区"""
+        height, width = frame.shape[:2]
+        if (width, height) == self.output_size:
+            return frame
+        if self._resize_buffer is None:
+            self._resize_buffer = np.empty((self.output_size[1], self.output_size[0], 3), dtype=frame.dtype)
+        return cv2.resize(frame, self.output_size, dst=self._resize_buffer,
+                          interpolation=cv2.INTER_AREA)
+
+class SegmentedVideoWriter:
+    """可恢复分析的输出视频：分段写入，每次保存检查点时结束当前段，分析完成后拼接为 path
+
+    segment_path(i) 返回第i段的文件路径，segments 为检查点中记录的已完成的段。恢复时从这些段
+    之后开始新的一段，上次运行在检查点之后写入的帧（包括进程退出时没有写完的段）被覆盖，
+    拼接结果与不中断时一致。其余参数和 accepts()/write() 与 AsyncVideoWriter 相同。
+    """
+
+    def __init__(self, path: str, segment_path: Callable[[int], str],
+                 segments: Optional[List[str]] = None, **writer_options):
+        self.path = path
+        self.segments = list(segments or [])
+        self._segment_path = segment_path
+        self._writer_options = writer_options
+        self._writer = None
+        self._pending = 0
+        self._open()
+
+    def _open(self):
+        """开始新的一段"""
+        self._writer = AsyncVideoWriter(self._segment_path(len(self.segments)), **self._writer_options)
+        self._pending = 0
+
+    def accepts(self, frame_index: int) -> bool:
+        return self._writer.accepts(frame_index)
+
+    def write(self, frame: np.ndarray, frame_index: int) -> bool:
+        handed_off = self._writer.write(frame, frame_index)
+        self._pending += handed_off
+        return handed_off
+
+    def rotate(self) -> List[str]:
+        """结束当前段（有新写入的帧时）并开始下一段，返回已完成的段（保存在检查点中）"""
+        if self._pending:
+            self._writer.close()
+            self.segments.append(self._writer.path)
+            self._open()
+        return list(self.segments)
+
+    def close(self, raise_error: bool = True):
+        """关闭当前段，不拼接（分析取消或出错时，段文件留给恢复时使用）"""
+        if self._writer is not None:
+            self._writer.close(raise_error)
+
+    def finish(self):
+        """关闭当前段，把所有段拼接为 path 并删除段文件"""
+        writer, self._writer = self._writer, None
+        writer.close()
+        if self._pending or not self.segments:
+            self.segments.append(writer.path)
+        else:
+            os.remove(writer.path)
+
+        if len(self.segments) == 1:
+            os.replace(self.segments[0], self.path)
+            return
+        output = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*writer.fourcc),
+                                 writer.output_fps, writer.output_size)
+        if not output.isOpened():
+            raise ValueError(f"无法创建输出视频: {self.path}")
+        try:
+            for segment in self.segments:
+                cap = cv2.VideoCapture(segment)
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    output.write(frame)
+                cap.release()
+        finally:
+            output.release()
+        for segment in self.segments:
+            os.remove(segment)
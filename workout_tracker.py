@@ -4,24 +4,43 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import json
 import os
+import sys
+import threading
+import time
+from metrics import REGISTRY
+from frame_query import FrameIndex
+
+# 运行时指标
+SAVE_SECONDS = REGISTRY.histogram('tracker_save_seconds', '锻炼数据写入文件耗时（秒）')
+QUERY_CACHE_HITS = REGISTRY.counter('tracker_query_cache_hits_total', '统计查询命中缓存的次数')
+QUERY_CACHE_MISSES = REGISTRY.counter('tracker_query_cache_misses_total', '统计查询重新扫描历史的次数')
 
 class WorkoutTracker:
     """锻炼数据跟踪器"""
     
     def __init__(self, data_file: str = "workout_data.json"):
         self.data_file = data_file
-        self.workout_data = self._load_data()
+        self._data_mtime = self._file_mtime()
+        self.workout_data = self._load_data(self._initialize_data())
+        
+        # 统计查询缓存：{(查询名, 天数): (结果, 过期时间)}，数据写入或文件被修改时清空
+        # 同一把锁也保护数据的重新加载和写入
+        self._query_cache = {}
+        self._cache_lock = threading.RLock()
+        
+        # 逐帧查询索引，首次查询时构建，之后随 add_set 增量追加
+        self._frame_index = None
         
-    def _load_data(self) -> Dict:
-        """加载历史锻炼数据"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self._initialize_data()
-        else:
+    def _load_data(self, fallback: Dict) -> Dict:
+        """加载历史锻炼数据，文件不存在时返回空数据，无法解析时记录错误并返回 fallback"""
+        if not os.path.exists(self.data_file):
             return self._initialize_data()
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 无法读取锻炼数据 {self.data_file}，保留已加载的数据: {str(e)}", file=sys.stderr)
+            return fallback
     
     def _initialize_data(self) -> Dict:
         """初始化数据结构"""
@@ -38,69 +57,163 @@ class WorkoutTracker:
         }
     
     def _save_data(self):
-        """保存数据到文件"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
+        """保存数据到文件（调用方持有缓存锁）
+        
+        先写临时文件再替换，其他跟踪器实例或进程不会读到写了一半的文件。
+        """
+        save_start = time.perf_counter()
+        tmp_path = f'{self.data_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(self.workout_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.data_file)
+        SAVE_SECONDS.observe(time.perf_counter() - save_start)
+        
+        self._query_cache.clear()
+        self._data_mtime = self._file_mtime()
+    
+    def _file_mtime(self) -> Optional[int]:
+        """数据文件的修改时间（纳秒），文件不存在时为None"""
+        try:
+            return os.stat(self.data_file).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _reload_if_changed(self):
+        """数据文件被其他跟踪器实例或进程修改时重新加载（调用方持有缓存锁）"""
+        mtime = self._file_mtime()
+        if mtime != self._data_mtime:
+            self._data_mtime = mtime
+            self.workout_data = self._load_data(self.workout_data)
+            self._query_cache.clear()
+            self._frame_index = None
+    
+    def _cached_query(self, name: str, days: int, compute):
+        """按时间窗口缓存统计查询
+        
+        结果在数据写入、数据文件被修改，或窗口内最早的锻炼移出窗口时失效；
+        命中缓存时不扫描历史。返回的对象是缓存本身，调用方不要修改。
+        """
+        with self._cache_lock:
+            self._reload_if_changed()
+            now = datetime.now()
+            key = (name, days)
+            entry = self._query_cache.get(key)
+            if entry is not None and now < entry[1]:
+                QUERY_CACHE_HITS.inc()
+                return entry[0]
+            
+            QUERY_CACHE_MISSES.inc()
+            cutoff_date = now - timedelta(days=days)
+            recent_workouts = []
+            earliest = None
+            for workout in self.workout_data['workouts']:
+                start_time = datetime.fromisoformat(workout['start_time'])
+                if start_time > cutoff_date:
+                    recent_workouts.append(workout)
+                    earliest = start_time if earliest is None else min(earliest, start_time)
+            expires_at = earliest + timedelta(days=days) if earliest else datetime.max
+            
+            result = compute(recent_workouts)
+            self._query_cache[key] = (result, expires_at)
+            return result
     
     def start_workout(self) -> str:
         """开始新的锻炼会话"""
-        workout_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        workout = {
-            'id': workout_id,
-            'start_time': datetime.now().isoformat(),
-            'end_time': None,
-            'sets': [],
-            'total_reps': 0,
-            'total_sets': 0,
-            'average_score': 0,
-            'best_score': 0,
-            'duration': 0,
-            'notes': ''
-        }
-        
-        self.workout_data['workouts'].append(workout)
-        self._save_data()
-        return workout_id
+        with self._cache_lock:
+            # 先合并其他实例写入的数据，再在同一把锁内写回
+            self._reload_if_changed()
+            workout_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # 同一秒内开始的多个会话（如多路摄像头）追加序号区分
+            base_id, suffix = workout_id, 1
+            while self._find_workout(workout_id):
+                suffix += 1
+                workout_id = f"{base_id}_{suffix}"
+            workout = {
+                'id': workout_id,
+                'start_time': datetime.now().isoformat(),
+                'end_time': None,
+                'sets': [],
+                'total_reps': 0,
+                'total_sets': 0,
+                'average_score': 0,
+                'best_score': 0,
+                'duration': 0,
+                'notes': ''
+            }
+            
+            self.workout_data['workouts'].append(workout)
+            self._save_data()
+            return workout_id
     
     def end_workout(self, workout_id: str):
         """结束锻炼会话"""
-        workout = self._find_workout(workout_id)
-        if workout:
-            workout['end_time'] = datetime.now().isoformat()
-            start_time = datetime.fromisoformat(workout['start_time'])
-            end_time = datetime.fromisoformat(workout['end_time'])
-            workout['duration'] = (end_time - start_time).total_seconds()
+        with self._cache_lock:
+            self._reload_if_changed()
+            workout = self._find_workout(workout_id)
+            if workout:
+                workout['end_time'] = datetime.now().isoformat()
+                start_time = datetime.fromisoformat(workout['start_time'])
+                end_time = datetime.fromisoformat(workout['end_time'])
+                workout['duration'] = (end_time - start_time).total_seconds()
+                
+                # 计算统计数据
+                if workout['sets']:
+                    scores = [set_data['score'] for set_data in workout['sets']]
+                    workout['average_score'] = np.mean(scores)
+                    workout['best_score'] = max(scores)
+                    workout['total_reps'] = sum(set_data['reps'] for set_data in workout['sets'])
+                    workout['total_sets'] = len(workout['sets'])
+                
+                self._update_statistics()
+                self._save_data()
+    
+    def add_set(self, workout_id: str, reps: int, score: float, 
+                phase_data: List[Dict], notes: str = "",
+                rep_metrics: Optional[List[Dict]] = None) -> bool:
+        """添加一组卧推数据，rep_metrics 为每次重复的运动学指标（见 rep_analysis.analyze_reps）"""
+        with self._cache_lock:
+            self._reload_if_changed()
+            workout = self._find_workout(workout_id)
+            if not workout:
+                return False
             
-            # 计算统计数据
-            if workout['sets']:
-                scores = [set_data['score'] for set_data in workout['sets']]
-                workout['average_score'] = np.mean(scores)
-                workout['best_score'] = max(scores)
-                workout['total_reps'] = sum(set_data['reps'] for set_data in workout['sets'])
-                workout['total_sets'] = len(workout['sets'])
+            set_data = {
+                'set_number': len(workout['sets']) + 1,
+                'reps': reps,
+                'score': score,
+                'phase_data': phase_data,
+                'rep_metrics': rep_metrics or [],
+                'timestamp': datetime.now().isoformat(),
+                'notes': notes
+            }
             
-            self._update_statistics()
+            workout['sets'].append(set_data)
             self._save_data()
+            if self._frame_index is not None:
+                # 生成新索引后替换，已经交给其他线程的索引不变；数据已经保存，追加失败时丢弃索引，下次查询时重建
+                try:
+                    self._frame_index = self._frame_index.with_set(workout_id, set_data)
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"⚠️ 更新逐帧索引失败，将在下次查询时重建: {str(e)}", file=sys.stderr)
+                    self._frame_index = None
+            return True
     
-    def add_set(self, workout_id: str, reps: int, score: float, 
-                phase_data: List[Dict], notes: str = "") -> bool:
-        """添加一组卧推数据"""
-        workout = self._find_workout(workout_id)
-        if not workout:
-            return False
+    def frame_index(self) -> FrameIndex:
+        """返回全部历史的逐帧查询索引（见 FrameIndex）
         
-        set_data = {
-            'set_number': len(workout['sets']) + 1,
-            'reps': reps,
-            'score': score,
-            'phase_data': phase_data,
-            'timestamp': datetime.now().isoformat(),
-            'notes': notes
-        }
+        返回的索引不会再被修改，之后添加的组只出现在再次调用返回的索引中。
         
-        workout['sets'].append(set_data)
-        self._save_data()
-        return True
+        例如最近90天下放阶段肘部角度低于65°的重复:
+            index = tracker.frame_index()
+            rows = index.select(days=90, phases=['DOWN'])
+            reps = index.group_by(rows, ('workout', 'set', 'rep'), 'elbow_angle', ['min'])
+            low = reps['min'] < 65
+        """
+        with self._cache_lock:
+            self._reload_if_changed()
+            if self._frame_index is None:
+                self._frame_index = FrameIndex.build(self.workout_data['workouts'])
+            return self._frame_index
     
     def get_workout_summary(self, workout_id: str) -> Optional[Dict]:
         """获取锻炼会话摘要"""
@@ -120,14 +233,12 @@ class WorkoutTracker:
         }
     
     def get_statistics(self, days: int = 30) -> Dict:
-        """获取统计数据"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_workouts = [
-            w for w in self.workout_data['workouts']
-            if datetime.fromisoformat(w['start_time']) > cutoff_date
-        ]
-        
+        """获取统计数据（带缓存）"""
+        return self._cached_query('statistics', days,
+                                  lambda recent_workouts: self._compute_statistics(recent_workouts, days))
+    
+    def _compute_statistics(self, recent_workouts: List[Dict], days: int) -> Dict:
+        """根据时间窗口内的锻炼计算统计数据"""
         if not recent_workouts:
             return {
                 'period': f'最近{days}天',
@@ -157,14 +268,11 @@ class WorkoutTracker:
         }
     
     def get_progress_data(self, days: int = 30) -> Dict:
-        """获取进度数据用于图表显示"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_workouts = [
-            w for w in self.workout_data['workouts']
-            if datetime.fromisoformat(w['start_time']) > cutoff_date
-        ]
-        
+        """获取进度数据用于图表显示（带缓存）"""
+        return self._cached_query('progress', days, self._compute_progress_data)
+    
+    def _compute_progress_data(self, recent_workouts: List[Dict]) -> Dict:
+        """根据时间窗口内的锻炼整理图表数据"""
         dates = []
         scores = []
         reps = []